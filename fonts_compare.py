@@ -2,9 +2,19 @@
 '''
 This is my fonts-compare program for font rendering and comparing
 '''
+import time
+# Start of the import for the --trace output
+IMPORT_START_TIME = time.perf_counter()
+# pylint: disable=wrong-import-position
 from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
 from typing import List
+from typing import NamedTuple
+from typing import Optional
 from typing import Set
+from typing import Tuple
 import sys
 import os
 import random
@@ -13,27 +23,168 @@ import subprocess
 import shutil
 import locale
 import argparse
+import array
+import atexit
+import base64
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import copy
+import csv
+import functools
+import hashlib
+import http.server
+import importlib.util
+import io
+import json
+import mmap
+import socketserver
+import stat
+import struct
+import threading
+import types
+import urllib.parse
+import xml.etree.ElementTree
 import logging
+import math
 import unicodedata
-import langtable # type: ignore
-import langdetect # type: ignore
 import gi # type: ignore
-import freetype
 import string
-# pylint: disable=wrong-import-position
+import multiprocessing
+import cairo # type: ignore
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, Gdk, Gio # type: ignore
+gi.require_version('Gsk', '4.0')
+from gi.repository import Gsk # type: ignore
 gi.require_version('Pango', '1.0')
 from gi.repository import Pango
+gi.require_version('PangoCairo', '1.0')
+from gi.repository import PangoCairo # type: ignore
 from gi.repository import GLib
 # pylint: enable=wrong-import-position
-Adw.init()
 
 LOGGER = logging.getLogger('fonts-compare')
 
-def parse_args() -> Any:
-    '''Parse the command line arguments'''
+class LazyModule(types.ModuleType):
+    '''
+    Stands in for a module until one of its attributes is used for
+    the first time, see lazy_import()
+    '''
+    def __getattr__(self, attr: str) -> Any:
+        # Only called for attributes the placeholder does not have.
+        # import_module() holds the import lock of the module, so
+        # threads using it at the same time all wait for the complete
+        # module (importlib.util.LazyLoader has no lock before Python
+        # 3.12 and lets a second thread see a half loaded module)
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+def lazy_import(name: str) -> Any:
+    '''
+    Import a module when one of its attributes is used for the first
+    time, from whichever thread that is.
+
+    langtable parses its XML databases at import, langdetect and
+    freetype are only needed for some features, importing them lazily
+    keeps them out of the startup.
+    '''
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+    return LazyModule(name)
+
+langtable = lazy_import('langtable')
+langdetect = lazy_import('langdetect')
+freetype = lazy_import('freetype')
+
+# Events in the Chrome trace event format, only collected with --trace
+TRACE_EVENTS: Optional[List[Dict[str, Any]]] = None
+
+def trace_enable(path: str) -> None:
+    '''Collect trace events and write them to path at exit'''
+    global TRACE_EVENTS
+    TRACE_EVENTS = []
+    atexit.register(write_trace, path)
+
+def trace_event(name: str, category: str, start: float,
+                end: Optional[float] = None,
+                args: Optional[Dict[str, Any]] = None) -> None:
+    '''
+    Record a trace event.
+
+    :param start: time.perf_counter() when the event started
+    :param end: time.perf_counter() when the event ended,
+                None records an instant event
+    '''
+    if TRACE_EVENTS is None:
+        return
+    event: Dict[str, Any] = {
+        'name': name,
+        'cat': category,
+        'ph': 'i' if end is None else 'X',
+        'ts': round((start - IMPORT_START_TIME) * 1e6, 1),
+        'pid': os.getpid(),
+        'tid': threading.get_ident(),
+    }
+    if end is None:
+        event['s'] = 'p'
+    else:
+        event['dur'] = round((end - start) * 1e6, 1)
+    if args:
+        event['args'] = args
+    TRACE_EVENTS.append(event)
+
+@contextlib.contextmanager
+def trace_span(name: str, category: str, **args: Any) -> Any:
+    '''Record the time spent in a with block as trace event'''
+    if TRACE_EVENTS is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace_event(name, category, start, time.perf_counter(), args)
+
+def traced(category: str) -> Any:
+    '''Decorator recording each call of a function as trace event'''
+    def decorator(function: Any) -> Any:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if TRACE_EVENTS is None:
+                return function(*args, **kwargs)
+            with trace_span(function.__qualname__, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def write_trace(path: str) -> None:
+    '''Write the trace events collected so far to path'''
+    try:
+        with open(path, 'w', encoding='utf-8') as trace_file:
+            json.dump({'traceEvents': TRACE_EVENTS,
+                       'displayTimeUnit': 'ms'}, trace_file)
+    except OSError as error:
+        LOGGER.exception('Cannot write trace to %s: %s: %s',
+                         path, error.__class__.__name__, error)
+
+def run_subprocess(command: List[str], **kwargs: Any) -> subprocess.CompletedProcess:
+    '''subprocess.run() recording the command line in the trace'''
+    program = os.path.basename(command[0])
+    category = 'fontconfig' if program.startswith('fc-') else 'subprocess'
+    with trace_span(program, category, command=command):
+        return subprocess.run(command, **kwargs) # pylint: disable=subprocess-run-check
+
+def parse_args(arguments: Optional[List[str]] = None) -> Any:
+    '''
+    Parse the command line arguments, those of this process or of a
+    command line forwarded to it (without the program name)
+    '''
     parser = argparse.ArgumentParser(
             add_help=False,
             description='Fonts Compare Tool')
@@ -48,6 +199,32 @@ def parse_args() -> Any:
             action='store_true',
             default=False,
             help=('display languages with missing fonts'))
+    parser.add_argument(
+            '-f', '--format',
+            choices=('text', 'json', 'csv'),
+            default='text',
+            help=('Output format of --nofonts, --metrics and --benchmark '
+                  'default: %(default)s'))
+    parser.add_argument(
+            '-r', '--render',
+            type=str,
+            nargs='+',
+            metavar='LANG',
+            help=('Render comparison images for these languages without '
+                  'opening a window, “all” renders every language '
+                  'which has fonts installed'))
+    parser.add_argument(
+            '-o', '--output-dir',
+            type=str,
+            default='.',
+            help=('Directory for the images of --render '
+                  'default: %(default)s'))
+    parser.add_argument(
+            '--render-format',
+            choices=('png', 'svg'),
+            default='png',
+            help=('Image format of --render '
+                  'default: %(default)s'))
     parser.add_argument(
            '-l', '--lang',
             type=str,
@@ -57,25 +234,146 @@ def parse_args() -> Any:
             type=str,
             nargs='+',
             help=('Open fonts-compare with a specific text pre-filled'))
+    parser.add_argument(
+            '-w', '--new-window',
+            action='store_true',
+            default=False,
+            help=('Open a new window if fonts-compare is already running, '
+                  'instead of showing the language and text in its window'))
     parser.add_argument(
            '-h', '--help',
             action='store_true',
             default=False,
             help=('Display help message'))
-    return parser.parse_args()
-
-_ARGS = parse_args()
-if _ARGS.text:
-    _ARGS.text = ' '.join(_ARGS.text)
-
-FALLPARAM = 'fallback="false">'
-FONTSIZE = '40'
+    parser.add_argument(
+            '--metrics',
+            type=str,
+            metavar='LANG',
+            help=('Print the metrics of all fonts of a language without '
+                  'opening a window'))
+    parser.add_argument(
+            '--benchmark',
+            type=str,
+            nargs='*',
+            metavar='NAME',
+            help=('Time font resolution, language listing, language '
+                  'detection and the language search without opening a '
+                  'window, all benchmarks if no NAME is given'))
+    parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help=('Number of timed runs of each --benchmark '
+                  'default: %(default)s'))
+    parser.add_argument(
+            '--benchmark-baseline',
+            type=str,
+            metavar='FILE',
+            help=('JSON output of an earlier --benchmark, exit with '
+                  'status 1 if a median got much slower than in FILE'))
+    parser.add_argument(
+            '--font-corpus',
+            type=str,
+            metavar='DIR',
+            help=('Generate a directory of synthetic fonts and a '
+                  'fontconfig configuration for them, to try '
+                  'fonts-compare with FONTCONFIG_FILE=DIR/fonts.conf'))
+    parser.add_argument(
+            '--corpus-size',
+            type=int,
+            default=1000,
+            help=('Number of fonts --font-corpus generates '
+                  'default: %(default)s'))
+    parser.add_argument(
+            '--serve',
+            type=str,
+            nargs='?',
+            const=SERVE_DEFAULT_ADDRESS,
+            metavar='ADDRESS',
+            help=('Render comparisons for HTTP requests without opening a '
+                  'window, on “unix:PATH”, “HOST:PORT” or “PORT” '
+                  'default: %(const)s'))
+    parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help=('Number of comparisons --serve renders at the same time '
+                  'default: %(default)s'))
+    parser.add_argument(
+            '--trace',
+            type=str,
+            metavar='FILE',
+            help=('Write a timeline of startup and user interaction '
+                  'to FILE in the Chrome trace event format'))
+    return parser.parse_args(arguments)
+
+DEFAULT_FONT_SIZE = 40
+PANGO_SAMPLE_TEXT_FONT_SIZE = 20
+# The labels are laid out again in the new font size when the size
+# has not changed for this long
+FONT_SIZE_SETTLE_MS = 150
 LABEL3_FONT = '20'
-SHOWSTYLEBOOL = False
-first_font_saved = ''
 lang_before_ok_response = ''
 LANGDETECT_CHECKBOX = True
 
+def fallback_param(fallback: bool) -> str:
+    '''Return the end of a <span> tag switching font fallback on or off'''
+    return 'fallback="true">' if fallback else 'fallback="false">'
+
+class FontSelection(NamedTuple):
+    '''The font shown on one side of the comparison'''
+    family: str = ''
+    # Style part of a Pango font description like 'Bold Italic',
+    # '' for the regular face
+    style: str = ''
+
+    @classmethod
+    def from_font_description(
+            cls, font_desc: Pango.FontDescription) -> 'FontSelection':
+        '''Return the font chosen in a font button'''
+        style_desc = font_desc.copy()
+        style_desc.unset_fields(Pango.FontMask.FAMILY | Pango.FontMask.SIZE)
+        style = style_desc.to_string()
+        if style == 'Normal':
+            style = ''
+        return cls(font_desc.get_family() or '', style)
+
+    def name(self, show_style: bool = True) -> str:
+        '''Return the font name as fontconfig and Pango parse it'''
+        if show_style and self.style:
+            return f'{self.family} {self.style}'
+        return self.family
+
+    def font_description(
+            self, size: int, show_style: bool = True) -> Pango.FontDescription:
+        '''Return the Pango font description to draw the font in'''
+        if show_style and self.style:
+            font_desc = Pango.font_description_from_string(self.style)
+        else:
+            font_desc = Pango.FontDescription.new()
+        font_desc.set_family(self.family)
+        font_desc.set_size(size * Pango.SCALE)
+        return font_desc
+
+class ComparisonState(NamedTuple):
+    '''
+    What the comparison labels and font buttons of a window show,
+    see AppWindow.update_state()
+    '''
+    text: str = ''
+    fonts: Tuple[FontSelection, FontSelection] = (FontSelection(), FontSelection())
+    font_size: int = DEFAULT_FONT_SIZE
+    fallback: bool = False
+    show_style: bool = False
+    wrap: bool = False
+    # The fonts for the text are still resolved by fontconfig
+    resolving: bool = False
+    show_coverage: bool = False
+    show_metrics: bool = False
+    # The font size is changing continuously, the labels show their
+    # last layout scaled to font_size until it settles
+    preview: bool = False
+
 class CustomDialog(Adw.Window):
     '''
     This class displays a custom dialog window for editing labels, with Adwaita styling.
@@ -134,21 +432,30 @@ class CustomDialog(Adw.Window):
         # Set content area as the child of the window
         self.set_content(content_area)
 
+    @traced('handler')
     def on_ok_clicked(self, _button):
         '''Handles the OK button click event.'''
         text = self.entry_edit_labels.get_text()
-        lang = self.parent.detect_language(text)
         checkbox_state = self.langdetect_edit_label_checkbox.get_active()
+        # Usually the text has been detected while typing already,
+        # then the memoized result comes back at once
+        self.parent.detect_language_later(
+            text, functools.partial(self._apply_text, self.parent, text, checkbox_state))
+        self.close()
+
+    @staticmethod
+    def _apply_text(parent, text: str, checkbox_state: bool, lang: str) -> None:
+        '''Show the text of the dialog in the window, in the main loop'''
         if GTK_VERSION >= (4, 9, 3):
-            self.parent.label_button_set_after_entry_dialog_ok_newversion(text, lang, checkbox_state)
+            parent.label_button_set_after_entry_dialog_ok_newversion(text, lang, checkbox_state)
         else:
-            self.parent.label_button_set_after_entry_dialog_ok(text, lang, checkbox_state)
+            parent.label_button_set_after_entry_dialog_ok(text, lang, checkbox_state)
         if checkbox_state:
-            self.parent._language_menu_button.set_label(lang)
-            self.parent._currently_selected_language = lang
-            self.parent.update_language_filter(lang)
-        self.close()
+            parent._language_menu_button.set_label(lang) # pylint: disable=protected-access
+            parent._currently_selected_language = lang # pylint: disable=protected-access
+            parent.update_language_filter(lang)
 
+    @traced('handler')
     def on_cancel_clicked(self, _button):
         '''Handles the Cancel button click event.'''
         self.close()
@@ -170,6 +477,214 @@ def show_about_window(parent):
     )
     about.present()
 
+class ScaledBin(Gtk.Widget):
+    '''
+    Container showing its child scaled, so the child can be shown in
+    another size without being laid out again.
+
+    In a preview only the drawing is scaled: the child keeps the size
+    it was last allocated at, so a wrapped label does not wrap again
+    in every step of the preview.
+    '''
+    def __init__(self, child: Gtk.Widget) -> None:
+        super().__init__()
+        self._scale = 1.0
+        self._preview = False
+        # Scale and size of the child at the last real allocation
+        self._allocated_scale = 1.0
+        self._child_width = -1
+        self._child_height = -1
+        self._child = child
+        child.set_parent(self)
+
+    def set_scale(self, scale: float, preview: bool = False) -> None:
+        '''Change the scale of the child'''
+        if scale == self._scale and preview == self._preview:
+            return
+        self._scale = scale
+        self._preview = preview
+        if self._keeps_layout():
+            self.queue_draw()
+        else:
+            self.queue_resize()
+
+    def _keeps_layout(self) -> bool:
+        '''Whether the child stays at the size it was last allocated at'''
+        return self._preview and self._child_width >= 0
+
+    def do_get_request_mode(self) -> Gtk.SizeRequestMode:
+        # Height for width like the child, for wrapped labels
+        return self._child.get_request_mode()
+
+    def do_measure(self, orientation: Gtk.Orientation,
+                   for_size: int) -> Tuple[int, int, int, int]:
+        if self._keeps_layout():
+            if orientation == Gtk.Orientation.HORIZONTAL:
+                size = self._child_width
+            else:
+                size = self._child_height
+            size = math.ceil(size * self._allocated_scale)
+            return (size, size, -1, -1)
+        if for_size >= 0:
+            for_size = int(for_size / self._scale)
+        (minimum, natural, _minimum_baseline, _natural_baseline) = (
+            self._child.measure(orientation, for_size))
+        return (math.ceil(minimum * self._scale),
+                math.ceil(natural * self._scale), -1, -1)
+
+    def do_size_allocate(self, width: int, height: int, _baseline: int) -> None:
+        if not self._keeps_layout():
+            self._allocated_scale = self._scale
+            self._child_width = int(width / self._scale)
+            self._child_height = int(height / self._scale)
+        transform = None
+        if self._allocated_scale != 1.0:
+            transform = Gsk.Transform.new().scale(
+                self._allocated_scale, self._allocated_scale)
+        self._child.allocate(self._child_width, self._child_height, -1, transform)
+
+    def do_snapshot(self, snapshot: Gtk.Snapshot) -> None:
+        scale = self._scale / self._allocated_scale
+        if scale == 1.0:
+            self.snapshot_child(self._child, snapshot)
+            return
+        snapshot.save()
+        snapshot.scale(scale, scale)
+        self.snapshot_child(self._child, snapshot)
+        snapshot.restore()
+
+    def do_dispose(self) -> None:
+        self._child.unparent()
+        Gtk.Widget.do_dispose(self)
+
+class SpecimenGridWindow(Adw.Window):
+    '''
+    Window showing a text in every face fontconfig has for a language.
+
+    Gtk.GridView only creates cells for the faces in view and recycles
+    them while scrolling.  The Pango layout of a face is only created
+    when a cell is bound to it and kept in a LayoutCache, so scrolling
+    back does not lay out the text again.
+    '''
+    def __init__(self, parent, lang: str, text: str, font_size: int, **kwargs):
+        super().__init__(**kwargs)
+        self.parent = parent
+        self._text = text
+        self._font_size = font_size
+        self._layouts = LayoutCache(SPECIMEN_LAYOUT_CACHE_SIZE)
+        self._lang = lang
+
+        self.set_title(lang)
+        self.set_transient_for(self.parent)
+        self.set_default_size(3 * SPECIMEN_CELL_WIDTH, 600)
+
+        # Sorting the faces of a language with many fonts takes a
+        # while, the grid is filled when the worker has them
+        self._model = Gtk.StringList.new([])
+        future = FONTCONFIG_EXECUTOR.submit(specimen_faces_for_language, lang)
+        future.add_done_callback(
+            lambda done: GLib.idle_add(self._on_faces_found, done))
+        factory = Gtk.SignalListItemFactory()
+        factory.connect('setup', self._on_item_setup)
+        factory.connect('bind', self._on_item_bind)
+        grid = Gtk.GridView.new(Gtk.NoSelection.new(self._model), factory)
+        grid.set_max_columns(4)
+        grid.set_single_click_activate(True)
+        grid.connect('activate', self._on_activate)
+        scroll = Gtk.ScrolledWindow()
+        scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scroll.set_vexpand(True)
+        scroll.set_child(grid)
+
+        toolbar_view = Adw.ToolbarView()
+        toolbar_view.add_top_bar(Adw.HeaderBar())
+        toolbar_view.set_content(scroll)
+        self.set_content(toolbar_view)
+
+    @traced('handler')
+    def _on_faces_found(self, future: concurrent.futures.Future) -> bool:
+        '''Fill the grid with the faces found for the language'''
+        try:
+            faces = future.result()
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Problem listing the faces for %s: %s: %s',
+                             self._lang, error.__class__.__name__, error)
+            faces = []
+        LOGGER.info('%d faces for %s in the specimen grid', len(faces), self._lang)
+        self.set_title(f'{self._lang}: {len(faces)} fonts')
+        self._model.splice(0, 0, ['\t'.join(face) for face in faces])
+        return False
+
+    def _on_item_setup(
+            self, _factory: Gtk.SignalListItemFactory,
+            list_item: Gtk.ListItem) -> None:
+        '''Create the widgets of a cell: the font name and the specimen'''
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        box.set_margin_top(8)
+        box.set_margin_bottom(8)
+        box.set_margin_start(8)
+        box.set_margin_end(8)
+        caption = Gtk.Label()
+        caption.set_xalign(0)
+        caption.set_ellipsize(Pango.EllipsizeMode.END)
+        caption.add_css_class('dim-label')
+        caption.add_css_class('caption')
+        box.append(caption)
+        area = Gtk.DrawingArea()
+        area.set_content_width(SPECIMEN_CELL_WIDTH)
+        area.face = None
+        area.set_draw_func(self._on_draw_cell)
+        box.append(area)
+        list_item.set_child(box)
+
+    def _on_item_bind(
+            self, _factory: Gtk.SignalListItemFactory,
+            list_item: Gtk.ListItem) -> None:
+        '''Show a face in a (possibly recycled) cell'''
+        (family, style) = list_item.get_item().get_string().split('\t')
+        caption = list_item.get_child().get_first_child()
+        caption.set_text(f'{family} {style}'.strip())
+        area = caption.get_next_sibling()
+        area.face = (family, style)
+        area.set_content_height(self._layout(family, style).get_pixel_size()[1])
+        area.queue_draw()
+
+    def _layout(self, family: str, style: str) -> Pango.Layout:
+        '''Return the layout of the text in a face'''
+        def create() -> Pango.Layout:
+            layout = Pango.Layout.new(self.get_pango_context())
+            layout.set_font_description(
+                FontSelection(family, style).font_description(self._font_size))
+            # Show what the face covers itself
+            attributes = Pango.AttrList.new()
+            attributes.insert(Pango.attr_fallback_new(False))
+            layout.set_attributes(attributes)
+            layout.set_width(SPECIMEN_CELL_WIDTH * Pango.SCALE)
+            layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+            layout.set_text(self._text, -1)
+            return layout
+        return self._layouts.get((family, style), create)
+
+    def _on_draw_cell(
+            self, area: Gtk.DrawingArea, context: cairo.Context,
+            _width: int, _height: int) -> None:
+        '''Draw the specimen of the face a cell is bound to'''
+        if area.face is None:
+            return
+        if GTK_VERSION >= (4, 10, 0):
+            color = area.get_color()
+        else:
+            color = area.get_style_context().get_color()
+        Gdk.cairo_set_source_rgba(context, color)
+        PangoCairo.show_layout(context, self._layout(*area.face))
+
+    @traced('handler')
+    def _on_activate(self, grid: Gtk.GridView, position: int) -> None:
+        '''Compare the face clicked with the font of the first label'''
+        (family, style) = grid.get_model().get_item(position).get_string().split('\t')
+        LOGGER.info('specimen grid: %s %s chosen', family, style)
+        self.parent.set_font_selection(1, FontSelection(family, style))
+
 
 
 #class AppWindow(Gtk.ApplicationWindow): # type: ignore
@@ -184,7 +699,34 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         self.add_controller(controller)
         self.cli_language = language
         self.lang_explicitly_set = lang_explicitly_set
-        self.init_ui()
+        # Language detection of the edit dialog, see on_entry_changed()
+        self._language_detection_generation = 0
+        self._language_detection_timeout_id: Optional[int] = None
+        self._language_detection_future: Optional[concurrent.futures.Future] = None
+        # Fontconfig lookups running in FONTCONFIG_EXECUTOR by kind,
+        # see _submit_font_job()
+        self._font_job_generations: Dict[str, int] = {}
+        self._font_job_futures: Dict[str, concurrent.futures.Future] = {}
+        self.connect('close-request', self._on_close_request)
+        # What the comparison shows, changes are rendered once per
+        # frame, see update_state()
+        self._state = ComparisonState()
+        self._rendered_state: Optional[ComparisonState] = None
+        self._render_tick_id: Optional[int] = None
+        self._font_button_handler_ids = [0, 0]
+        # Font size the labels were last laid out in, see _render_state()
+        self._laid_out_font_size = DEFAULT_FONT_SIZE
+        self._font_size_settle_id: Optional[int] = None
+        # (font names, language) and the coverage of the fonts looked
+        # up for them, see update_coverage_label()
+        self._coverage_key: Optional[Tuple[Tuple[str, ...], str]] = None
+        self._coverage: List[FontCoverage] = []
+        # Font names and the table metrics looked up for them, see
+        # update_metrics_panel()
+        self._metrics_key: Optional[Tuple[str, ...]] = None
+        self._table_metrics: List[Optional[FontTableMetrics]] = []
+        with trace_span('AppWindow.init_ui', 'startup'):
+            self.init_ui()
 
     def init_ui(self) -> None:
         '''
@@ -230,6 +772,18 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
             self.fontversion_checkbox.connect('toggled', self.fontversion_checkbox_on_changed)
             main_menu_popover_vbox.append(self.fontversion_checkbox)
 
+        #glyph coverage in menu
+        self.coverage_checkbox = Gtk.CheckButton.new_with_label('Glyph Coverage')
+        self.coverage_checkbox.set_active(False)
+        self.coverage_checkbox.connect('toggled', self.coverage_checkbox_on_changed)
+        main_menu_popover_vbox.append(self.coverage_checkbox)
+
+        #font metrics in menu
+        self.metrics_checkbox = Gtk.CheckButton.new_with_label('Font Metrics')
+        self.metrics_checkbox.set_active(False)
+        self.metrics_checkbox.connect('toggled', self.metrics_checkbox_on_changed)
+        main_menu_popover_vbox.append(self.metrics_checkbox)
+
         #hide style in menu
         if GTK_VERSION >= (4,9,3):
             self.showstyle_checkbox = Gtk.CheckButton.new_with_label('Show Style')
@@ -257,15 +811,11 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         self._fontsize_adjustment = Gtk.Adjustment()
         self._fontsize_adjustment.set_lower(1)
         self._fontsize_adjustment.set_upper(100)
-        self._fontsize_adjustment.set_value(int(FONTSIZE))
+        self._fontsize_adjustment.set_value(DEFAULT_FONT_SIZE)
         self._fontsize_adjustment.set_step_increment(1)
         self._fontsize_spin_button.set_adjustment(self._fontsize_adjustment)
-        self.button1_family = ''
-        self.button2_family = ''
         self._fontsize_adjustment.connect(
-                'value-changed',
-                self.on_fontsize_adjustment_value_changed,
-                self.button1_family, self.button2_family)
+                'value-changed', self.on_fontsize_adjustment_value_changed)
         main_menu_popover_vbox.append(self._fontsize_spin_button)
 
         self._main_menu_edit_label_button = Gtk.Button(label='Edit Text')
@@ -273,6 +823,12 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         self._main_menu_edit_label_button.add_css_class('text-button')
         self._main_menu_edit_label_button.connect('clicked', self._on_edit_label_button_clicked)
         main_menu_popover_vbox.append(self._main_menu_edit_label_button)
+
+        self._main_menu_all_fonts_button = Gtk.Button(label='All Fonts')
+        self._main_menu_all_fonts_button.set_has_frame(False)
+        self._main_menu_all_fonts_button.add_css_class('text-button')
+        self._main_menu_all_fonts_button.connect('clicked', self._on_all_fonts_button_clicked)
+        main_menu_popover_vbox.append(self._main_menu_all_fonts_button)
         
         self._main_menu_about_button = Gtk.Button(label='About')
         self._main_menu_about_button.set_has_frame(False)
@@ -313,7 +869,10 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         self._language_menu_popover_scroll.set_overlay_scrolling(True)
         self._language_menu_popover.connect(
                 'show', self._on_language_menu_popover_show)
-        self._language_menu_popover_language_ids: List[str] = []
+        # The widgets and list models of the language menu popover
+        # are created when it is shown for the first time:
+        self._language_menu_selection: Optional[Gtk.SingleSelection] = None
+        self._language_menu_ranks: Dict[str, int] = {}
 
         self.toolbar_view = Adw.ToolbarView()
         self.toolbar_view.add_top_bar(header_bar)
@@ -342,14 +901,13 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
             self.button1 = Gtk.FontDialog()
             self.font_dialog_button1 = Gtk.FontDialogButton()
             self.font_dialog_button1.set_dialog(self.button1)
-            self.font_dialog_button1.connect('notify::font-desc', self.label_font_change_newversion, self.label1)
             self.font_dialog_button1.set_level(Gtk.FontLevel.FAMILY)
-            self.fontbutton_newversion(self.label1, self.font_dialog_button1, self.hbox_button1)
+            self.fontbutton_newversion(self.font_dialog_button1, self.hbox_button1, 0)
             # Don't set language filter at initialization
             # It will be set when language is explicitly selected or detected
         else:
             self.button1 = Gtk.FontButton.new()
-            self.fontbutton(self.label1, self.button1, self.hbox_button1)
+            self.fontbutton(self.button1, self.hbox_button1, 0)
             self.button1.set_level(Gtk.FontChooserLevel.SIZE)
             self.button1.set_filter_func(self.font_filter)
         self.vbox.append(self.hbox_button1)
@@ -357,7 +915,8 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         if GTK_VERSION >= (4,9,3):
             self.fv_label1 = Gtk.Label()
             self.vbox.append(self.fv_label1)
-        self.vbox.append(self.label1)
+        self._label1_bin = ScaledBin(self.label1)
+        self.vbox.append(self._label1_bin)
         self.label2 = Gtk.Label()
         self.label2.set_selectable(True)
         self.label2.set_justify(Gtk.Justification.FILL)
@@ -366,17 +925,17 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
             self.button2 = Gtk.FontDialog()
             self.font_dialog_button2 = Gtk.FontDialogButton()
             self.font_dialog_button2.set_dialog(self.button2)
-            self.font_dialog_button2.connect('notify::font-desc', self.label_font_change_newversion, self.label2)
             self.font_dialog_button2.set_level(Gtk.FontLevel.FAMILY)
-            self.fontbutton_newversion(self.label2, self.font_dialog_button2, self.hbox_button2)
+            self.fontbutton_newversion(self.font_dialog_button2, self.hbox_button2, 1)
             # Don't set language filter at initialization
             # It will be set when language is explicitly selected or detected
         else:
             self.button2 = Gtk.FontButton.new()
-            self.fontbutton(self.label2, self.button2, self.hbox_button2)
+            self.fontbutton(self.button2, self.hbox_button2, 1)
             self.button2.set_level(Gtk.FontChooserLevel.SIZE)
             self.button2.set_filter_func(self.font_filter)
-        self.vbox.append(self.label2)
+        self._label2_bin = ScaledBin(self.label2)
+        self.vbox.append(self._label2_bin)
 
         #fontversion label2
         if GTK_VERSION >= (4,9,3):
@@ -386,36 +945,58 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
             self.fv_label2.set_property("visible", False)
         self.vbox.append(self.hbox_button2)
 
-        #temp_other_font = self.get_other_font_family_for_language('en')
-        temp_other_font = self.get_other_font_family_for_language(self.cli_language)
-        self.label2.set_markup('<span font="'+temp_other_font
-                               +' '+FONTSIZE+'"' + FALLPARAM
-                               + self.sample_text_selector('en')
-                               + '</span>')
+        #glyph coverage differences of the two fonts
+        self.coverage_label = Gtk.Label()
+        self.coverage_label.set_wrap(True)
+        self.coverage_label.set_selectable(True)
+        self.coverage_label.add_css_class('caption')
+        self.coverage_label.set_visible(False)
+        self.vbox.append(self.coverage_label)
+
+        #metrics of the two fonts, one row per metric
+        self.metrics_grid = Gtk.Grid()
+        self.metrics_grid.set_column_spacing(24)
+        self.metrics_grid.set_halign(Gtk.Align.CENTER)
+        self.metrics_grid.set_visible(False)
+        self._metrics_value_labels: List[List[Gtk.Label]] = []
+        for row, column_name in enumerate(('',) + FONT_METRICS_COLUMNS):
+            name_label = Gtk.Label(label=column_name)
+            name_label.set_xalign(0)
+            name_label.add_css_class('dim-label')
+            self.metrics_grid.attach(name_label, 0, row, 1, 1)
+            value_labels = []
+            for column in (1, 2):
+                value_label = Gtk.Label()
+                value_label.set_xalign(1)
+                value_label.add_css_class('numeric')
+                self.metrics_grid.attach(value_label, column, row, 1, 1)
+                value_labels.append(value_label)
+            self._metrics_value_labels.append(value_labels)
+        self.vbox.append(self.metrics_grid)
+
+        # langtable is only loaded after the first frame, until then the
+        # labels show the sample string of Pango, see _on_startup_idle()
+        text = pango_sample_string(self.cli_language)
+        # fc-match can take seconds with a cold fontconfig cache, so the
+        # first frame shows the text dimmed until the fonts are resolved
+        self.update_state(text=text, resolving=True)
+        self._submit_font_job(
+            'fonts', resolve_font_families,
+            (self.cli_language, self._language_menu_button.get_label()),
+            self._apply_initial_fonts,
+            FontResolution(self.cli_language, '', '', ''))
         if GTK_VERSION >= (4,9,3):
-            self.font_dialog_button2.set_font_desc(Pango.font_description_from_string(temp_other_font + ' ' + FONTSIZE))
-            self.button1.set_title(self.font_dialog_button1.get_font_desc().to_string())
-            self.button2.set_title(self.font_dialog_button2.get_font_desc().to_string())
-
             # Set language filter only if user explicitly specified language via -l flag
             if self.lang_explicitly_set:
                 language_code = self.cli_language.replace('_', '-') if '_' in self.cli_language else self.cli_language
                 LOGGER.info(f'Setting language filter for explicitly set language: {language_code}')
                 self.button1.set_language(Pango.Language.from_string(language_code))
                 self.button2.set_language(Pango.Language.from_string(language_code))
-        else:
-            self.button2.set_font(temp_other_font + ' ' + FONTSIZE)
-        text = self.label1.get_text()
-        lang = self.detect_language(text)
-        self._currently_selected_language = lang
-        LOGGER.info('label1: text=%s lang=%s', text,lang)
-        lc_messages = locale.getlocale(locale.LC_MESSAGES)[0]
-        label_lang_full_form = langtable.language_name(
-                languageId=lang, languageIdQuery=lc_messages)
-        self._language_menu_button.set_tooltip_text(label_lang_full_form)
-
-        self.pango_sample_text_checkbox.set_active(True)
-        self.pango_sample_text_checkbox.set_active(False)
+        self._currently_selected_language = self.cli_language
+        LOGGER.info('label1: text=%s lang=%s', text, self.cli_language)
+        # Everything not needed to show the labels waits until the
+        # first frame has been drawn
+        self.add_tick_callback(self._on_first_frame_tick, text)
 
         if self.is_dark_mode_enabled():
             LOGGER.info('system dark mode is on')
@@ -437,6 +1018,51 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         self.set_resizable(True)
         self.toolbar_view.set_content(self.vbox)
 
+    def _apply_initial_fonts(self, resolution: 'FontResolution') -> None:
+        '''Show the fonts resolved for the language at startup'''
+        first_font = resolution.first_family
+        other_font = resolution.other_family
+        if shutil.which('fc-list'):
+            self._show_font_availability(
+                resolution.lang, other_font, resolution.label_family)
+            if not other_font:
+                # if no fonts are installed than first fontbutton should not select default noto sans
+                first_font = ''
+        self.update_state(
+            fonts=(FontSelection(first_font), FontSelection(other_font)),
+            resolving=False)
+        if GTK_VERSION >= (4,9,3):
+            self.button1.set_title(first_font)
+            self.button2.set_title(other_font)
+
+    def _on_first_frame_tick(
+            self, _widget: Gtk.Widget, _frame_clock: Gdk.FrameClock,
+            text: str) -> bool:
+        '''Start the second stage of the startup after this frame'''
+        GLib.idle_add(self._on_startup_idle, text, priority=GLib.PRIORITY_LOW)
+        return GLib.SOURCE_REMOVE
+
+    @traced('startup')
+    def _on_startup_idle(self, text: str) -> bool:
+        '''
+        Second stage of the startup: look up the name of the language
+        for the tooltip, replace the sample text of the first frame if
+        it is still shown and load langdetect and the language list in
+        the workers, so the edit dialog and language menu do not wait
+        for them later.
+        '''
+        lc_messages = locale.getlocale(locale.LC_MESSAGES)[0]
+        self._language_menu_button.set_tooltip_text(langtable.language_name(
+            languageId=self.cli_language, languageIdQuery=lc_messages))
+        if self._state.text == text:
+            sample_text = self.sample_text_selector(self.cli_language)
+            if sample_text != text:
+                LOGGER.info('label text: %s instead of %s', sample_text, text)
+                self.update_state(text=sample_text)
+        LANGDETECT_EXECUTOR.submit(detect_language, text)
+        FONTCONFIG_EXECUTOR.submit(get_language_registry)
+        return False
+
     def start_fallback_animation(self):
         self.stop_fallback_animation()
         self._fade_in = True
@@ -500,260 +1126,121 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         '''
         font_pango_font_description = font_family.get_name()
         current_lang = self._language_menu_button.get_label()
-        try:
-            result = subprocess.run(["fc-list", font_pango_font_description, "lang"], encoding='utf-8', check=True, capture_output=True)
-            output = ""
-            output = result.stdout
-            if not output.startswith(':lang='):
-                return False
-            #langs = output.split('=')[1].split('|')
-            if output and not output.startswith(':lang='):
-                return False
-            langs = output.split('=')[1].split('|') if output else []
-            if current_lang in langs:
-                return True
-            return False
-        except subprocess.CalledProcessError as error:
-            LOGGER.exception('Exception when calling %s: %s stderr: %s',
-                             error.__class__.__name__, error, error.stderr)
-            return False
-        except Exception as error: # pylint: disable=broad-except
-            LOGGER.exception('Exception when calling %s: %s',
-                             error.__class__.__name__, error)
-            return False
+        langs = get_font_catalog().languages_for_family(font_pango_font_description)
+        return current_lang.replace('_', '-').lower() in langs
 
     #spin button font size change by adjustment increment decrement
+    @traced('handler')
     def on_fontsize_adjustment_value_changed(
-            self,
-            adjustment: Gtk.Adjustment,
-            button1_family: str,
-            button2_family: str) -> None:
+            self, _adjustment: Gtk.Adjustment) -> None:
         '''
         spin button adjustment button used for
         increase and decrease of font size of label1 and label2
         '''
-        temp_label1_text = self.label1.get_text()
-        temp_label2_text = self.label2.get_text()
-        if GTK_VERSION >= (4, 9, 3):
-            LOGGER.info('before fontsize update')
-            LOGGER.info('font_dialog_button1: %s',self.font_dialog_button1.get_font_desc().to_string())
-            LOGGER.info('font_dialog_button2: %s',self.font_dialog_button2.get_font_desc().to_string())
-            button1_desc = self.font_dialog_button1.get_font_desc().to_string()
-            button2_desc = self.font_dialog_button2.get_font_desc().to_string()
-            #checking if last part only has any digit between 1-100 separated by space from the font
-            #means checking if fontsize available in the last part
-            #because changing font from fontbutton will remove the fontsize from the fontfamily
-            #if font has changed thn fontsize won't be available and need to add manually
-            if re.search(r'\s([1-9][0-9]?|100)$', button1_desc):
-                button1_family = button1_desc.rsplit(' ', 1)[0]
-            else:
-                button1_family = button1_desc
-            if re.search(r'\s([1-9][0-9]?|100)$', button2_desc):
-                button2_family = button2_desc.rsplit(' ', 1)[0]
-            else:
-                button2_family = button2_desc
-            LOGGER.info('button1 family: %s',button1_family)
-            LOGGER.info('button2 family: %s',button2_family)
-            self.font_dialog_button1.set_font_desc(Pango.font_description_from_string(button1_family + ' '
-                                  + str(self._fontsize_adjustment.get_value())))
-            self.font_dialog_button2.set_font_desc(Pango.font_description_from_string(button2_family + ' '
-                                  + str(self._fontsize_adjustment.get_value())))
-            LOGGER.info('after fontsize update')
-            LOGGER.info('font_dialog_button1: %s',self.font_dialog_button1.get_font_desc().to_string())
-            LOGGER.info('font_dialog_button2: %s',self.font_dialog_button2.get_font_desc().to_string())
-            LOGGER.info('\n')
-
-        else:
-            button1_family = self.button1.get_font().rsplit(' ',1)[0]
-            button2_family = self.button2.get_font().rsplit(' ',1)[0]
-            self.button1.set_font(button1_family + ' '
-                                  + str(self._fontsize_adjustment.get_value()))
-            self.button2.set_font(button2_family + ' '
-                                  + str(self._fontsize_adjustment.get_value()))
-
-        if GTK_VERSION >= (4, 9, 3):
-            #setting family-style-size to label1
-            pango_font_description1 = self.font_dialog_button1.get_font_desc()
-            pango_font_description1.set_size(int(self._fontsize_adjustment.get_value()) * Pango.SCALE)
-            pango_attr_font_description1 = Pango.AttrFontDesc.new(pango_font_description1)
-            pango_attr_list = Pango.AttrList.new()
-            pango_attr_list.insert(attr=pango_attr_font_description1)
-            self.label1.set_attributes(attrs=pango_attr_list)
-            #setting family-style-size to label2
-            pango_font_description2 = self.font_dialog_button2.get_font_desc()
-            pango_font_description2.set_size(int(self._fontsize_adjustment.get_value()) * Pango.SCALE)
-            pango_attr_font_description2 = Pango.AttrFontDesc.new(pango_font_description2)
-            pango_attr_list = Pango.AttrList.new()
-            pango_attr_list.insert(attr=pango_attr_font_description2)
-            self.label2.set_attributes(attrs=pango_attr_list)
-        else:
-            self.label1.set_markup('<span font="'+button1_family+' '
-                                   +str(self._fontsize_adjustment.get_value())
-                                   +'"' + FALLPARAM
-                                   + temp_label1_text
-                                   + '</span>')
-            self.label2.set_markup('<span font="'+button2_family+' '
-                                   +str(self._fontsize_adjustment.get_value())
-                                   +'"' + FALLPARAM
-                                   + temp_label2_text
-                                   + '</span>')
+        font_size = int(self._fontsize_adjustment.get_value())
+        if font_size == self._state.font_size and not self._state.preview:
+            # Set by the program together with the state
+            self._wrap_for_font_size(font_size)
+            return
+        # Only scale the labels while the size keeps changing, see
+        # _on_font_size_settled()
+        self.update_state(font_size=font_size, preview=True)
+        if self._font_size_settle_id is not None:
+            GLib.source_remove(self._font_size_settle_id)
+        self._font_size_settle_id = GLib.timeout_add(
+            FONT_SIZE_SETTLE_MS, self._on_font_size_settled)
+
+    @traced('handler')
+    def _on_font_size_settled(self) -> bool:
+        '''Lay the labels out in the font size it stopped changing at'''
+        self._font_size_settle_id = None
+        self.update_state(preview=False)
+        self._wrap_for_font_size(self._state.font_size)
+        return GLib.SOURCE_REMOVE
+
+    def _wrap_for_font_size(self, font_size: int) -> None:
+        '''Wrap the labels if the text is too wide in font_size'''
         #wrapping text if font size greater than 60
         if (self.pango_sample_text_checkbox.get_active() is True) and (
-                int(self._fontsize_adjustment.get_value()) > 60):
-            self.label1.set_wrap(True)
-            self.label1.set_wrap_mode(Pango.WrapMode.WORD_CHAR)
-            self.label1.set_max_width_chars(60)
-            self.label1.set_width_chars(60)
-            self.label2.set_wrap(True)
-            self.label2.set_wrap_mode(Pango.WrapMode.WORD_CHAR)
-            self.label2.set_max_width_chars(60)
-            self.label2.set_width_chars(60)
+                font_size > 60):
             self.wrap_checkbox.set_active(True)
-        elif (int(self._fontsize_adjustment.get_value()) > 30) and (len(self.label1.get_text()) > 45):
-            self.label1.set_wrap(True)
-            self.label1.set_wrap_mode(Pango.WrapMode.WORD_CHAR)
-            self.label1.set_max_width_chars(60)
-            self.label1.set_width_chars(60)
-            self.label2.set_wrap(True)
-            self.label2.set_wrap_mode(Pango.WrapMode.WORD_CHAR)
-            self.label2.set_max_width_chars(60)
-            self.label2.set_width_chars(60)
+        elif (font_size > 30) and (len(self._state.text) > 45):
             self.wrap_checkbox.set_active(True)
         else:
-            self.label1.set_wrap(False)
-            self.label2.set_wrap(False)
             self.wrap_checkbox.set_active(False)
             self.set_default_size(300,200)
 
-
     def fontbutton(
             self,
-            label: Gtk.Label,
             button: Gtk.FontButton,
-            boxh: Gtk.Box) -> None:
+            boxh: Gtk.Box,
+            index: int) -> None:
         '''
-        setting up initial font and text for labels and font button text updated
+        setting up the font button for font index of the comparison
         '''
-        temp_label_button_font = self.get_default_font_family_for_language(self.cli_language)
-        label.set_markup('<span font="'+temp_label_button_font
-                         +' '+FONTSIZE+'"' + FALLPARAM
-                         + self.sample_text_selector('en')
-                         + '</span>')
-        button.connect('font-set', self.label_font_change, label)
+        button.connect('font-set', self.label_font_change, index)
         button.set_hexpand(False)
-        button.set_font(temp_label_button_font + ' ' + FONTSIZE)
         boxh.append(button)
 
-    @classmethod
+    @traced('handler')
     def label_font_change(
-            cls, button: Gtk.FontButton, label: Gtk.Label) -> None:
+            self, button: Gtk.FontButton, index: int) -> None:
         '''
         font family and font size changes by font-button dialog
         '''
-        label.set_markup('<span font="'+button.get_font().rsplit(' ',1)[0]
-                               +' '+FONTSIZE+'"' + FALLPARAM
-                               + label.get_text()
-                               + '</span>')
+        self.set_font_selection(
+            index, FontSelection.from_font_description(button.get_font_desc()))
 
     def fontbutton_newversion(
             self,
-            label: Gtk.Label,
             dialogButton,
-            boxh: Gtk.Box) -> None:
+            boxh: Gtk.Box,
+            index: int) -> None:
         '''
-        setting up initial font and text for labels and font button text updated
+        setting up the font dialog button for font index of the comparison
         '''
-        temp_label_button_font = self.get_default_font_family_for_language(self.cli_language)
-        label.set_markup('<span font="'+temp_label_button_font
-                         +' '+FONTSIZE+'"' + FALLPARAM
-                         + self.sample_text_selector('en')
-                         + '</span>')
-        dialogButton.set_font_desc(Pango.font_description_from_string(temp_label_button_font + ' ' + FONTSIZE))
+        self._font_button_handler_ids[index] = dialogButton.connect(
+            'notify::font-desc', self.label_font_change_newversion, index)
         boxh.append(dialogButton)
 
+    @traced('handler')
     def label_font_change_newversion(
-            self, dialogButton, _param_spec: Any, label: Gtk.Label) -> None:
+            self, dialogButton, _param_spec: Any, index: int) -> None:
         '''
         font family and font size changes by font-button dialog
         '''
-        global FONTSIZE
-        pango_font_description = dialogButton.get_font_desc()
-        pango_font_description.set_size(int(FONTSIZE) * Pango.SCALE)
-        pango_attr_font_description = Pango.AttrFontDesc.new(pango_font_description)
-        pango_attr_list = Pango.AttrList.new()
-        pango_attr_list.insert(attr=pango_attr_font_description)
-        label.set_attributes(attrs=pango_attr_list)
-
+        self.set_font_selection(
+            index, FontSelection.from_font_description(dialogButton.get_font_desc()))
         if self.fontversion_checkbox.get_active() is True:
-            word1 = self.font_dialog_button1.get_font_desc().to_string().split()
-            last_word1 = word1[-1]
-            if last_word1.isdigit():
-                self.fv_label1.set_markup('<span foreground='+"'green'"+ 'font="'
-                                          +self.get_default_font_family_for_language('en')
-                                          +' '+'8'+'"' + FALLPARAM
-                                          + '<b>' + self.get_font_version(self.font_dialog_button1.get_font_desc().to_string().rsplit(' ',1)[0]) + '</b>'
-                                          + '</span>')
-            else:
-                self.fv_label1.set_markup('<span foreground='+"'green'"+ 'font="'
-                                          +self.get_default_font_family_for_language('en')
-                                          +' '+'8'+'"' + FALLPARAM
-                                          + '<b>' + self.get_font_version(self.font_dialog_button1.get_font_desc().to_string()) + '</b>'
-                                          + '</span>')
-            word2 = self.font_dialog_button2.get_font_desc().to_string().split()
-            last_word2 = word2[-1]
-            if last_word2.isdigit():
-                self.fv_label2.set_markup('<span foreground='+"'green'"+ 'font="'
-                                          +self.get_default_font_family_for_language('en')
-                                          +' '+'8'+'"' + FALLPARAM
-                                          + '<b>' + self.get_font_version(self.font_dialog_button2.get_font_desc().to_string().rsplit(' ',1)[0]) + '</b>'
-                                          + '</span>')
-            else:
-                self.fv_label2.set_markup('<span foreground='+"'green'"+ 'font="'
-                                          +self.get_default_font_family_for_language('en')
-                                          +' '+'8'+'"' + FALLPARAM
-                                          + '<b>' + self.get_font_version(self.font_dialog_button2.get_font_desc().to_string()) + '</b>'
-                                          + '</span>')
+            self.update_fontversion_labels()
+
+    def set_font_selection(self, index: int, font: FontSelection) -> None:
+        '''Show font on side index of the comparison'''
+        fonts = list(self._state.fonts)
+        fonts[index] = font
+        self.update_state(fonts=tuple(fonts))
 
+    @traced('handler')
     def fallback_checkbox_on_changed(
             self,
             _checkbutton: Gtk.CheckButton) -> None:
         '''
         function to change fallback as True
         '''
-        global FALLPARAM
         state = self.fallback_checkbox.get_active()
         if state:
-            FALLPARAM = 'fallback="true">'
             LOGGER.info('fallback checked %s',state)
             self.fallback_status_label.set_visible(True)
             self.stop_fallback_animation()
             self.start_fallback_animation()
             self.fallback_status_label.set_opacity(1.0)
         else:
-            FALLPARAM = 'fallback="false">'
             LOGGER.info('fallback unchecked %s',state)
             self.start_fallback_animation()
             self.fallback_status_label.set_visible(False)
-        LOGGER.info('version check and continue to next line')
-        if GTK_VERSION >= (4, 9, 3):
-            self.label1.set_markup('<span font="'+self.font_dialog_button1.get_font_desc().to_string()
-                               +'"' + FALLPARAM
-                               + self.label1.get_text()
-                               + '</span>')
-            self.label2.set_markup('<span font="'+self.font_dialog_button2.get_font_desc().to_string()
-                                   +'"' + FALLPARAM
-                                   + self.label2.get_text()
-                                   + '</span>')
-        else:
-            self.label1.set_markup('<span font="'+self.button1.get_font()
-                                   +'"' + FALLPARAM
-                                   + self.label1.get_text()
-                                   + '</span>')
-            self.label2.set_markup('<span font="'+self.button2.get_font()
-                                   +'"' + FALLPARAM
-                                   + self.label2.get_text()
-                                   + '</span>')
+        self.update_state(fallback=state)
 
+    @traced('handler')
     def fontversion_checkbox_on_changed(
             self,
             _checkbutton: Gtk.CheckButton) -> None:
@@ -764,17 +1251,7 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         if state:
             LOGGER.info('fontversion checkbox checked')
             if GTK_VERSION >= (4, 9, 3):
-                self.fv_label1.set_markup('<span foreground='+"'green'"+ 'font="'
-                                          +self.get_default_font_family_for_language('en')
-                                          +' '+'8'+'"' + FALLPARAM
-                                          + '<b>' + self.get_font_version(self.font_dialog_button1.get_font_desc().to_string().rsplit(' ',1)[0]) + '</b>'
-                                          + '</span>')
-
-                self.fv_label2.set_markup('<span foreground='+"'green'"+ 'font="'
-                                          +self.get_default_font_family_for_language('en')
-                                          +' '+'8'+'"' + FALLPARAM
-                                          + '<b>' + self.get_font_version(self.font_dialog_button2.get_font_desc().to_string().rsplit(' ',1)[0]) + '</b>'
-                                          + '</span>')
+                self.update_fontversion_labels()
 
             self.fv_label1.set_visible(True)
             self.fv_label2.set_visible(True)
@@ -786,63 +1263,182 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         self._main_menu_popover.popdown()
         self.set_default_size(300,200)
 
+    @traced('handler')
+    def coverage_checkbox_on_changed(
+            self,
+            _checkbutton: Gtk.CheckButton) -> None:
+        '''
+        function to display which characters only one of the fonts covers
+        '''
+        state = self.coverage_checkbox.get_active()
+        LOGGER.info('coverage checkbox %s', 'checked' if state else 'unchecked')
+        self.update_state(show_coverage=state)
+        self._main_menu_popover.popdown()
+        self.set_default_size(300,200)
+
+    def update_coverage_label(self) -> None:
+        '''
+        Show which characters of the text and of the orthography of
+        the language only one of the fonts covers.
+
+        The coverage of the fonts is looked up in FONTCONFIG_EXECUTOR
+        once, as long as the fonts and the language stay the same
+        only the text is compared again.
+        '''
+        font_names = tuple(font.name(self._state.show_style)
+                           for font in self._state.fonts)
+        key = (font_names, self._language_menu_button.get_label())
+        if key == self._coverage_key:
+            self._show_coverage_diff()
+            return
+        self._coverage_key = key
+        self._coverage = []
+        self.coverage_label.set_text('…')
+        self._submit_font_job(
+            'coverage', resolve_font_coverage, (list(font_names), key[1]),
+            self._apply_coverage,
+            [FontCoverage(None, None), FontCoverage(None, None)])
+
+    def _apply_coverage(self, coverage: List['FontCoverage']) -> None:
+        '''Keep the coverage looked up by update_coverage_label()'''
+        self._coverage = coverage
+        self._show_coverage_diff()
+
+    def _show_coverage_diff(self) -> None:
+        '''Compare the coverage of the fonts for the current text'''
+        if not self._coverage or not self._coverage_key:
+            return
+        (first, second) = self._coverage
+        if first.code_points is None or second.code_points is None:
+            self.coverage_label.set_text('No glyph coverage found')
+            return
+        (first_name, second_name) = self._coverage_key[0]
+        self.coverage_label.set_text(coverage_diff_text(
+            first_name, second_name,
+            coverage_diff(self._state.text, first, second)))
+
+    @traced('handler')
+    def metrics_checkbox_on_changed(
+            self,
+            _checkbutton: Gtk.CheckButton) -> None:
+        '''
+        function to display the metrics of both fonts
+        '''
+        state = self.metrics_checkbox.get_active()
+        LOGGER.info('metrics checkbox %s', 'checked' if state else 'unchecked')
+        self.update_state(show_metrics=state)
+        self._main_menu_popover.popdown()
+        self.set_default_size(300,200)
+
+    def update_metrics_panel(self) -> None:
+        '''
+        Show the metrics of both fonts and the size of the text in them.
+
+        The font tables are looked up in FONTCONFIG_EXECUTOR when the
+        fonts change, the text is measured again for every change.
+        '''
+        font_names = tuple(font.name(self._state.show_style)
+                           for font in self._state.fonts)
+        if font_names == self._metrics_key:
+            self._show_metrics()
+            return
+        self._metrics_key = font_names
+        self._table_metrics = []
+        for column, font_name in enumerate(font_names):
+            self._metrics_value_labels[0][column].set_text(font_name)
+            for value_labels in self._metrics_value_labels[1:]:
+                value_labels[column].set_text('…')
+        self._submit_font_job(
+            'metrics', resolve_font_table_metrics, (list(font_names),),
+            self._apply_table_metrics, [None, None])
+
+    def _apply_table_metrics(
+            self, table_metrics: List[Optional['FontTableMetrics']]) -> None:
+        '''Keep the metrics looked up by update_metrics_panel()'''
+        self._table_metrics = table_metrics
+        self._show_metrics()
+
+    def _show_metrics(self) -> None:
+        '''Fill the metrics panel for the current text and size'''
+        if not self._table_metrics:
+            return
+        state = self._state
+        text_sizes = text_pixel_sizes(
+            [font.font_description(state.font_size, state.show_style)
+             for font in state.fonts],
+            state.text, self.get_pango_context())
+        for column, (table_metrics, text_size) in enumerate(
+                zip(self._table_metrics, text_sizes)):
+            values = font_metrics_values(table_metrics, text_size)
+            for value_labels, value in zip(self._metrics_value_labels[1:], values):
+                value_labels[column].set_text('-' if value is None else str(value))
+
+    def update_fontversion_labels(self) -> None:
+        '''
+        Show the version of the fonts selected in both font buttons,
+        more metadata of the font files is shown as tooltip
+
+        The font files are looked up in FONTCONFIG_EXECUTOR, the labels
+        show “…” until then.
+        '''
+        font_names = [font.name(self._state.show_style)
+                      for font in self._state.fonts]
+        for fv_label in (self.fv_label1, self.fv_label2):
+            fv_label.set_text('…')
+            fv_label.set_tooltip_text(None)
+        self._submit_font_job(
+            'fontversion', resolve_font_metadata,
+            (font_names, self._language_menu_button.get_label()),
+            self._apply_fontversion_labels, ('', [None, None]))
+
+    def _apply_fontversion_labels(
+            self,
+            result: 'Tuple[str, List[Optional[FontMetadata]]]') -> None:
+        '''Show the font metadata looked up by update_fontversion_labels()'''
+        (label_font, metadata_list) = result
+        for fv_label, metadata in zip((self.fv_label1, self.fv_label2), metadata_list):
+            fv_label.set_markup('<span foreground='+"'green'"+ 'font="'
+                                +label_font
+                                +' '+'8'+'"' + fallback_param(self._state.fallback)
+                                + '<b>' + GLib.markup_escape_text(font_version_text(metadata)) + '</b>'
+                                + '</span>')
+            if metadata:
+                fv_label.set_tooltip_text(
+                    f'{metadata.path} (face {metadata.face_index})\n'
+                    f'Vendor: {metadata.vendor}\n'
+                    f'Designer: {metadata.designer}\n'
+                    f'License: {metadata.license}\n'
+                    f'Glyphs: {metadata.glyph_count}')
+            else:
+                fv_label.set_tooltip_text(None)
+
     def get_font_version(self, font_name):
-        #getting fontpath from fontfamily
-        fc_list_command = ['fc-list', font_name, 'file']
-        result = subprocess.run(fc_list_command, capture_output=True, text=True)
-        output_line = result.stdout.strip()
-        if len(output_line) == 0:
-            print("Fontpath not found")
-            return 'No fontversion found'
-        font_file_path = output_line.split(':')[0]
-        LOGGER.info('font_path: %s',font_file_path)
-
-        # Getting font version using Freetype
-        face = freetype.Face(font_file_path)
-        num_name_strings = face.sfnt_name_count
-        version_string = None
-        for index in range(num_name_strings):
-            name_string = face.get_sfnt_name(index)
-            if name_string.name_id == 5:  # Font version name ID
-                version_string = name_string.string.decode('utf-8')
-                version_string = version_string.strip()
-                break
-        cleaned_version_string = self.clean_string(version_string)
-        LOGGER.info('freetype_version: %s',cleaned_version_string)
-        return cleaned_version_string
+        '''
+        Return the version of the font file fontconfig uses for a font
+        '''
+        metadata = get_font_metadata(font_name)
+        if not metadata:
+            LOGGER.info('Fontpath not found for %s', font_name)
+        else:
+            LOGGER.info('freetype_version: %s',metadata.version)
+        return font_version_text(metadata)
 
     #clean non-printable letters from freetype returned string
     def clean_string(self,s):
-        return ''.join(filter(lambda x: x in string.printable, s)).strip()
+        return clean_string(s)
 
+    @traced('handler')
     def showstyle_checkbox_on_changed(
             self,
             _checkbutton: Gtk.CheckButton) -> None:
         '''
-        function to wrap labels as True
+        function to show the styles of the fonts as well
         '''
         state = self.showstyle_checkbox.get_active()
-        global SHOWSTYLEBOOL
-        if state:
-            LOGGER.info('showstyle checked %s',state)
-            SHOWSTYLEBOOL = True
-            if GTK_VERSION >= (4,9,3):
-                self.font_dialog_button1.set_level(Gtk.FontLevel.FONT)
-                self.font_dialog_button2.set_level(Gtk.FontLevel.FONT)
-        else:
-            SHOWSTYLEBOOL = False
-            LOGGER.info('showstyle unchecked %s',state)
-            if GTK_VERSION >= (4,9,3):
-                self.font_dialog_button1.set_level(Gtk.FontLevel.FAMILY)
-                self.font_dialog_button2.set_level(Gtk.FontLevel.FAMILY)
- 
-        if self.pango_sample_text_checkbox.get_active() is False: 
-            self.pango_sample_text_checkbox.set_active(True)
-            self.pango_sample_text_checkbox.set_active(False)
-        else:
-            self.pango_sample_text_checkbox.set_active(False)
-            self.pango_sample_text_checkbox.set_active(True)
+        LOGGER.info('showstyle %s', 'checked' if state else 'unchecked')
+        self.update_state(show_style=state)
 
+    @traced('handler')
     def wrap_checkbox_on_changed(
             self,
             _checkbutton: Gtk.CheckButton) -> None:
@@ -850,22 +1446,11 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         function to wrap labels as True
         '''
         state = self.wrap_checkbox.get_active()
-        if state:
-            LOGGER.info('wrap checked %s',state)
-            self.label1.set_wrap(True)
-            self.label1.set_wrap_mode(Pango.WrapMode.WORD_CHAR)
-            self.label1.set_max_width_chars(60)
-            self.label1.set_width_chars(60)
-            self.label2.set_wrap(True)
-            self.label2.set_wrap_mode(Pango.WrapMode.WORD_CHAR)
-            self.label2.set_max_width_chars(60)
-            self.label2.set_width_chars(60)
-        else:
-            LOGGER.info('wrap unchecked %s',state)
-            self.label1.set_wrap(False)
-            self.label2.set_wrap(False)
+        LOGGER.info('wrap %s %s', 'checked' if state else 'unchecked', state)
+        self.update_state(wrap=state)
         self.set_default_size(300,200)#jft
 
+    @traced('handler')
     def darktheme_checkbox_on_changed(
             self,
             _checkbutton: Gtk.CheckButton) -> None:
@@ -883,91 +1468,36 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
             style_manager.set_color_scheme(Adw.ColorScheme.FORCE_LIGHT)
         self._main_menu_popover.popdown()
 
+    @traced('handler')
     def pango_sample_text_checkbox_on_changed(
             self,
             _checkbutton: Gtk.CheckButton) -> None:
         '''
         function to change sample string depends upon toogle switch
         '''
-        global FONTSIZE
-        LOGGER.info("font before pango sample text checkbox clicked")
-        LOGGER.info("fontbutton1:- %s, fontsize:- %s", self.font_dialog_button1.get_font_desc().to_string(), FONTSIZE)
-        LOGGER.info("fontbutton2:- %s, fontsize:- %s", self.font_dialog_button2.get_font_desc().to_string(), FONTSIZE)
         state = self.pango_sample_text_checkbox.get_active()
         LOGGER.info('The switch has been switched %s', 'on' if state else 'off')
         if state:
-            FONTSIZE = '20'
-            LOGGER.info('pango font = %s',FONTSIZE)
+            font_size = PANGO_SAMPLE_TEXT_FONT_SIZE
+            LOGGER.info('pango font = %s', font_size)
         else:
-            FONTSIZE = '40'
-            LOGGER.info('langtable font = %s',FONTSIZE)
-        components1 = self.font_dialog_button1.get_font_desc().to_string().split()
-        components2 = self.font_dialog_button2.get_font_desc().to_string().split()
-        if not components1[-1].isdigit():
-            tempfont1 = f"{self.font_dialog_button1.get_font_desc().to_string()} {FONTSIZE}"
-            self.font_dialog_button1.set_font_desc(Pango.font_description_from_string(tempfont1))
-            LOGGER.info("font after changing font from fontbutton1")
-            LOGGER.info("fontbutton1:- %s, fontsize:- %s", self.font_dialog_button1.get_font_desc().to_string(), FONTSIZE)
-            LOGGER.info("fontbutton2:- %s, fontsize:- %s", self.font_dialog_button2.get_font_desc().to_string(), FONTSIZE)
-        if not components2[-1].isdigit():
-            tempfont2 = f"{self.font_dialog_button2.get_font_desc().to_string()} {FONTSIZE}"
-            self.font_dialog_button2.set_font_desc(Pango.font_description_from_string(tempfont2))
-            LOGGER.info("font after changing font from fontbutton2")
-            LOGGER.info("fontbutton1:- %s, fontsize:- %s", self.font_dialog_button1.get_font_desc().to_string(), FONTSIZE)
-            LOGGER.info("fontbutton2:- %s, fontsize:- %s", self.font_dialog_button2.get_font_desc().to_string(), FONTSIZE)
+            font_size = DEFAULT_FONT_SIZE
+            LOGGER.info('langtable font = %s', font_size)
+        LOGGER.info('lang from language list: %s', self._language_menu_button.get_label())
         #instant label1 and label2 change after switch change
-        if GTK_VERSION >= (4, 9, 3):
-            self.label1.set_markup('<span font="'+self.font_dialog_button1.get_font_desc().to_string().rsplit(' ',1)[0]
-                                   +' '+FONTSIZE+'"' + FALLPARAM
-                                   + self.sample_text_selector(
-                                       self._language_menu_button.get_label())
-                                   + '</span>')
-            self.font_dialog_button1.set_font_desc(Pango.font_description_from_string(self.font_dialog_button1.get_font_desc().to_string().rsplit(' ',1)[0] + ' ' + FONTSIZE))
-            self.label2.set_markup('<span font="'+self.font_dialog_button2.get_font_desc().to_string().rsplit(' ',1)[0]
-                                   +' '+FONTSIZE+'"' + FALLPARAM
-                                   + self.sample_text_selector(
-                                       self._language_menu_button.get_label())
-                                   + '</span>')
-            LOGGER.info('lang from language list: %s', self._language_menu_button.get_label())
-            self.font_dialog_button2.set_font_desc(Pango.font_description_from_string(self.font_dialog_button2.get_font_desc().to_string().rsplit(' ',1)[0] + ' ' + FONTSIZE))
-        else:
-            self.label1.set_markup('<span font="'+self.button1.get_font().rsplit(' ',1)[0]
-                                   +' '+FONTSIZE+'"' + FALLPARAM
-                                   + self.sample_text_selector(
-                                       self._language_menu_button.get_label())
-                                   + '</span>')
-            self.button1.set_font(self.button1.get_font().rsplit(' ',1)[0] + ' ' + FONTSIZE)
-            self.label2.set_markup('<span font="'+self.button2.get_font().rsplit(' ',1)[0]
-                                   +' '+FONTSIZE+'"' + FALLPARAM
-                                   + self.sample_text_selector(
-                                       self._language_menu_button.get_label())
-                                   + '</span>')
-            LOGGER.info('lang from language list: %s', self._language_menu_button.get_label())
-            self.button2.set_font(self.button2.get_font().rsplit(' ',1)[0] + ' ' + FONTSIZE)
-
-        self._fontsize_adjustment.set_value(int(FONTSIZE))
+        self.update_state(
+            text=self.sample_text_selector(self._language_menu_button.get_label()),
+            font_size=font_size)
+        self._fontsize_adjustment.set_value(font_size)
         self.set_default_size(300,200)
         self._main_menu_popover.popdown()
-        LOGGER.info("font after pango sample text checkbox clicked")
-        LOGGER.info("fontbutton1:- %s, fontsize:- %s", self.font_dialog_button1.get_font_desc().to_string(), FONTSIZE)
-        LOGGER.info("fontbutton2:- %s, fontsize:- %s", self.font_dialog_button2.get_font_desc().to_string(), FONTSIZE)
 
     def sample_text_selector(self, lang: str) -> str:
         '''
         sample text will be selected by either Pango or Langtable
         '''
-        if self.pango_sample_text_checkbox.get_active():
-            #True - Pango sample text
-            sample_text = str(Pango.Language.get_sample_string(
-                Pango.language_from_string (lang)))
-            if lang != 'en' and sample_text == "The quick brown fox jumps over the lazy dog.":
-                sample_text = str(langtable.language_name(
-                    languageId=lang, languageIdQuery=lang))
-            return sample_text
-        #False - Langtable sample text
-        sample_text = str(langtable.language_name(
-            languageId=lang, languageIdQuery=lang))
-        return sample_text
+        return sample_text_for_language(
+            lang, self.pango_sample_text_checkbox.get_active())
 
 
     def set_font(self, detect_lang: str, set_text: str, apply_fallback: bool = False, update_language_filter: bool = False) -> None:
@@ -977,68 +1507,240 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         If multiple scripts are detected,
         fallback is enabled automatically.
         update_language_filter: Only set language filter when True (when user explicitly selects from dropdown)
-        '''
-        global FALLPARAM
-        if apply_fallback and is_mixed_script(set_text):
-            FALLPARAM = 'fallback="true">'
-            self.fallback_checkbox.set_active(True)
-        else:
-            FALLPARAM = 'fallback="false">'
-            self.fallback_checkbox.set_active(False)
 
-        temp_label1_font = self.get_default_font_family_for_language(detect_lang)
-        temp_label2_font = self.get_other_font_family_for_language(detect_lang)
+        The fonts are resolved in FONTCONFIG_EXECUTOR, until then the
+        labels show the new text dimmed.  Resolutions superseded by a
+        newer call are dropped.
+        '''
+        self.fallback_checkbox.set_active(
+            bool(apply_fallback and is_mixed_script(set_text)))
+        self.update_state(text=set_text, resolving=True)
+        self._submit_font_job(
+            'fonts', resolve_font_families,
+            (detect_lang, self._language_menu_button.get_label()),
+            functools.partial(self._apply_fonts, set_text, update_language_filter),
+            FontResolution(detect_lang, '', '', ''))
+
+    def _apply_fonts(
+            self, set_text: str, update_language_filter: bool,
+            resolution: 'FontResolution') -> None:
+        '''Show set_text in the fonts resolved for set_font()'''
+        detect_lang = resolution.lang
+        LOGGER.info('fonts for %s: %s, %s', detect_lang,
+                    resolution.first_family, resolution.other_family)
+        if shutil.which('fc-list'):
+            self._show_font_availability(
+                detect_lang, resolution.other_family, resolution.label_family)
+        # Only set language filter when user explicitly changes language dropdown
+        if GTK_VERSION >= (4, 9, 3) and update_language_filter:
+            LOGGER.info('Setting language filter for detected language: %s', detect_lang)
+            language_code = detect_lang.replace('_', '-') if '_' in detect_lang else detect_lang
+            self.button1.set_language(Pango.Language.from_string(language_code))
+            self.button2.set_language(Pango.Language.from_string(language_code))
+            LOGGER.info('Language filter applied: %s', language_code)
+        self.update_state(
+            text=set_text,
+            fonts=(FontSelection(resolution.first_family),
+                   FontSelection(resolution.other_family)),
+            resolving=False)
+        self.set_default_size(300,200)
+        if GTK_VERSION >= (4, 9, 3) and self.fontversion_checkbox.get_active():
+            self.update_fontversion_labels()
 
-        self.label1.set_markup('<span font="'+temp_label1_font
-                               +' '+str(int(self._fontsize_adjustment.get_value()))+'"' + FALLPARAM
-                               + set_text + '</span>')
-        LOGGER.info('label1 text now: %s',self.label1.get_text())
+    def update_state(self, **changes: Any) -> None:
+        '''
+        Change fields of the ComparisonState of the window.
 
-        if GTK_VERSION >= (4, 9, 3):
-            temp_safe_font = Pango.font_description_from_string("Sans 40")
-            self.font_dialog_button1.set_font_desc(temp_safe_font)
-            self.font_dialog_button2.set_font_desc(temp_safe_font)
-
-            # Only set language filter when user explicitly changes language dropdown
-            if update_language_filter:
-                LOGGER.info('Setting language filter for detected language: %s', detect_lang)
-                language_code = detect_lang.replace('_', '-') if '_' in detect_lang else detect_lang
-                self.button1.set_language(Pango.Language.from_string(language_code))
-                self.button2.set_language(Pango.Language.from_string(language_code))
-                LOGGER.info('Language filter applied: %s', language_code)
+        The labels and font buttons are not touched here, all changes
+        made until the next frame is drawn are applied together by
+        _render_state() from a frame clock tick callback.
+        '''
+        self._state = self._state._replace(**changes)
+        if self._render_tick_id is None:
+            self._render_tick_id = self.add_tick_callback(self._on_render_tick)
+
+    def _on_render_tick(self, _widget: Gtk.Widget, _frame_clock: Gdk.FrameClock) -> bool:
+        '''Render the state once per frame, see update_state()'''
+        self._render_tick_id = None
+        self._render_state()
+        return GLib.SOURCE_REMOVE
+
+    @traced('render')
+    def _render_state(self) -> None:
+        '''
+        Apply the differences between the state and the state rendered
+        last time to the labels and font buttons
+        '''
+        state = self._state
+        old = self._rendered_state
+        if state == old:
+            return
+        self._rendered_state = state
+        labels = (self.label1, self.label2)
+        if old is None or old.text != state.text:
+            LOGGER.info('label text now: %s', state.text)
+            for label in labels:
+                label.set_text(state.text)
+        if state.preview:
+            # Scale the layout in the last exact size, cheaper than
+            # laying out the text again in every frame
+            for label_bin in (self._label1_bin, self._label2_bin):
+                label_bin.set_scale(
+                    state.font_size / self._laid_out_font_size, preview=True)
+        if (old is None or old.fonts != state.fonts
+                or (old.font_size != state.font_size and not state.preview)
+                or (old.preview and not state.preview)
+                or old.fallback != state.fallback
+                or old.show_style != state.show_style):
+            font_size = state.font_size if not state.preview else self._laid_out_font_size
+            font_descs = [font.font_description(font_size, state.show_style)
+                          for font in state.fonts]
+            self._laid_out_font_size = font_size
+            for label_bin in (self._label1_bin, self._label2_bin):
+                label_bin.set_scale(state.font_size / font_size, preview=state.preview)
+            for label, font_desc in zip(labels, font_descs):
+                attributes = Pango.AttrList.new()
+                attributes.insert(Pango.AttrFontDesc.new(font_desc))
+                attributes.insert(Pango.attr_fallback_new(state.fallback))
+                label.set_attributes(attributes)
+            for index, font_desc in enumerate(font_descs):
+                LOGGER.info('font button %d: %s', index + 1, font_desc.to_string())
+                if GTK_VERSION >= (4, 9, 3):
+                    button = (self.font_dialog_button1, self.font_dialog_button2)[index]
+                    with button.handler_block(self._font_button_handler_ids[index]):
+                        button.set_font_desc(font_desc)
+                else:
+                    (self.button1, self.button2)[index].set_font_desc(font_desc)
+        if GTK_VERSION >= (4, 9, 3) and (
+                old is None or old.show_style != state.show_style):
+            level = Gtk.FontLevel.FONT if state.show_style else Gtk.FontLevel.FAMILY
+            self.font_dialog_button1.set_level(level)
+            self.font_dialog_button2.set_level(level)
+        if old is None or old.wrap != state.wrap:
+            for label in labels:
+                label.set_wrap(state.wrap)
+                if state.wrap:
+                    label.set_wrap_mode(Pango.WrapMode.WORD_CHAR)
+                    label.set_max_width_chars(60)
+                    label.set_width_chars(60)
+        if old is None or old.resolving != state.resolving:
+            # Dim the text until its fonts are known
+            for label in labels:
+                if state.resolving:
+                    label.add_css_class('dim-label')
+                else:
+                    label.remove_css_class('dim-label')
+            if GTK_VERSION >= (4, 9, 3):
+                buttons = (self.font_dialog_button1, self.font_dialog_button2)
             else:
-                LOGGER.info('Skipping language filter update (not explicitly selected by user)')
-            
-            LOGGER.info('self.font_dialog_button1.set_font(%s)',
-                        temp_label1_font +' '+str(int(self._fontsize_adjustment.get_value())))
-            self.font_dialog_button1.set_font_desc(Pango.font_description_from_string(temp_label1_font +' '+str(int(self._fontsize_adjustment.get_value()))))
-            LOGGER.info('self.font_dialog_button1.get_font(%s)',self.font_dialog_button1.get_font_desc().to_string())
-
-            self.label2.set_markup('<span font="'+temp_label2_font
-                                   +' '+str(int(self._fontsize_adjustment.get_value()))+'"' + FALLPARAM
-                                   + set_text + '</span>')
-            LOGGER.info('label2 text now: %s',self.label2.get_text())
-            LOGGER.info('self.font_dialog_button2.set_font(%s)',
-                        temp_label2_font +' '+ str(int(self._fontsize_adjustment.get_value())))
-            self.font_dialog_button2.set_font_desc(Pango.font_description_from_string(temp_label2_font +' '
-                                  + str(int(self._fontsize_adjustment.get_value()))))
-            LOGGER.info('self.font_dialog_button2.get_font(%s)',self.font_dialog_button2.get_font_desc().to_string())
-        else:
-            LOGGER.info('self.button1.set_font(%s)',
-                        temp_label1_font +' '+str(int(self._fontsize_adjustment.get_value())))
-            self.button1.set_font(temp_label1_font +' '+str(int(self._fontsize_adjustment.get_value())))
-            LOGGER.info('self.button1.get_font(%s)',self.button1.get_font())
-            temp_label2_font = self.get_other_font_family_for_language(detect_lang)
-            self.label2.set_markup('<span font="'+temp_label2_font
-                                   +' '+str(int(self._fontsize_adjustment.get_value()))+'"' + FALLPARAM
-                                   + set_text + '</span>')
-            LOGGER.info('label2 text now: %s',self.label2.get_text())
-            LOGGER.info('self.button2.set_font(%s)',
-                        temp_label2_font +' '+ str(int(self._fontsize_adjustment.get_value())))
-            self.button2.set_font(temp_label2_font +' '
-                                  + str(int(self._fontsize_adjustment.get_value())))
-            LOGGER.info('self.button2.get_font(%s)',self.button2.get_font())
-        self.set_default_size(300,200)
+                buttons = (self.button1, self.button2)
+            for button in buttons:
+                button.set_sensitive(not state.resolving)
+        if old is None or old.show_coverage != state.show_coverage:
+            self.coverage_label.set_visible(state.show_coverage)
+        if state.show_coverage and not state.resolving and (
+                old is None or not old.show_coverage or old.resolving
+                or old.text != state.text or old.fonts != state.fonts
+                or old.show_style != state.show_style):
+            self.update_coverage_label()
+        if old is None or old.show_metrics != state.show_metrics:
+            self.metrics_grid.set_visible(state.show_metrics)
+        if state.show_metrics and not state.resolving and not state.preview and (
+                old is None or not old.show_metrics or old.resolving or old.preview
+                or old.text != state.text or old.fonts != state.fonts
+                or old.font_size != state.font_size
+                or old.show_style != state.show_style):
+            self.update_metrics_panel()
+
+    def _submit_font_job(
+            self, kind: str, function: Any, args: Tuple[Any, ...],
+            callback: Any, default: Any) -> None:
+        '''
+        Run a fontconfig lookup in FONTCONFIG_EXECUTOR and pass its
+        result to callback in the main loop.
+
+        A lookup of the same kind which is still pending is superseded,
+        its result is dropped.  If the lookup fails, callback gets
+        default.
+        '''
+        self._cancel_font_job(kind)
+        generation = self._font_job_generations[kind]
+        future = FONTCONFIG_EXECUTOR.submit(function, *args)
+        self._font_job_futures[kind] = future
+        future.add_done_callback(
+            lambda done: GLib.idle_add(
+                self._on_font_job_done, kind, generation, done, callback, default))
+
+    def _cancel_font_job(self, kind: str) -> None:
+        '''Drop the pending fontconfig lookup of a kind'''
+        self._font_job_generations[kind] = self._font_job_generations.get(kind, 0) + 1
+        future = self._font_job_futures.pop(kind, None)
+        if future is not None:
+            # Only succeeds if the worker has not started it yet
+            future.cancel()
+
+    @traced('handler')
+    def _on_font_job_done(
+            self, kind: str, generation: int,
+            future: concurrent.futures.Future,
+            callback: Any, default: Any) -> bool:
+        '''Hand the result of a fontconfig lookup to its callback'''
+        if generation != self._font_job_generations[kind] or future.cancelled():
+            LOGGER.debug('Dropping outdated %s lookup', kind)
+            return False
+        self._font_job_futures.pop(kind, None)
+        try:
+            result = future.result()
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Problem looking up %s: %s: %s',
+                             kind, error.__class__.__name__, error)
+            result = default
+        callback(result)
+        return False
+
+    def retarget(self, language: str, text: str = '', lang_explicitly_set: bool = False) -> None:
+        '''
+        Compare another language or text in this window, for a command
+        line forwarded from a later invocation of fonts-compare.  Like
+        on_activate(), a text selects the language it is written in.
+        '''
+        if text:
+            self.show_text(text, lang_explicitly_set)
+            return
+        self._show_text_in_language(
+            self.sample_text_selector(language), lang_explicitly_set, language)
+
+    def refresh_fonts(self, update: 'FontCatalogUpdate') -> None:
+        '''
+        Show the comparison again after fonts were installed, changed
+        or removed, see FontDirectoryMonitor.  If a font is missing or
+        has been removed the fonts are resolved again, the fonts chosen
+        in the window are kept otherwise.
+        '''
+        if not all(font.family and font.family.lower() not in update.removed_families
+                   for font in self._state.fonts):
+            self.set_font(self._language_menu_button.get_label(), self._state.text)
+            return
+        # Lay out the labels again and look up coverage and metrics
+        # of the new font files
+        self._coverage_key = None
+        self._metrics_key = None
+        self._rendered_state = None
+        self.update_state()
+        if GTK_VERSION >= (4, 9, 3) and self.fontversion_checkbox.get_active():
+            self.update_fontversion_labels()
+        if self._language_menu_popover.get_visible():
+            self._language_menu_popover_listbox_fill(self.search_entry.get_text())
+
+    def _on_close_request(self, _window: Gtk.Window) -> bool:
+        '''Drop pending lookups, their results have nowhere to go'''
+        if self._font_size_settle_id is not None:
+            GLib.source_remove(self._font_size_settle_id)
+            self._font_size_settle_id = None
+        for kind in list(self._font_job_futures):
+            self._cancel_font_job(kind)
+        self._cancel_language_detection()
+        return False
 
     def on_entry_activate_enter_pressed_ok_signal(self, widget, custom_dialog):
         '''
@@ -1046,6 +1748,7 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         '''
         custom_dialog.on_ok_clicked(None)
 
+    @traced('handler')
     def _on_edit_label_button_clicked(self, _button: Gtk.Button) -> None:
         '''The “Edit Label” button has been clicked'''
         LOGGER.debug('Edit Label button clicked')
@@ -1054,33 +1757,40 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         global lang_before_ok_response
         lang_before_ok_response = self._language_menu_button.get_label()
         self.custom_dialog = CustomDialog(self, transient_for=self)
+        self.custom_dialog.connect('close-request', lambda _dialog: self._cancel_language_detection())
+        self.custom_dialog.langdetect_label_font = ''
         self.custom_dialog.entry_edit_labels.changed_signal_id = self.custom_dialog.entry_edit_labels.connect(
                 'notify::text', self.on_entry_changed)
         self.custom_dialog.entry_edit_labels.connect("activate", self.on_entry_activate_enter_pressed_ok_signal, self.custom_dialog)
-        self.custom_dialog.entry_edit_labels.set_text(self.label1.get_text())
+        self.custom_dialog.entry_edit_labels.set_text(self._state.text)
         self.custom_dialog.entry_edit_labels.set_position(-1)
         self.custom_dialog.entry_edit_labels.grab_focus_without_selecting()
-        text = self.custom_dialog.entry_edit_labels.get_text()
-        lang = self.detect_language(text)
-        LOGGER.info('text=%s lang=%s', text, lang)
         global LANGDETECT_CHECKBOX
         self.custom_dialog.langdetect_edit_label_checkbox.set_active(LANGDETECT_CHECKBOX)
         lc_messages = locale.getlocale(locale.LC_MESSAGES)[0]
         lc_messages_lang = 'en'
         if lc_messages:
             lc_messages_lang = lc_messages.split('_')[0]
-        label_lang_full_form = langtable.language_name(
-                languageId=lang, languageIdQuery=lc_messages)
-        LOGGER.info('label_lang full form=%s',label_lang_full_form)
-        self._language_menu_button.set_tooltip_text(label_lang_full_form)
-        self.custom_dialog.langdetect_edit_labels.set_markup(
-                '<span font="'
-                +self.get_default_font_family_for_language(lc_messages_lang)
-                +' '+'15'+'"' + FALLPARAM
-                + label_lang_full_form + '</span>')
+        self.custom_dialog.langdetect_label_font = self.get_default_font_family_for_language(lc_messages_lang)
+        # Detect the language of the text at once instead of waiting
+        # for the debounce, _on_language_detected() shows it
+        self._cancel_language_detection()
+        self._start_language_detection(
+            self.custom_dialog.entry_edit_labels.get_text(),
+            self._language_detection_generation)
         self.custom_dialog.present()
 
 
+    @traced('handler')
+    def _on_all_fonts_button_clicked(self, _button: Gtk.Button) -> None:
+        '''The “All Fonts” button has been clicked'''
+        LOGGER.debug('All Fonts button clicked')
+        self._main_menu_popover.popdown()
+        SpecimenGridWindow(
+            self, self._language_menu_button.get_label(),
+            self._state.text, PANGO_SAMPLE_TEXT_FONT_SIZE).present()
+
+    @traced('handler')
     def _on_about_button_clicked(self, _button: Gtk.Button) -> None:
         '''The “About” button has been clicked'''
         LOGGER.debug('About button clicked')
@@ -1095,6 +1805,7 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         # will automatically terminate.
         self.destroy()
 
+    @traced('handler')
     def _on_language_search_entry_changed(
             self, search_entry: Gtk.SearchEntry) -> None:
         '''Called when the text in the language search entry changes'''
@@ -1114,67 +1825,117 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
             row += ' ' + language_description
         return row
 
+    def _language_menu_popover_build(self) -> None:
+        '''
+        Create the widgets of the language menu popover.
+
+        This is done only once.  The languages are kept in a
+        Gtk.StringList which is filtered and sorted by list models
+        wrapped around it, a Gtk.ListView only creates and recycles
+        row widgets for the visible rows.
+        '''
+        vbox_language_dropdown = Gtk.Box()
+        vbox_language_dropdown.set_orientation(Gtk.Orientation.VERTICAL)
+        label = Gtk.Label()
+        label.set_text('Use language')
+        label.set_halign(Gtk.Align.FILL)
+        vbox_language_dropdown.append(label)
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_can_focus(True)
+        self.search_entry.set_halign(Gtk.Align.FILL)
+        vbox_language_dropdown.append(self.search_entry)
+        self.search_entry.changed_signal_id = self.search_entry.connect(
+                'search-changed', self._on_language_search_entry_changed)
+        self._language_menu_registry = get_language_registry()
+        self._language_menu_model = Gtk.StringList.new(
+            self._language_menu_registry.sorted_language_ids())
+        self._language_menu_filter = Gtk.CustomFilter.new(
+            self._language_menu_filter_func)
+        filter_model = Gtk.FilterListModel.new(
+            self._language_menu_model, self._language_menu_filter)
+        self._language_menu_sorter = Gtk.CustomSorter.new(
+            self._language_menu_sort_func)
+        sort_model = Gtk.SortListModel.new(filter_model, self._language_menu_sorter)
+        self._language_menu_selection = Gtk.SingleSelection.new(sort_model)
+        self._language_menu_selection.set_autoselect(False)
+        self._language_menu_selection.set_can_unselect(True)
+        factory = Gtk.SignalListItemFactory()
+        factory.connect('setup', self._on_language_menu_popover_item_setup)
+        factory.connect('bind', self._on_language_menu_popover_item_bind)
+        listview = Gtk.ListView.new(self._language_menu_selection, factory)
+        listview.set_vexpand(True)
+        listview.set_single_click_activate(True)
+        listview.connect('activate', self._on_language_menu_popover_listview_activate)
+        self._language_menu_popover_scroll.set_child(listview)
+        vbox_language_dropdown.append(self._language_menu_popover_scroll)
+        self._language_menu_popover.set_child(vbox_language_dropdown)
+
+    def _language_menu_filter_func(self, item: Gtk.StringObject) -> bool:
+        '''Whether a language matches the text in the search entry'''
+        return item.get_string() in self._language_menu_ranks
+
+    def _language_menu_sort_func(
+            self, item1: Gtk.StringObject, item2: Gtk.StringObject) -> int:
+        '''The currently selected language first, then the best matches'''
+        keys = [(language_id != self._currently_selected_language,
+                 self._language_menu_ranks.get(language_id, 0))
+                for language_id in (item1.get_string(), item2.get_string())]
+        if keys[0] < keys[1]:
+            return Gtk.Ordering.SMALLER
+        if keys[0] > keys[1]:
+            return Gtk.Ordering.LARGER
+        return Gtk.Ordering.EQUAL
+
+    def _on_language_menu_popover_item_setup(
+            self, _factory: Gtk.SignalListItemFactory,
+            list_item: Gtk.ListItem) -> None:
+        '''Create the widget for a row of the language list'''
+        label = Gtk.Label()
+        label.set_xalign(0)
+        list_item.set_child(label)
+
+    def _on_language_menu_popover_item_bind(
+            self, _factory: Gtk.SignalListItemFactory,
+            list_item: Gtk.ListItem) -> None:
+        '''Show a language in a (possibly recycled) row widget'''
+        list_item.get_child().set_text(
+            self._language_menu_popover_listbox_fill_row(
+                list_item.get_item().get_string()))
+
     def _language_menu_popover_listbox_fill(self, filter_text: str) -> None:
-        '''Fill the list of languages to choose from'''
-        LOGGER.debug('Filling list of languages to choose from')
-        self._language_menu_popover_language_ids = []
-        if self._language_menu_popover_scroll is None:
-            LOGGER.debug('self._language_menu_popover_scroll is None')
+        '''Filter the list of languages to choose from'''
+        LOGGER.debug('Filtering list of languages to choose from')
+        if self._language_menu_selection is None:
+            LOGGER.debug('language menu popover not built yet')
             return
-        listbox = Gtk.ListBox()
-        listbox.set_vexpand(True)
-        listbox.set_selection_mode(Gtk.SelectionMode.SINGLE)
-        listbox.set_activate_on_single_click(False)
-        rows = []
-        filter_words = remove_accents(filter_text.lower()).split()
-        currently_selected_visible = False
-        for language_id in sorted(list_languages()):
-            text_to_match = locale_text_to_match(language_id)
-            filter_match = True
-            text_to_match_words = text_to_match.split(' ')
-            text_to_match_words = [element.replace("(","") for element in text_to_match_words if element]
-            text_to_match_words = [element.replace(")","") for element in text_to_match_words if element]
-            str_filter_words = ' '.join([str(elem) for elem in filter_words])
-            length = len(str_filter_words)
-            make_list = []
-            for ele in text_to_match_words:
-                ele_str = ""
-                i=0
-                while (i != length and len(str(ele)) >= length):
-                    ele_str += ele[i]
-                    i += 1
-                make_list.append(ele_str)
-            if str_filter_words not in make_list:
-                filter_match = False
-            if filter_match:
-                if language_id != self._currently_selected_language:
-                    self._language_menu_popover_language_ids.append(language_id)
-                    rows.append(
-                            self._language_menu_popover_listbox_fill_row(language_id))
-                else:
-                    self._language_menu_popover_language_ids.insert(0, language_id)
-                    rows.insert(0, self._language_menu_popover_listbox_fill_row(language_id))
-                    currently_selected_visible = True
-        for row in rows:
-            label = Gtk.Label()
-            label.set_text(row)
-            label.set_xalign(0)
-            listbox.append(label)
-        if currently_selected_visible:
-            listbox.select_row(listbox.get_row_at_index(0))
-        listbox.connect(
-                'row-selected',
-                self._on_language_menu_popover_listbox_row_selected)
-        self._language_menu_popover_scroll.set_child(listbox)
-
-    def _on_language_menu_popover_listbox_row_selected(
-            self, _listbox: Gtk.ListBox, listbox_row: Gtk.ListBoxRow) -> None:
+        registry = get_language_registry()
+        if registry is not self._language_menu_registry:
+            # Fonts or locales have changed, the registry was rebuilt
+            self._language_menu_registry = registry
+            self._language_menu_model.splice(
+                0, self._language_menu_model.get_n_items(),
+                registry.sorted_language_ids())
+        self._language_menu_ranks = {
+            language_id: rank
+            for rank, language_id in enumerate(registry.search(filter_text))}
+        self._language_menu_filter.changed(Gtk.FilterChange.DIFFERENT)
+        self._language_menu_sorter.changed(Gtk.SorterChange.DIFFERENT)
+        sort_model = self._language_menu_selection.get_model()
+        if (sort_model.get_n_items()
+                and sort_model.get_item(0).get_string() == self._currently_selected_language):
+            self._language_menu_selection.set_selected(0)
+        else:
+            self._language_menu_selection.set_selected(Gtk.INVALID_LIST_POSITION)
+
+    @traced('handler')
+    def _on_language_menu_popover_listview_activate(
+            self, _listview: Gtk.ListView, position: int) -> None:
         '''Called when a language is selected'''
-        LOGGER.debug('Listbox row selected')
-        if not listbox_row:
+        LOGGER.debug('Language list row activated')
+        item = self._language_menu_selection.get_model().get_item(position)
+        if not item:
             return
-        index = listbox_row.get_index()
-        language_id = self._language_menu_popover_language_ids[index]
+        language_id = item.get_string()
         self._currently_selected_language = language_id
         self._language_menu_popover.popdown()
         self._language_menu_button.set_label(language_id)
@@ -1182,7 +1943,6 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
         if GTK_VERSION < (4, 9, 3):
             self.button1.set_filter_func(self.font_filter)
             self.button2.set_filter_func(self.font_filter)
-        self._language_menu_popover_language_ids = []
         LOGGER.info('language selected from menu = %s', language_id)
         text = self.sample_text_selector(language_id)
         self.custom_dialog = CustomDialog(self, transient_for=self)
@@ -1198,59 +1958,44 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
             self.button2.set_preview_text(text)
         self.set_font(language_id, text, update_language_filter=True)
         #detect language by langdetect
-        text = self.custom_dialog.entry_edit_labels.get_text()
-        lang = self.detect_language(text)
+        self.detect_language_later(
+            self.custom_dialog.entry_edit_labels.get_text(),
+            self._set_language_tooltip)
+
+    def _set_language_tooltip(self, lang: str) -> None:
+        '''Show the name of the detected language as tooltip of the language menu'''
         lc_messages = locale.getlocale(locale.LC_MESSAGES)[0]
         label_lang_full_form = langtable.language_name(
                 languageId=lang,
                 languageIdQuery=lc_messages)
         LOGGER.debug('label_lang_full_form=%s', label_lang_full_form)
         self._language_menu_button.set_tooltip_text(label_lang_full_form)
-        if self.fontversion_checkbox.get_active() is True:
-            self.fontversion_checkbox.set_active(False)
-            self.fontversion_checkbox.set_active(True)
 
+    @traced('handler')
     def _on_language_menu_popover_show(self, popover: Gtk.Popover) -> None:
         '''Called when the language menu popover is shown'''
         LOGGER.debug('Language menu popover is shown')
         if popover is None:
             LOGGER.error('popover is None, should never happen')
             return
-        vbox_language_dropdown = Gtk.Box()
-        vbox_language_dropdown.set_orientation(Gtk.Orientation.VERTICAL)
-        label = Gtk.Label()
-        label.set_text('Use language')
-        label.set_halign(Gtk.Align.FILL)
-        vbox_language_dropdown.append(label)
-        self.search_entry = Gtk.SearchEntry()
-        self.search_entry.set_can_focus(True)
-        self.search_entry.set_halign(Gtk.Align.FILL)
-        vbox_language_dropdown.append(self.search_entry)
-        self.search_entry.changed_signal_id = self.search_entry.connect(
-                'search-changed', self._on_language_search_entry_changed)
+        if self._language_menu_selection is None:
+            self._language_menu_popover_build()
+        # Pick up fonts or locales installed since the menu was last shown
+        get_language_registry(check_stale=True)
+        with self.search_entry.handler_block(self.search_entry.changed_signal_id):
+            self.search_entry.set_text('')
         self._language_menu_popover_listbox_fill('')
-        if self._language_menu_popover_scroll.get_parent():
-            # self._language_menu_popover_scroll has already been
-            # added to another vbox in a previous call to this
-            # function remove it from there to be able to reparent it:
-            self._language_menu_popover_scroll.get_parent().remove(
-                    self._language_menu_popover_scroll)
         # Set both scrollbars to their lowest values:
         hadjustment = self._language_menu_popover_scroll.get_hadjustment()
         hadjustment.set_value(hadjustment.get_lower())
         vadjustment = self._language_menu_popover_scroll.get_vadjustment()
         vadjustment.set_value(vadjustment.get_lower())
-        vbox_language_dropdown.append(self._language_menu_popover_scroll)
-        popover.set_child(vbox_language_dropdown)
         self.search_entry.grab_focus()
 
     def label_button_set_after_entry_dialog_ok(self, text:str, lang:str, langdetect_checkbox_state: bool):
-        self.label1.set_text(text)
-        self.label2.set_text(text)
+        self.update_state(text=text)
         global lang_before_ok_response
         if not langdetect_checkbox_state:
-            self.label1.set_text(text)
-            self.label2.set_text(text)
             LOGGER.info("lang detect checkbox off so using dropdown lang=%s", lang_before_ok_response)
             self.set_font(lang_before_ok_response, text)
             return
@@ -1270,36 +2015,17 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
             self.button2.set_filter_func(self.font_filter)
             self._language_menu_popover_listbox_fill('')
         elif not lang in list_dropdown and langdetect_checkbox_state == True:
-            self.label1.set_markup('<span font="'
-                                   +self.get_default_font_family_for_language(lang)
-                                   +' '+FONTSIZE+'"' + FALLPARAM
-                                   + text + '</span>')
-            LOGGER.info('self.button1.set_font(%s)',
-                        self.get_default_font_family_for_language(lang)
-                        +' '+FONTSIZE)
-            self.button1.set_font(
-                    self.get_default_font_family_for_language(lang)
-                    +' '+FONTSIZE)
-            LOGGER.info('self.button1.get_font(%s)',self.button1.get_font())
-            self.label2.set_markup('<span font="'
-                                   +self.get_default_font_family_for_language(lang)
-                                   +' '+FONTSIZE+'"' + FALLPARAM
-                                   + text + '</span>')
-            LOGGER.info('self.button2.set_font(%s)',
-                        self.get_default_font_family_for_language(lang)
-                        +' '+ FONTSIZE)
-            self.button2.set_font(
-                    self.get_default_font_family_for_language(lang)
-                    +' '+ FONTSIZE)
-            LOGGER.info('self.button2.get_font(%s)',self.button2.get_font())
+            self.update_state(text=text, resolving=True)
+            self._submit_font_job(
+                'fonts', resolve_font_families,
+                (lang, self._language_menu_button.get_label(), False),
+                functools.partial(self._apply_default_font, text),
+                FontResolution(lang, '', '', ''))
 
     def label_button_set_after_entry_dialog_ok_newversion(self, text:str, lang:str, langdetect_checkbox_state: bool):
-        self.label1.set_text(text)
-        self.label2.set_text(text)
+        self.update_state(text=text)
         global lang_before_ok_response
         if not langdetect_checkbox_state:
-            self.label1.set_text(text)
-            self.label2.set_text(text)
             LOGGER.info("lang detect checkbox off so using dropdown lang=%s", lang_before_ok_response)
             self.set_font(lang_before_ok_response, text)
             return
@@ -1314,348 +2040,2709 @@ class AppWindow(Adw.ApplicationWindow): # type: ignore
             # Language filter is already set in set_font(), no need to set it again here
             self._language_menu_popover_listbox_fill('')
         elif not lang in list_dropdown and langdetect_checkbox_state == True:
-            self.label1.set_markup('<span font="'
-                                   +self.get_default_font_family_for_language(lang)
-                                   +' '+FONTSIZE+'"' + FALLPARAM
-                                   + text + '</span>')
-            LOGGER.info('self.font_dialog_button1.set_font(%s)',
-                        self.get_default_font_family_for_language(lang)
-                        +' '+FONTSIZE)
-            self.font_dialog_button1.set_font_desc(Pango.font_description_from_string(
-                    self.get_default_font_family_for_language(lang)
-                    +' '+FONTSIZE))
-            LOGGER.info('self.font_dialog_button1.get_font(%s)',self.font_dialog_button1.get_font().to_string())
-            self.label2.set_markup('<span font="'
-                                   +self.get_default_font_family_for_language(lang)
-                                   +' '+FONTSIZE+'"' + FALLPARAM
-                                   + text + '</span>')
-            LOGGER.info('self.font_dialog_button2.set_font_desc(%s)',
-                        self.get_default_font_family_for_language(lang)
-                        +' '+ FONTSIZE)
-            self.font_dialog_button2.set_font_desc(Pango.font_description_from_string(
-                    self.get_default_font_family_for_language(lang)
-                    +' '+ FONTSIZE))
-            LOGGER.info('self.font_dialog_button2.get_font_desc(%s)',self.font_dialog_button2.get_font_desc().to_string())
-            if len(text) > 40 or int(FONTSIZE) > 60:
-                self.label1.set_wrap(True)
-                self.label1.set_wrap_mode(Pango.WrapMode.WORD_CHAR)
-                self.label1.set_max_width_chars(60)
-                self.label1.set_width_chars(60)
-                self.label2.set_wrap(True)
-                self.label2.set_wrap_mode(Pango.WrapMode.WORD_CHAR)
-                self.label1.set_max_width_chars(60)
-                self.label1.set_width_chars(60)
-                self.wrap_checkbox.set_active(True)
-            else:
-                self.label1.set_wrap(False)
-                self.label2.set_wrap(False)
-                self.wrap_checkbox.set_active(False)
+            self.update_state(text=text, resolving=True)
+            self._submit_font_job(
+                'fonts', resolve_font_families,
+                (lang, self._language_menu_button.get_label(), False),
+                functools.partial(self._apply_default_font, text),
+                FontResolution(lang, '', '', ''))
+
+    def _apply_default_font(self, text: str, resolution: 'FontResolution') -> None:
+        '''
+        Show text in the default font of a language which is not in
+        the language menu in both labels
+        '''
+        default_font = FontSelection(resolution.first_family)
+        LOGGER.info('default font for both labels: %s', default_font.family)
+        self.update_state(
+            text=text, fonts=(default_font, default_font), resolving=False)
+        if GTK_VERSION >= (4, 9, 3):
+            self.wrap_checkbox.set_active(
+                len(text) > 40 or self._state.font_size > 60)
 
+    @traced('handler')
     def on_entry_changed(self, widget: Gtk.Entry, _property_spec: Any) -> None:
         '''Called when the text in the entry has changed.
 
         While typing on gtk entry box, the language is detected
         automatically time and then the font family and fontsize to
         display the text on label_langdetect is changed accordingly.
+
+        The detection runs in a worker thread once the text has not
+        changed for LANGDETECT_DEBOUNCE_MS, results for outdated texts
+        are dropped.
         '''
         text = self.custom_dialog.entry_edit_labels.get_text()
-        lang = self.detect_language(text)
-        LOGGER.info('text=%s lang=%s', text, lang)
+        self.custom_dialog.temp_text_custom_dialog = text
+        self._cancel_language_detection()
+        self._language_detection_timeout_id = GLib.timeout_add(
+            LANGDETECT_DEBOUNCE_MS, self._start_language_detection,
+            text, self._language_detection_generation)
+
+    def _cancel_language_detection(self) -> None:
+        '''Drop pending language detections of the edit dialog'''
+        self._language_detection_generation += 1
+        if self._language_detection_timeout_id is not None:
+            GLib.source_remove(self._language_detection_timeout_id)
+            self._language_detection_timeout_id = None
+        if self._language_detection_future is not None:
+            # Only succeeds if the worker has not started it yet
+            self._language_detection_future.cancel()
+            self._language_detection_future = None
+
+    def _start_language_detection(self, text: str, generation: int) -> bool:
+        '''Hand the text of the edit dialog to the langdetect worker'''
+        self._language_detection_timeout_id = None
+        future = LANGDETECT_EXECUTOR.submit(detect_language, text)
+        self._language_detection_future = future
+        future.add_done_callback(
+            lambda done: GLib.idle_add(
+                self._on_language_detected, text, generation, done))
+        return False
 
+    @traced('handler')
+    def _on_language_detected(
+            self, text: str, generation: int,
+            future: concurrent.futures.Future) -> bool:
+        '''Show the language detected in the worker, in the main loop'''
+        if generation != self._language_detection_generation or future.cancelled():
+            LOGGER.debug('Dropping outdated language detection of %s', text)
+            return False
+        self._language_detection_future = None
+        try:
+            lang = future.result()
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Problem detecting language: %s: %s',
+                             error.__class__.__name__, error)
+            lang = 'en'
         LOGGER.info('Detected language: %s, Text: %s', lang, text)
 
         self.custom_dialog.temp_lang_custom_dialog = lang
         self.update_language_filter(lang)
-        
+
         lc_messages = locale.getlocale(locale.LC_MESSAGES)[0]
-        lc_messages_lang = 'en'
-        if lc_messages:
-            lc_messages_lang = lc_messages.split('_')[0]
         label_lang_full_form = langtable.language_name(
                 languageId=lang, languageIdQuery=lc_messages)
         LOGGER.info('label_lang full form=%s',label_lang_full_form)
         self._language_menu_button.set_tooltip_text(label_lang_full_form)
         self.custom_dialog.langdetect_edit_labels.set_markup(
                 '<span font="'
-                +self.get_default_font_family_for_language(lc_messages_lang)
-                +' '+'15'+'"' + FALLPARAM
+                +self.custom_dialog.langdetect_label_font
+                +' '+'15'+'"' + fallback_param(self._state.fallback)
                 + label_lang_full_form + '</span>')
         self.custom_dialog.temp_text_custom_dialog = text
         self.custom_dialog.temp_lang_custom_dialog = lang
+        return False
 
-    def detect_language(self, text: str) -> str:
+    def detect_language_later(self, text: str, callback: Any) -> None:
         '''
-        detecting language by langdetect and
-        any langugage is not there in my dictionary then
-        it'll only return the 'en' by default
+        Detect the language of text in LANGDETECT_EXECUTOR and pass it
+        to callback in the main loop, 'en' if detection fails
         '''
-        text = text.strip()
-        LOGGER.info('Trying to detect language of: %s', text)
-        lang = 'en'
-        if text:
-            try:
-                lang = langdetect.detect(text)
-            except langdetect.LangDetectException as error:
-                LOGGER.exception('Problem detecting language: %s: %s',
-                                 error.__class__.__name__, error)
-                lang = 'en'
-        if '-' in lang:
-            (first, rest) = lang.split('-', maxsplit=1)
-            lang = first + '_' + rest.upper()
-        return lang
+        future = LANGDETECT_EXECUTOR.submit(detect_language, text)
+        future.add_done_callback(
+            lambda done: GLib.idle_add(self._on_detected_later, done, callback))
+
+    def _on_detected_later(
+            self, future: concurrent.futures.Future, callback: Any) -> bool:
+        '''Hand the language detected for detect_language_later() to its callback'''
+        try:
+            lang = future.result()
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Problem detecting language: %s: %s',
+                             error.__class__.__name__, error)
+            lang = 'en'
+        callback(lang)
+        return False
+
+    def show_text(self, text: str, update_language_filter: bool = False) -> None:
+        '''
+        Compare text in the language it is written in.  The labels
+        show the text dimmed until its language and fonts are known.
+        '''
+        self.update_state(text=text, resolving=True)
+        self.detect_language_later(
+            text, functools.partial(self._show_text_in_language,
+                                    text, update_language_filter))
+
+    def _show_text_in_language(
+            self, text: str, update_language_filter: bool, language: str) -> None:
+        '''Select the language detected for show_text()'''
+        LOGGER.info('showing %s in the window: %s', language, text)
+        self._language_menu_button.set_label(language)
+        self._currently_selected_language = language
+        self.set_font(language, text, update_language_filter=update_language_filter)
 
     def get_default_font_family_for_language(self, lang: str) -> str:
         '''
         getting default font by fc-match
         '''
-        global first_font_saved
-        first_font_saved = ''
-        lang = lang.replace('_','-')
-        LOGGER.info('language: %s',lang)
-        fc_match_binary = shutil.which('fc-match')
-        if not fc_match_binary:
-            return ''
+        default_font = default_font_family_for_language(
+            lang, self._language_menu_button.get_label())
+        LOGGER.info('default font for %s = %s', lang, default_font)
+        return default_font
+
+    def _show_font_availability(
+            self, lang: str, other_font: str, label_family: str) -> None:
+        '''
+        Show the error label if there is no other font for lang
+        '''
+        if other_font:
+            #diable error label when font available
+            if GTK_VERSION >= (4, 9, 3):
+                self.label_error.set_property("visible", False)
+            else:
+                self.label_error.hide()
+            return
+        LOGGER.info('fonts are not installed for %s language',lang)
+        #error level show no font installed
+        label_error_text = ("NOTE : fonts are not installed for "
+                            + lang.replace('_','-') + " language")
+        self.label_error.set_markup('<span foreground='+"'red'"+ 'font="'
+                                    +label_family
+                                    +' '+'10'+'"' + fallback_param(self._state.fallback)
+                                    + '<b>' + label_error_text + '</b>'
+                                    + '</span>')
+        self.label_error.set_visible(True)
+
+    def update_language_filter(self, detected_lang: str) -> None:
+        '''
+        Updates the language filter for font selection and menu based on detected language.
+        Note: For GTK >= 4.9.3, language filter is NOT set here.
+        The filter is set in set_font() when fonts are actually updated.
+        '''
+        LOGGER.info(f'Updating language filter for detected language: {detected_lang}')
+        if detected_lang in get_language_registry():
+            if GTK_VERSION >= (4, 9, 3):
+                LOGGER.info('Language filter will be set when fonts are updated')
+            else:
+                self.button1.set_filter_func(self.font_filter)
+                self.button2.set_filter_func(self.font_filter)
+            self._language_menu_button.set_tooltip_text(
+                langtable.language_name(languageId=detected_lang, languageIdQuery='en')
+            )
+
+    @traced('handler')
+    def _on_key_press_global(self, controller, keyval, keycode, state):
+        ctrl = state & Gdk.ModifierType.CONTROL_MASK
+        key = Gdk.keyval_name(keyval)
+        if self._main_menu_popover.get_visible():
+            self._main_menu_popover.popdown()
+        if ctrl and key == "q":
+            self.close()
+            return True
+        elif ctrl and key == "e":
+            self._on_edit_label_button_clicked(None)
+            return True
+
+        return False
+
+def command_line_language(args: Any, environ: Dict[str, str]) -> Optional[str]:
+    '''
+    Return the language to show for parsed command line arguments:
+    the --lang language or else the language of the locale in the
+    environment of the invocation.  None if --lang or the locale gives
+    a language which is not supported.
+    '''
+    list_dropdown = KnownLanguages()
+    if not args.lang:
+        with trace_span('parse_lc_all_lang', 'startup'):
+            return parse_lc_all_lang(list_dropdown, environ)
+    cli_language = args.lang
+    if '-' in cli_language or '_' in cli_language:
+        if '-' in cli_language:
+            (f,r) = cli_language.split('-', maxsplit=1)
+        else:
+            (f,r) = cli_language.split('_', maxsplit=1)
+        cli_language = f + '_' + r.upper()
+        if cli_language not in list_dropdown:
+            cli_language = cli_language.split('_')[0]
+    if cli_language not in list_dropdown:
+        return None
+    return cli_language
+
+def command_line_print(command_line: Gio.ApplicationCommandLine, *values: Any) -> None:
+    '''print() on the terminal of a fonts-compare invocation'''
+    message = ' '.join(str(value) for value in values) + '\n'
+    # Gio.ApplicationCommandLine.print_literal() needs GLib 2.80
+    if hasattr(command_line, 'print_literal'):
+        command_line.print_literal(message)
+    else:
+        print(message, end='')
+
+# Font changes are applied when no more changes came for this long,
+# installing a font package changes many files
+FONT_DIRECTORY_SETTLE_MS = 1000
+
+class FontDirectoryMonitor:
+    '''
+    Watches the font directories with Gio file monitors and updates
+    the font catalog, the language registry and the windows when fonts
+    are added, changed or removed, see update_font_catalog().
+
+    For a font directory root which does not exist (yet), the nearest
+    parent which exists is watched until the root is created.
+    '''
+    def __init__(self, application: Adw.Application) -> None:
+        self._application = application
+        self._roots: List[str] = []
+        self._monitors: Dict[str, Gio.FileMonitor] = {}
+        self._parent_monitors: Dict[str, Gio.FileMonitor] = {}
+        self._missing_roots: Set[str] = set()
+        self._pending: Set[str] = set()
+        self._settle_id: Optional[int] = None
+        self._update_future: Optional[concurrent.futures.Future] = None
+
+    def start(self) -> None:
+        '''Find the font directories in FONTCONFIG_EXECUTOR and watch them'''
+        future = FONTCONFIG_EXECUTOR.submit(self._find_directories)
+        future.add_done_callback(
+            lambda done: GLib.idle_add(self._on_directories_found, done))
+
+    @staticmethod
+    def _find_directories() -> Tuple[List[str], List[str]]:
+        '''Return the font directory roots and the font directories'''
+        roots = font_directory_roots()
+        return (roots, font_directories(roots))
+
+    def _on_directories_found(self, future: concurrent.futures.Future) -> bool:
+        try:
+            (self._roots, directories) = future.result()
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Problem finding the font directories: %s: %s',
+                             error.__class__.__name__, error)
+            return False
+        self.watch(directories)
+        self._watch_missing_roots()
+        LOGGER.info('watching %d font directories, %d parents of missing ones',
+                    len(self._monitors), len(self._parent_monitors))
+        return False
+
+    def _watch_missing_roots(self) -> None:
+        '''
+        Watch the nearest existing parent of each root which does not
+        exist, queue the roots which have appeared since
+        '''
+        parents = set()
+        for root in self._roots:
+            if os.path.isdir(root):
+                if root in self._missing_roots:
+                    self._missing_roots.discard(root)
+                    self._queue(root)
+                continue
+            self._missing_roots.add(root)
+            parent = nearest_existing_directory(root)
+            if parent not in self._monitors:
+                parents.add(parent)
+        for parent in set(self._parent_monitors) - parents:
+            self._parent_monitors.pop(parent).cancel()
+        for parent in parents - set(self._parent_monitors):
+            try:
+                monitor = Gio.File.new_for_path(parent).monitor_directory(
+                    Gio.FileMonitorFlags.WATCH_MOVES, None)
+            except GLib.Error as error:
+                LOGGER.info('Cannot watch %s: %s', parent, error)
+                continue
+            monitor.connect('changed', self._on_parent_changed)
+            self._parent_monitors[parent] = monitor
+
+    def _on_parent_changed(
+            self, _monitor: Gio.FileMonitor, file: Gio.File,
+            other_file: Optional[Gio.File],
+            _event_type: Gio.FileMonitorEvent) -> None:
+        '''Look again for missing roots when a directory on the way appears'''
+        for changed_file in (file, other_file):
+            path = changed_file.get_path() if changed_file is not None else None
+            # Other files in the parent, like in ~/.local/share, are ignored
+            if path and any(root == path or root.startswith(path + os.sep)
+                            for root in self._roots):
+                self._watch_missing_roots()
+                return
+
+    def watch(self, directories: Iterable[str]) -> None:
+        '''Watch directories which are not watched yet'''
+        for directory in directories:
+            if directory in self._monitors:
+                continue
+            try:
+                monitor = Gio.File.new_for_path(directory).monitor_directory(
+                    Gio.FileMonitorFlags.WATCH_MOVES, None)
+            except GLib.Error as error:
+                LOGGER.info('Cannot watch %s: %s', directory, error)
+                continue
+            monitor.connect('changed', self._on_changed)
+            self._monitors[directory] = monitor
+
+    def _on_changed(
+            self, _monitor: Gio.FileMonitor, file: Gio.File,
+            other_file: Optional[Gio.File],
+            event_type: Gio.FileMonitorEvent) -> None:
+        '''Remember the changed file until the changes settle'''
+        if event_type in (Gio.FileMonitorEvent.ATTRIBUTE_CHANGED,
+                          Gio.FileMonitorEvent.PRE_UNMOUNT,
+                          Gio.FileMonitorEvent.UNMOUNTED):
+            return
+        for changed_file in (file, other_file):
+            if changed_file is not None and changed_file.get_path():
+                self._queue(changed_file.get_path())
+
+    def _queue(self, path: str) -> None:
+        '''Update the catalog for path when the changes settle'''
+        self._pending.add(path)
+        if self._settle_id is not None:
+            GLib.source_remove(self._settle_id)
+        self._settle_id = GLib.timeout_add(
+            FONT_DIRECTORY_SETTLE_MS, self._on_settled)
+
+    def _on_settled(self) -> bool:
+        '''Update the catalog for the files changed since the last update'''
+        self._settle_id = None
+        if self._update_future is not None:
+            # Wait for the running update, then start the next one
+            self._settle_id = GLib.timeout_add(
+                FONT_DIRECTORY_SETTLE_MS, self._on_settled)
+            return False
+        paths = self._pending
+        self._pending = set()
+        for path in paths:
+            if path in self._monitors and not os.path.isdir(path):
+                self._monitors.pop(path).cancel()
+        LOGGER.info('fonts changed: %s', ' '.join(sorted(paths)))
+        self._update_future = FONTCONFIG_EXECUTOR.submit(update_font_catalog, paths)
+        self._update_future.add_done_callback(
+            lambda done: GLib.idle_add(self._on_updated, done))
+        return False
+
+    @traced('handler')
+    def _on_updated(self, future: concurrent.futures.Future) -> bool:
+        '''Show the updated fonts in all windows'''
+        self._update_future = None
         try:
-            result = subprocess.run(
-                    [fc_match_binary, f':lang={lang}', 'family', 'style', 'file', 'familylang'],
-                    encoding='utf-8', check=True, capture_output=True,
-                    env={'LC_ALL': lang.replace('-', '_')})
-            pattern = re.compile(r'^(?P<families>.*?(?=:familylang=|$))(?::familylang=(?P<familylang>.*?))?:style=.*$')
-            match = pattern.match(result.stdout.strip())
-            if not match:
-                LOGGER.error('Regexp did not match')
-                return ''
-            families = match.group('families').split(',')
-            families = [f.replace("\\-", "-").strip() for f in families]
-            familylang = match.group('familylang').split(',') if match.group('familylang') else []
-            LOGGER.info('default font families=%s', families)
-            LOGGER.info('default familylang=%s', familylang)
-            last_family = ''
-            if families:
-                current_lang = self._language_menu_button.get_label()
-                if current_lang in str(locale.getlocale(locale.LC_MESSAGES)[0]):
-                    count=0
-                    for i in familylang:
-                        if str(i) in str(locale.getlocale(locale.LC_MESSAGES)[0]):
-                            last_family = families[count]
-                            LOGGER.info('locale lang = %s',locale.getlocale(locale.LC_MESSAGES)[0])
-                            LOGGER.info('selected default font = %s',last_family)
-                            first_font_saved = last_family
-                            LOGGER.info('first button font = %s', first_font_saved)
-                            return last_family
-                    if last_family == '':
-                        last_family = families[-1:][0]
+            update = future.result()
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Problem updating the font catalog: %s: %s',
+                             error.__class__.__name__, error)
+            return False
+        self.watch(update.directories)
+        self._watch_missing_roots()
+        if not update.changed:
+            return False
+        font_map = PangoCairo.FontMap.get_default()
+        # Pango.FontMap.add_font_file() needs Pango 1.56, with older
+        # versions Pango sees the fonts when GTK reloads fontconfig
+        if hasattr(font_map, 'add_font_file'):
+            for file in update.files:
+                try:
+                    font_map.add_font_file(file)
+                except GLib.Error as error:
+                    LOGGER.info('Pango cannot load %s: %s', file, error)
+        font_map.changed()
+        for window in self._application.get_windows():
+            if isinstance(window, AppWindow):
+                window.refresh_fonts(update)
+        return False
+
+FONT_DIRECTORY_MONITOR: Optional[FontDirectoryMonitor] = None
+
+def on_command_line(
+        application: Adw.Application,
+        command_line: Gio.ApplicationCommandLine) -> int:
+    '''
+    Handle the command line of the first invocation of fonts-compare
+    and those GApplication forwards from later invocations while the
+    first one is running, so they use its warm caches.
+
+    Without --new-window, a forwarded --lang or --text is shown in the
+    active window, otherwise a new window is opened.
+    '''
+    try:
+        args = parse_args(command_line.get_arguments()[1:])
+    except SystemExit as error:
+        return error.code if isinstance(error.code, int) else 2
+    environ = dict(variable.split('=', maxsplit=1)
+                   for variable in command_line.get_environ() if '=' in variable)
+    language = command_line_language(args, environ)
+    if language is None and not args.lang:
+        command_line_print(command_line, 'Input language should be supported by fontconfig')
+        return 1
+    if language is None:
+        command_line_print(command_line, 'unsupported language is entered')
+        command_line_print(command_line, 'printing list of languages supported by fontconfig')
+        command_line_print(command_line, sorted(list_languages()))
+        return 1
+    if args.lang:
+        command_line_print(command_line, "initialize fonts-compare with ", language)
+    text = ' '.join(args.text) if args.text else ''
+    # Most recently focused first
+    window = next((window for window in application.get_windows()
+                   if isinstance(window, AppWindow)), None)
+    if window is None or args.new_window:
+        on_activate(application, language, text, bool(args.lang))
+        return 0
+    LOGGER.info('command line forwarded: %s', command_line.get_arguments())
+    if args.lang or text:
+        window.retarget(language, text, bool(args.lang))
+    window.present()
+    return 0
+
+#def on_activate(application: Gtk.Application, language: str, text: str = "") -> None:
+def on_activate(application: Adw.Application, language: str, text: str = "", lang_explicitly_set: bool = False) -> None:
+    '''
+    activating the application by adding the application into gtk window
+    '''
+    global FONT_DIRECTORY_MONITOR
+    win = AppWindow(application, language, lang_explicitly_set)
+    if FONT_DIRECTORY_MONITOR is None:
+        FONT_DIRECTORY_MONITOR = FontDirectoryMonitor(application)
+        FONT_DIRECTORY_MONITOR.start()
+    if text:
+        win.show_text(text)
+
+    win.present()
+    if TRACE_EVENTS is not None:
+        trace_first_frame(win)
+
+def trace_first_frame(win: Gtk.Window) -> None:
+    '''Record when the first frame of a window has been painted'''
+    frame_clock = win.get_frame_clock()
+    if frame_clock is None:
+        return
+    def on_after_paint(clock: Gdk.FrameClock) -> None:
+        trace_event('first frame', 'startup', time.perf_counter())
+        clock.disconnect(handler_id)
+    handler_id = frame_clock.connect('after-paint', on_after_paint)
+
+# Script property (ISO 15924 codes) of all code points, generated from
+# Scripts.txt of Unicode 15.0 as “first code point (hex):script” for
+# each range, a range ends where the next one starts.  Zyyy is Common,
+# Zinh is Inherited and Zzzz is Unknown (unassigned code points).
+SCRIPT_RANGES_DATA = '''
+0:Zyyy 41:Latn 5B:Zyyy 61:Latn 7B:Zyyy AA:Latn AB:Zyyy BA:Latn BB:Zyyy
+C0:Latn D7:Zyyy D8:Latn F7:Zyyy F8:Latn 2B9:Zyyy 2E0:Latn 2E5:Zyyy 2EA:Bopo
+2EC:Zyyy 300:Zinh 370:Grek 374:Zyyy 375:Grek 378:Zzzz 37A:Grek 37E:Zyyy
+37F:Grek 380:Zzzz 384:Grek 385:Zyyy 386:Grek 387:Zyyy 388:Grek 38B:Zzzz
+38C:Grek 38D:Zzzz 38E:Grek 3A2:Zzzz 3A3:Grek 3E2:Copt 3F0:Grek 400:Cyrl
+485:Zinh 487:Cyrl 530:Zzzz 531:Armn 557:Zzzz 559:Armn 58B:Zzzz 58D:Armn
+590:Zzzz 591:Hebr 5C8:Zzzz 5D0:Hebr 5EB:Zzzz 5EF:Hebr 5F5:Zzzz 600:Arab
+605:Zyyy 606:Arab 60C:Zyyy 60D:Arab 61B:Zyyy 61C:Arab 61F:Zyyy 620:Arab
+640:Zyyy 641:Arab 64B:Zinh 656:Arab 670:Zinh 671:Arab 6DD:Zyyy 6DE:Arab
+700:Syrc 70E:Zzzz 70F:Syrc 74B:Zzzz 74D:Syrc 750:Arab 780:Thaa 7B2:Zzzz
+7C0:Nkoo 7FB:Zzzz 7FD:Nkoo 800:Samr 82E:Zzzz 830:Samr 83F:Zzzz 840:Mand
+85C:Zzzz 85E:Mand 85F:Zzzz 860:Syrc 86B:Zzzz 870:Arab 88F:Zzzz 890:Arab
+892:Zzzz 898:Arab 8E2:Zyyy 8E3:Arab 900:Deva 951:Zinh 955:Deva 964:Zyyy
+966:Deva 980:Beng 984:Zzzz 985:Beng 98D:Zzzz 98F:Beng 991:Zzzz 993:Beng
+9A9:Zzzz 9AA:Beng 9B1:Zzzz 9B2:Beng 9B3:Zzzz 9B6:Beng 9BA:Zzzz 9BC:Beng
+9C5:Zzzz 9C7:Beng 9C9:Zzzz 9CB:Beng 9CF:Zzzz 9D7:Beng 9D8:Zzzz 9DC:Beng
+9DE:Zzzz 9DF:Beng 9E4:Zzzz 9E6:Beng 9FF:Zzzz A01:Guru A04:Zzzz A05:Guru
+A0B:Zzzz A0F:Guru A11:Zzzz A13:Guru A29:Zzzz A2A:Guru A31:Zzzz A32:Guru
+A34:Zzzz A35:Guru A37:Zzzz A38:Guru A3A:Zzzz A3C:Guru A3D:Zzzz A3E:Guru
+A43:Zzzz A47:Guru A49:Zzzz A4B:Guru A4E:Zzzz A51:Guru A52:Zzzz A59:Guru
+A5D:Zzzz A5E:Guru A5F:Zzzz A66:Guru A77:Zzzz A81:Gujr A84:Zzzz A85:Gujr
+A8E:Zzzz A8F:Gujr A92:Zzzz A93:Gujr AA9:Zzzz AAA:Gujr AB1:Zzzz AB2:Gujr
+AB4:Zzzz AB5:Gujr ABA:Zzzz ABC:Gujr AC6:Zzzz AC7:Gujr ACA:Zzzz ACB:Gujr
+ACE:Zzzz AD0:Gujr AD1:Zzzz AE0:Gujr AE4:Zzzz AE6:Gujr AF2:Zzzz AF9:Gujr
+B00:Zzzz B01:Orya B04:Zzzz B05:Orya B0D:Zzzz B0F:Orya B11:Zzzz B13:Orya
+B29:Zzzz B2A:Orya B31:Zzzz B32:Orya B34:Zzzz B35:Orya B3A:Zzzz B3C:Orya
+B45:Zzzz B47:Orya B49:Zzzz B4B:Orya B4E:Zzzz B55:Orya B58:Zzzz B5C:Orya
+B5E:Zzzz B5F:Orya B64:Zzzz B66:Orya B78:Zzzz B82:Taml B84:Zzzz B85:Taml
+B8B:Zzzz B8E:Taml B91:Zzzz B92:Taml B96:Zzzz B99:Taml B9B:Zzzz B9C:Taml
+B9D:Zzzz B9E:Taml BA0:Zzzz BA3:Taml BA5:Zzzz BA8:Taml BAB:Zzzz BAE:Taml
+BBA:Zzzz BBE:Taml BC3:Zzzz BC6:Taml BC9:Zzzz BCA:Taml BCE:Zzzz BD0:Taml
+BD1:Zzzz BD7:Taml BD8:Zzzz BE6:Taml BFB:Zzzz C00:Telu C0D:Zzzz C0E:Telu
+C11:Zzzz C12:Telu C29:Zzzz C2A:Telu C3A:Zzzz C3C:Telu C45:Zzzz C46:Telu
+C49:Zzzz C4A:Telu C4E:Zzzz C55:Telu C57:Zzzz C58:Telu C5B:Zzzz C5D:Telu
+C5E:Zzzz C60:Telu C64:Zzzz C66:Telu C70:Zzzz C77:Telu C80:Knda C8D:Zzzz
+C8E:Knda C91:Zzzz C92:Knda CA9:Zzzz CAA:Knda CB4:Zzzz CB5:Knda CBA:Zzzz
+CBC:Knda CC5:Zzzz CC6:Knda CC9:Zzzz CCA:Knda CCE:Zzzz CD5:Knda CD7:Zzzz
+CDD:Knda CDF:Zzzz CE0:Knda CE4:Zzzz CE6:Knda CF0:Zzzz CF1:Knda CF4:Zzzz
+D00:Mlym D0D:Zzzz D0E:Mlym D11:Zzzz D12:Mlym D45:Zzzz D46:Mlym D49:Zzzz
+D4A:Mlym D50:Zzzz D54:Mlym D64:Zzzz D66:Mlym D80:Zzzz D81:Sinh D84:Zzzz
+D85:Sinh D97:Zzzz D9A:Sinh DB2:Zzzz DB3:Sinh DBC:Zzzz DBD:Sinh DBE:Zzzz
+DC0:Sinh DC7:Zzzz DCA:Sinh DCB:Zzzz DCF:Sinh DD5:Zzzz DD6:Sinh DD7:Zzzz
+DD8:Sinh DE0:Zzzz DE6:Sinh DF0:Zzzz DF2:Sinh DF5:Zzzz E01:Thai E3B:Zzzz
+E3F:Zyyy E40:Thai E5C:Zzzz E81:Laoo E83:Zzzz E84:Laoo E85:Zzzz E86:Laoo
+E8B:Zzzz E8C:Laoo EA4:Zzzz EA5:Laoo EA6:Zzzz EA7:Laoo EBE:Zzzz EC0:Laoo
+EC5:Zzzz EC6:Laoo EC7:Zzzz EC8:Laoo ECF:Zzzz ED0:Laoo EDA:Zzzz EDC:Laoo
+EE0:Zzzz F00:Tibt F48:Zzzz F49:Tibt F6D:Zzzz F71:Tibt F98:Zzzz F99:Tibt
+FBD:Zzzz FBE:Tibt FCD:Zzzz FCE:Tibt FD5:Zyyy FD9:Tibt FDB:Zzzz 1000:Mymr
+10A0:Geor 10C6:Zzzz 10C7:Geor 10C8:Zzzz 10CD:Geor 10CE:Zzzz 10D0:Geor
+10FB:Zyyy 10FC:Geor 1100:Hang 1200:Ethi 1249:Zzzz 124A:Ethi 124E:Zzzz
+1250:Ethi 1257:Zzzz 1258:Ethi 1259:Zzzz 125A:Ethi 125E:Zzzz 1260:Ethi
+1289:Zzzz 128A:Ethi 128E:Zzzz 1290:Ethi 12B1:Zzzz 12B2:Ethi 12B6:Zzzz
+12B8:Ethi 12BF:Zzzz 12C0:Ethi 12C1:Zzzz 12C2:Ethi 12C6:Zzzz 12C8:Ethi
+12D7:Zzzz 12D8:Ethi 1311:Zzzz 1312:Ethi 1316:Zzzz 1318:Ethi 135B:Zzzz
+135D:Ethi 137D:Zzzz 1380:Ethi 139A:Zzzz 13A0:Cher 13F6:Zzzz 13F8:Cher
+13FE:Zzzz 1400:Cans 1680:Ogam 169D:Zzzz 16A0:Runr 16EB:Zyyy 16EE:Runr
+16F9:Zzzz 1700:Tglg 1716:Zzzz 171F:Tglg 1720:Hano 1735:Zyyy 1737:Zzzz
+1740:Buhd 1754:Zzzz 1760:Tagb 176D:Zzzz 176E:Tagb 1771:Zzzz 1772:Tagb
+1774:Zzzz 1780:Khmr 17DE:Zzzz 17E0:Khmr 17EA:Zzzz 17F0:Khmr 17FA:Zzzz
+1800:Mong 1802:Zyyy 1804:Mong 1805:Zyyy 1806:Mong 181A:Zzzz 1820:Mong
+1879:Zzzz 1880:Mong 18AB:Zzzz 18B0:Cans 18F6:Zzzz 1900:Limb 191F:Zzzz
+1920:Limb 192C:Zzzz 1930:Limb 193C:Zzzz 1940:Limb 1941:Zzzz 1944:Limb
+1950:Tale 196E:Zzzz 1970:Tale 1975:Zzzz 1980:Talu 19AC:Zzzz 19B0:Talu
+19CA:Zzzz 19D0:Talu 19DB:Zzzz 19DE:Talu 19E0:Khmr 1A00:Bugi 1A1C:Zzzz
+1A1E:Bugi 1A20:Lana 1A5F:Zzzz 1A60:Lana 1A7D:Zzzz 1A7F:Lana 1A8A:Zzzz
+1A90:Lana 1A9A:Zzzz 1AA0:Lana 1AAE:Zzzz 1AB0:Zinh 1ACF:Zzzz 1B00:Bali
+1B4D:Zzzz 1B50:Bali 1B7F:Zzzz 1B80:Sund 1BC0:Batk 1BF4:Zzzz 1BFC:Batk
+1C00:Lepc 1C38:Zzzz 1C3B:Lepc 1C4A:Zzzz 1C4D:Lepc 1C50:Olck 1C80:Cyrl
+1C89:Zzzz 1C90:Geor 1CBB:Zzzz 1CBD:Geor 1CC0:Sund 1CC8:Zzzz 1CD0:Zinh
+1CD3:Zyyy 1CD4:Zinh 1CE1:Zyyy 1CE2:Zinh 1CE9:Zyyy 1CED:Zinh 1CEE:Zyyy
+1CF4:Zinh 1CF5:Zyyy 1CF8:Zinh 1CFA:Zyyy 1CFB:Zzzz 1D00:Latn 1D26:Grek
+1D2B:Cyrl 1D2C:Latn 1D5D:Grek 1D62:Latn 1D66:Grek 1D6B:Latn 1D78:Cyrl
+1D79:Latn 1DBF:Grek 1DC0:Zinh 1E00:Latn 1F00:Grek 1F16:Zzzz 1F18:Grek
+1F1E:Zzzz 1F20:Grek 1F46:Zzzz 1F48:Grek 1F4E:Zzzz 1F50:Grek 1F58:Zzzz
+1F59:Grek 1F5A:Zzzz 1F5B:Grek 1F5C:Zzzz 1F5D:Grek 1F5E:Zzzz 1F5F:Grek
+1F7E:Zzzz 1F80:Grek 1FB5:Zzzz 1FB6:Grek 1FC5:Zzzz 1FC6:Grek 1FD4:Zzzz
+1FD6:Grek 1FDC:Zzzz 1FDD:Grek 1FF0:Zzzz 1FF2:Grek 1FF5:Zzzz 1FF6:Grek
+1FFF:Zzzz 2000:Zyyy 200C:Zinh 200E:Zyyy 2065:Zzzz 2066:Zyyy 2071:Latn
+2072:Zzzz 2074:Zyyy 207F:Latn 2080:Zyyy 208F:Zzzz 2090:Latn 209D:Zzzz
+20A0:Zyyy 20C1:Zzzz 20D0:Zinh 20F1:Zzzz 2100:Zyyy 2126:Grek 2127:Zyyy
+212A:Latn 212C:Zyyy 2132:Latn 2133:Zyyy 214E:Latn 214F:Zyyy 2160:Latn
+2189:Zyyy 218C:Zzzz 2190:Zyyy 2427:Zzzz 2440:Zyyy 244B:Zzzz 2460:Zyyy
+2800:Brai 2900:Zyyy 2B74:Zzzz 2B76:Zyyy 2B96:Zzzz 2B97:Zyyy 2C00:Glag
+2C60:Latn 2C80:Copt 2CF4:Zzzz 2CF9:Copt 2D00:Geor 2D26:Zzzz 2D27:Geor
+2D28:Zzzz 2D2D:Geor 2D2E:Zzzz 2D30:Tfng 2D68:Zzzz 2D6F:Tfng 2D71:Zzzz
+2D7F:Tfng 2D80:Ethi 2D97:Zzzz 2DA0:Ethi 2DA7:Zzzz 2DA8:Ethi 2DAF:Zzzz
+2DB0:Ethi 2DB7:Zzzz 2DB8:Ethi 2DBF:Zzzz 2DC0:Ethi 2DC7:Zzzz 2DC8:Ethi
+2DCF:Zzzz 2DD0:Ethi 2DD7:Zzzz 2DD8:Ethi 2DDF:Zzzz 2DE0:Cyrl 2E00:Zyyy
+2E5E:Zzzz 2E80:Hani 2E9A:Zzzz 2E9B:Hani 2EF4:Zzzz 2F00:Hani 2FD6:Zzzz
+2FF0:Zyyy 2FFC:Zzzz 3000:Zyyy 3005:Hani 3006:Zyyy 3007:Hani 3008:Zyyy
+3021:Hani 302A:Zinh 302E:Hang 3030:Zyyy 3038:Hani 303C:Zyyy 3040:Zzzz
+3041:Hira 3097:Zzzz 3099:Zinh 309B:Zyyy 309D:Hira 30A0:Zyyy 30A1:Kana
+30FB:Zyyy 30FD:Kana 3100:Zzzz 3105:Bopo 3130:Zzzz 3131:Hang 318F:Zzzz
+3190:Zyyy 31A0:Bopo 31C0:Zyyy 31E4:Zzzz 31F0:Kana 3200:Hang 321F:Zzzz
+3220:Zyyy 3260:Hang 327F:Zyyy 32D0:Kana 32FF:Zyyy 3300:Kana 3358:Zyyy
+3400:Hani 4DC0:Zyyy 4E00:Hani A000:Yiii A48D:Zzzz A490:Yiii A4C7:Zzzz
+A4D0:Lisu A500:Vaii A62C:Zzzz A640:Cyrl A6A0:Bamu A6F8:Zzzz A700:Zyyy
+A722:Latn A788:Zyyy A78B:Latn A7CB:Zzzz A7D0:Latn A7D2:Zzzz A7D3:Latn
+A7D4:Zzzz A7D5:Latn A7DA:Zzzz A7F2:Latn A800:Sylo A82D:Zzzz A830:Zyyy
+A83A:Zzzz A840:Phag A878:Zzzz A880:Saur A8C6:Zzzz A8CE:Saur A8DA:Zzzz
+A8E0:Deva A900:Kali A92E:Zyyy A92F:Kali A930:Rjng A954:Zzzz A95F:Rjng
+A960:Hang A97D:Zzzz A980:Java A9CE:Zzzz A9CF:Zyyy A9D0:Java A9DA:Zzzz
+A9DE:Java A9E0:Mymr A9FF:Zzzz AA00:Cham AA37:Zzzz AA40:Cham AA4E:Zzzz
+AA50:Cham AA5A:Zzzz AA5C:Cham AA60:Mymr AA80:Tavt AAC3:Zzzz AADB:Tavt
+AAE0:Mtei AAF7:Zzzz AB01:Ethi AB07:Zzzz AB09:Ethi AB0F:Zzzz AB11:Ethi
+AB17:Zzzz AB20:Ethi AB27:Zzzz AB28:Ethi AB2F:Zzzz AB30:Latn AB5B:Zyyy
+AB5C:Latn AB65:Grek AB66:Latn AB6A:Zyyy AB6C:Zzzz AB70:Cher ABC0:Mtei
+ABEE:Zzzz ABF0:Mtei ABFA:Zzzz AC00:Hang D7A4:Zzzz D7B0:Hang D7C7:Zzzz
+D7CB:Hang D7FC:Zzzz F900:Hani FA6E:Zzzz FA70:Hani FADA:Zzzz FB00:Latn
+FB07:Zzzz FB13:Armn FB18:Zzzz FB1D:Hebr FB37:Zzzz FB38:Hebr FB3D:Zzzz
+FB3E:Hebr FB3F:Zzzz FB40:Hebr FB42:Zzzz FB43:Hebr FB45:Zzzz FB46:Hebr
+FB50:Arab FBC3:Zzzz FBD3:Arab FD3E:Zyyy FD40:Arab FD90:Zzzz FD92:Arab
+FDC8:Zzzz FDCF:Arab FDD0:Zzzz FDF0:Arab FE00:Zinh FE10:Zyyy FE1A:Zzzz
+FE20:Zinh FE2E:Cyrl FE30:Zyyy FE53:Zzzz FE54:Zyyy FE67:Zzzz FE68:Zyyy
+FE6C:Zzzz FE70:Arab FE75:Zzzz FE76:Arab FEFD:Zzzz FEFF:Zyyy FF00:Zzzz
+FF01:Zyyy FF21:Latn FF3B:Zyyy FF41:Latn FF5B:Zyyy FF66:Kana FF70:Zyyy
+FF71:Kana FF9E:Zyyy FFA0:Hang FFBF:Zzzz FFC2:Hang FFC8:Zzzz FFCA:Hang
+FFD0:Zzzz FFD2:Hang FFD8:Zzzz FFDA:Hang FFDD:Zzzz FFE0:Zyyy FFE7:Zzzz
+FFE8:Zyyy FFEF:Zzzz FFF9:Zyyy FFFE:Zzzz 10000:Linb 1000C:Zzzz 1000D:Linb
+10027:Zzzz 10028:Linb 1003B:Zzzz 1003C:Linb 1003E:Zzzz 1003F:Linb 1004E:Zzzz
+10050:Linb 1005E:Zzzz 10080:Linb 100FB:Zzzz 10100:Zyyy 10103:Zzzz 10107:Zyyy
+10134:Zzzz 10137:Zyyy 10140:Grek 1018F:Zzzz 10190:Zyyy 1019D:Zzzz 101A0:Grek
+101A1:Zzzz 101D0:Zyyy 101FD:Zinh 101FE:Zzzz 10280:Lyci 1029D:Zzzz 102A0:Cari
+102D1:Zzzz 102E0:Zinh 102E1:Zyyy 102FC:Zzzz 10300:Ital 10324:Zzzz 1032D:Ital
+10330:Goth 1034B:Zzzz 10350:Perm 1037B:Zzzz 10380:Ugar 1039E:Zzzz 1039F:Ugar
+103A0:Xpeo 103C4:Zzzz 103C8:Xpeo 103D6:Zzzz 10400:Dsrt 10450:Shaw 10480:Osma
+1049E:Zzzz 104A0:Osma 104AA:Zzzz 104B0:Osge 104D4:Zzzz 104D8:Osge 104FC:Zzzz
+10500:Elba 10528:Zzzz 10530:Aghb 10564:Zzzz 1056F:Aghb 10570:Vith 1057B:Zzzz
+1057C:Vith 1058B:Zzzz 1058C:Vith 10593:Zzzz 10594:Vith 10596:Zzzz 10597:Vith
+105A2:Zzzz 105A3:Vith 105B2:Zzzz 105B3:Vith 105BA:Zzzz 105BB:Vith 105BD:Zzzz
+10600:Lina 10737:Zzzz 10740:Lina 10756:Zzzz 10760:Lina 10768:Zzzz 10780:Latn
+10786:Zzzz 10787:Latn 107B1:Zzzz 107B2:Latn 107BB:Zzzz 10800:Cprt 10806:Zzzz
+10808:Cprt 10809:Zzzz 1080A:Cprt 10836:Zzzz 10837:Cprt 10839:Zzzz 1083C:Cprt
+1083D:Zzzz 1083F:Cprt 10840:Armi 10856:Zzzz 10857:Armi 10860:Palm 10880:Nbat
+1089F:Zzzz 108A7:Nbat 108B0:Zzzz 108E0:Hatr 108F3:Zzzz 108F4:Hatr 108F6:Zzzz
+108FB:Hatr 10900:Phnx 1091C:Zzzz 1091F:Phnx 10920:Lydi 1093A:Zzzz 1093F:Lydi
+10940:Zzzz 10980:Mero 109A0:Merc 109B8:Zzzz 109BC:Merc 109D0:Zzzz 109D2:Merc
+10A00:Khar 10A04:Zzzz 10A05:Khar 10A07:Zzzz 10A0C:Khar 10A14:Zzzz 10A15:Khar
+10A18:Zzzz 10A19:Khar 10A36:Zzzz 10A38:Khar 10A3B:Zzzz 10A3F:Khar 10A49:Zzzz
+10A50:Khar 10A59:Zzzz 10A60:Sarb 10A80:Narb 10AA0:Zzzz 10AC0:Mani 10AE7:Zzzz
+10AEB:Mani 10AF7:Zzzz 10B00:Avst 10B36:Zzzz 10B39:Avst 10B40:Prti 10B56:Zzzz
+10B58:Prti 10B60:Phli 10B73:Zzzz 10B78:Phli 10B80:Phlp 10B92:Zzzz 10B99:Phlp
+10B9D:Zzzz 10BA9:Phlp 10BB0:Zzzz 10C00:Orkh 10C49:Zzzz 10C80:Hung 10CB3:Zzzz
+10CC0:Hung 10CF3:Zzzz 10CFA:Hung 10D00:Rohg 10D28:Zzzz 10D30:Rohg 10D3A:Zzzz
+10E60:Arab 10E7F:Zzzz 10E80:Yezi 10EAA:Zzzz 10EAB:Yezi 10EAE:Zzzz 10EB0:Yezi
+10EB2:Zzzz 10EFD:Arab 10F00:Sogo 10F28:Zzzz 10F30:Sogd 10F5A:Zzzz 10F70:Ougr
+10F8A:Zzzz 10FB0:Chrs 10FCC:Zzzz 10FE0:Elym 10FF7:Zzzz 11000:Brah 1104E:Zzzz
+11052:Brah 11076:Zzzz 1107F:Brah 11080:Kthi 110C3:Zzzz 110CD:Kthi 110CE:Zzzz
+110D0:Sora 110E9:Zzzz 110F0:Sora 110FA:Zzzz 11100:Cakm 11135:Zzzz 11136:Cakm
+11148:Zzzz 11150:Mahj 11177:Zzzz 11180:Shrd 111E0:Zzzz 111E1:Sinh 111F5:Zzzz
+11200:Khoj 11212:Zzzz 11213:Khoj 11242:Zzzz 11280:Mult 11287:Zzzz 11288:Mult
+11289:Zzzz 1128A:Mult 1128E:Zzzz 1128F:Mult 1129E:Zzzz 1129F:Mult 112AA:Zzzz
+112B0:Sind 112EB:Zzzz 112F0:Sind 112FA:Zzzz 11300:Gran 11304:Zzzz 11305:Gran
+1130D:Zzzz 1130F:Gran 11311:Zzzz 11313:Gran 11329:Zzzz 1132A:Gran 11331:Zzzz
+11332:Gran 11334:Zzzz 11335:Gran 1133A:Zzzz 1133B:Zinh 1133C:Gran 11345:Zzzz
+11347:Gran 11349:Zzzz 1134B:Gran 1134E:Zzzz 11350:Gran 11351:Zzzz 11357:Gran
+11358:Zzzz 1135D:Gran 11364:Zzzz 11366:Gran 1136D:Zzzz 11370:Gran 11375:Zzzz
+11400:Newa 1145C:Zzzz 1145D:Newa 11462:Zzzz 11480:Tirh 114C8:Zzzz 114D0:Tirh
+114DA:Zzzz 11580:Sidd 115B6:Zzzz 115B8:Sidd 115DE:Zzzz 11600:Modi 11645:Zzzz
+11650:Modi 1165A:Zzzz 11660:Mong 1166D:Zzzz 11680:Takr 116BA:Zzzz 116C0:Takr
+116CA:Zzzz 11700:Ahom 1171B:Zzzz 1171D:Ahom 1172C:Zzzz 11730:Ahom 11747:Zzzz
+11800:Dogr 1183C:Zzzz 118A0:Wara 118F3:Zzzz 118FF:Wara 11900:Diak 11907:Zzzz
+11909:Diak 1190A:Zzzz 1190C:Diak 11914:Zzzz 11915:Diak 11917:Zzzz 11918:Diak
+11936:Zzzz 11937:Diak 11939:Zzzz 1193B:Diak 11947:Zzzz 11950:Diak 1195A:Zzzz
+119A0:Nand 119A8:Zzzz 119AA:Nand 119D8:Zzzz 119DA:Nand 119E5:Zzzz 11A00:Zanb
+11A48:Zzzz 11A50:Soyo 11AA3:Zzzz 11AB0:Cans 11AC0:Pauc 11AF9:Zzzz 11B00:Deva
+11B0A:Zzzz 11C00:Bhks 11C09:Zzzz 11C0A:Bhks 11C37:Zzzz 11C38:Bhks 11C46:Zzzz
+11C50:Bhks 11C6D:Zzzz 11C70:Marc 11C90:Zzzz 11C92:Marc 11CA8:Zzzz 11CA9:Marc
+11CB7:Zzzz 11D00:Gonm 11D07:Zzzz 11D08:Gonm 11D0A:Zzzz 11D0B:Gonm 11D37:Zzzz
+11D3A:Gonm 11D3B:Zzzz 11D3C:Gonm 11D3E:Zzzz 11D3F:Gonm 11D48:Zzzz 11D50:Gonm
+11D5A:Zzzz 11D60:Gong 11D66:Zzzz 11D67:Gong 11D69:Zzzz 11D6A:Gong 11D8F:Zzzz
+11D90:Gong 11D92:Zzzz 11D93:Gong 11D99:Zzzz 11DA0:Gong 11DAA:Zzzz 11EE0:Maka
+11EF9:Zzzz 11F00:Kawi 11F11:Zzzz 11F12:Kawi 11F3B:Zzzz 11F3E:Kawi 11F5A:Zzzz
+11FB0:Lisu 11FB1:Zzzz 11FC0:Taml 11FF2:Zzzz 11FFF:Taml 12000:Xsux 1239A:Zzzz
+12400:Xsux 1246F:Zzzz 12470:Xsux 12475:Zzzz 12480:Xsux 12544:Zzzz 12F90:Cpmn
+12FF3:Zzzz 13000:Egyp 13456:Zzzz 14400:Hluw 14647:Zzzz 16800:Bamu 16A39:Zzzz
+16A40:Mroo 16A5F:Zzzz 16A60:Mroo 16A6A:Zzzz 16A6E:Mroo 16A70:Tnsa 16ABF:Zzzz
+16AC0:Tnsa 16ACA:Zzzz 16AD0:Bass 16AEE:Zzzz 16AF0:Bass 16AF6:Zzzz 16B00:Hmng
+16B46:Zzzz 16B50:Hmng 16B5A:Zzzz 16B5B:Hmng 16B62:Zzzz 16B63:Hmng 16B78:Zzzz
+16B7D:Hmng 16B90:Zzzz 16E40:Medf 16E9B:Zzzz 16F00:Plrd 16F4B:Zzzz 16F4F:Plrd
+16F88:Zzzz 16F8F:Plrd 16FA0:Zzzz 16FE0:Tang 16FE1:Nshu 16FE2:Hani 16FE4:Kits
+16FE5:Zzzz 16FF0:Hani 16FF2:Zzzz 17000:Tang 187F8:Zzzz 18800:Tang 18B00:Kits
+18CD6:Zzzz 18D00:Tang 18D09:Zzzz 1AFF0:Kana 1AFF4:Zzzz 1AFF5:Kana 1AFFC:Zzzz
+1AFFD:Kana 1AFFF:Zzzz 1B000:Kana 1B001:Hira 1B120:Kana 1B123:Zzzz 1B132:Hira
+1B133:Zzzz 1B150:Hira 1B153:Zzzz 1B155:Kana 1B156:Zzzz 1B164:Kana 1B168:Zzzz
+1B170:Nshu 1B2FC:Zzzz 1BC00:Dupl 1BC6B:Zzzz 1BC70:Dupl 1BC7D:Zzzz 1BC80:Dupl
+1BC89:Zzzz 1BC90:Dupl 1BC9A:Zzzz 1BC9C:Dupl 1BCA0:Zyyy 1BCA4:Zzzz 1CF00:Zinh
+1CF2E:Zzzz 1CF30:Zinh 1CF47:Zzzz 1CF50:Zyyy 1CFC4:Zzzz 1D000:Zyyy 1D0F6:Zzzz
+1D100:Zyyy 1D127:Zzzz 1D129:Zyyy 1D167:Zinh 1D16A:Zyyy 1D17B:Zinh 1D183:Zyyy
+1D185:Zinh 1D18C:Zyyy 1D1AA:Zinh 1D1AE:Zyyy 1D1EB:Zzzz 1D200:Grek 1D246:Zzzz
+1D2C0:Zyyy 1D2D4:Zzzz 1D2E0:Zyyy 1D2F4:Zzzz 1D300:Zyyy 1D357:Zzzz 1D360:Zyyy
+1D379:Zzzz 1D400:Zyyy 1D455:Zzzz 1D456:Zyyy 1D49D:Zzzz 1D49E:Zyyy 1D4A0:Zzzz
+1D4A2:Zyyy 1D4A3:Zzzz 1D4A5:Zyyy 1D4A7:Zzzz 1D4A9:Zyyy 1D4AD:Zzzz 1D4AE:Zyyy
+1D4BA:Zzzz 1D4BB:Zyyy 1D4BC:Zzzz 1D4BD:Zyyy 1D4C4:Zzzz 1D4C5:Zyyy 1D506:Zzzz
+1D507:Zyyy 1D50B:Zzzz 1D50D:Zyyy 1D515:Zzzz 1D516:Zyyy 1D51D:Zzzz 1D51E:Zyyy
+1D53A:Zzzz 1D53B:Zyyy 1D53F:Zzzz 1D540:Zyyy 1D545:Zzzz 1D546:Zyyy 1D547:Zzzz
+1D54A:Zyyy 1D551:Zzzz 1D552:Zyyy 1D6A6:Zzzz 1D6A8:Zyyy 1D7CC:Zzzz 1D7CE:Zyyy
+1D800:Sgnw 1DA8C:Zzzz 1DA9B:Sgnw 1DAA0:Zzzz 1DAA1:Sgnw 1DAB0:Zzzz 1DF00:Latn
+1DF1F:Zzzz 1DF25:Latn 1DF2B:Zzzz 1E000:Glag 1E007:Zzzz 1E008:Glag 1E019:Zzzz
+1E01B:Glag 1E022:Zzzz 1E023:Glag 1E025:Zzzz 1E026:Glag 1E02B:Zzzz 1E030:Cyrl
+1E06E:Zzzz 1E08F:Cyrl 1E090:Zzzz 1E100:Hmnp 1E12D:Zzzz 1E130:Hmnp 1E13E:Zzzz
+1E140:Hmnp 1E14A:Zzzz 1E14E:Hmnp 1E150:Zzzz 1E290:Toto 1E2AF:Zzzz 1E2C0:Wcho
+1E2FA:Zzzz 1E2FF:Wcho 1E300:Zzzz 1E4D0:Nagm 1E4FA:Zzzz 1E7E0:Ethi 1E7E7:Zzzz
+1E7E8:Ethi 1E7EC:Zzzz 1E7ED:Ethi 1E7EF:Zzzz 1E7F0:Ethi 1E7FF:Zzzz 1E800:Mend
+1E8C5:Zzzz 1E8C7:Mend 1E8D7:Zzzz 1E900:Adlm 1E94C:Zzzz 1E950:Adlm 1E95A:Zzzz
+1E95E:Adlm 1E960:Zzzz 1EC71:Zyyy 1ECB5:Zzzz 1ED01:Zyyy 1ED3E:Zzzz 1EE00:Arab
+1EE04:Zzzz 1EE05:Arab 1EE20:Zzzz 1EE21:Arab 1EE23:Zzzz 1EE24:Arab 1EE25:Zzzz
+1EE27:Arab 1EE28:Zzzz 1EE29:Arab 1EE33:Zzzz 1EE34:Arab 1EE38:Zzzz 1EE39:Arab
+1EE3A:Zzzz 1EE3B:Arab 1EE3C:Zzzz 1EE42:Arab 1EE43:Zzzz 1EE47:Arab 1EE48:Zzzz
+1EE49:Arab 1EE4A:Zzzz 1EE4B:Arab 1EE4C:Zzzz 1EE4D:Arab 1EE50:Zzzz 1EE51:Arab
+1EE53:Zzzz 1EE54:Arab 1EE55:Zzzz 1EE57:Arab 1EE58:Zzzz 1EE59:Arab 1EE5A:Zzzz
+1EE5B:Arab 1EE5C:Zzzz 1EE5D:Arab 1EE5E:Zzzz 1EE5F:Arab 1EE60:Zzzz 1EE61:Arab
+1EE63:Zzzz 1EE64:Arab 1EE65:Zzzz 1EE67:Arab 1EE6B:Zzzz 1EE6C:Arab 1EE73:Zzzz
+1EE74:Arab 1EE78:Zzzz 1EE79:Arab 1EE7D:Zzzz 1EE7E:Arab 1EE7F:Zzzz 1EE80:Arab
+1EE8A:Zzzz 1EE8B:Arab 1EE9C:Zzzz 1EEA1:Arab 1EEA4:Zzzz 1EEA5:Arab 1EEAA:Zzzz
+1EEAB:Arab 1EEBC:Zzzz 1EEF0:Arab 1EEF2:Zzzz 1F000:Zyyy 1F02C:Zzzz 1F030:Zyyy
+1F094:Zzzz 1F0A0:Zyyy 1F0AF:Zzzz 1F0B1:Zyyy 1F0C0:Zzzz 1F0C1:Zyyy 1F0D0:Zzzz
+1F0D1:Zyyy 1F0F6:Zzzz 1F100:Zyyy 1F1AE:Zzzz 1F1E6:Zyyy 1F200:Hira 1F201:Zyyy
+1F203:Zzzz 1F210:Zyyy 1F23C:Zzzz 1F240:Zyyy 1F249:Zzzz 1F250:Zyyy 1F252:Zzzz
+1F260:Zyyy 1F266:Zzzz 1F300:Zyyy 1F6D8:Zzzz 1F6DC:Zyyy 1F6ED:Zzzz 1F6F0:Zyyy
+1F6FD:Zzzz 1F700:Zyyy 1F777:Zzzz 1F77B:Zyyy 1F7DA:Zzzz 1F7E0:Zyyy 1F7EC:Zzzz
+1F7F0:Zyyy 1F7F1:Zzzz 1F800:Zyyy 1F80C:Zzzz 1F810:Zyyy 1F848:Zzzz 1F850:Zyyy
+1F85A:Zzzz 1F860:Zyyy 1F888:Zzzz 1F890:Zyyy 1F8AE:Zzzz 1F8B0:Zyyy 1F8B2:Zzzz
+1F900:Zyyy 1FA54:Zzzz 1FA60:Zyyy 1FA6E:Zzzz 1FA70:Zyyy 1FA7D:Zzzz 1FA80:Zyyy
+1FA89:Zzzz 1FA90:Zyyy 1FABE:Zzzz 1FABF:Zyyy 1FAC6:Zzzz 1FACE:Zyyy 1FADC:Zzzz
+1FAE0:Zyyy 1FAE9:Zzzz 1FAF0:Zyyy 1FAF9:Zzzz 1FB00:Zyyy 1FB93:Zzzz 1FB94:Zyyy
+1FBCB:Zzzz 1FBF0:Zyyy 1FBFA:Zzzz 20000:Hani 2A6E0:Zzzz 2A700:Hani 2B73A:Zzzz
+2B740:Hani 2B81E:Zzzz 2B820:Hani 2CEA2:Zzzz 2CEB0:Hani 2EBE1:Zzzz 2F800:Hani
+2FA1E:Zzzz 30000:Hani 3134B:Zzzz 31350:Hani 323B0:Zzzz E0001:Zyyy E0002:Zzzz
+E0020:Zyyy E0080:Zzzz E0100:Zinh E01F0:Zzzz
+'''
+# Script_Extensions property from ScriptExtensions.txt of Unicode 15.0
+# in the same format, the scripts of a range are joined with “+”,
+# “-” means the Script_Extensions property is just the Script property.
+SCRIPT_EXTENSIONS_DATA = '''
+0:- 342:Grek 343:- 345:Grek 346:- 363:Latn 370:- 483:Cyrl+Perm 484:Cyrl+Glag
+485:Cyrl+Latn 487:Cyrl+Glag 488:- 60C:Arab+Nkoo+Rohg+Syrc+Thaa+Yezi 60D:-
+61B:Arab+Nkoo+Rohg+Syrc+Thaa+Yezi 61C:Arab+Syrc+Thaa 61D:-
+61F:Adlm+Arab+Nkoo+Rohg+Syrc+Thaa+Yezi 620:-
+640:Adlm+Arab+Mand+Mani+Ougr+Phlp+Rohg+Sogd+Syrc 641:- 64B:Arab+Syrc 656:-
+660:Arab+Thaa+Yezi 66A:- 670:Arab+Syrc 671:- 6D4:Arab+Rohg 6D5:-
+951:Beng+Deva+Gran+Gujr+Guru+Knda+Latn+Mlym+Orya+Shrd+Taml+Telu+Tirh
+952:Beng+Deva+Gran+Gujr+Guru+Knda+Latn+Mlym+Orya+Taml+Telu+Tirh 953:-
+964:Beng+Deva+Dogr+Gong+Gonm+Gran+Gujr+Guru+Knda+Mahj+Mlym+Nand+Orya+Sind+Sinh+Sylo+Takr+Taml+Telu+Tirh
+965:Beng+Deva+Dogr+Gong+Gonm+Gran+Gujr+Guru+Knda+Limb+Mahj+Mlym+Nand+Orya+Sind+Sinh+Sylo+Takr+Taml+Telu+Tirh
+966:Deva+Dogr+Kthi+Mahj 970:- 9E6:Beng+Cakm+Sylo 9F0:- A66:Guru+Mult A70:-
+AE6:Gujr+Khoj AF0:- BE6:Gran+Taml BF4:- CE6:Knda+Nand CF0:-
+1040:Cakm+Mymr+Tale 104A:- 10FB:Geor+Latn 10FC:- 1735:Buhd+Hano+Tagb+Tglg
+1737:- 1802:Mong+Phag 1804:- 1805:Mong+Phag 1806:- 1CD0:Beng+Deva+Gran+Knda
+1CD1:Deva 1CD2:Beng+Deva+Gran+Knda 1CD3:Deva+Gran 1CD4:Deva 1CD5:Beng+Deva
+1CD7:Deva+Shrd 1CD8:Beng+Deva 1CD9:Deva+Shrd
+1CDA:Deva+Knda+Mlym+Orya+Taml+Telu 1CDB:Deva 1CDC:Deva+Shrd 1CDE:Deva
+1CE0:Deva+Shrd 1CE1:Beng+Deva 1CE2:Deva 1CE9:Deva+Nand 1CEA:Beng+Deva
+1CEB:Deva 1CED:Beng+Deva 1CEE:Deva
+1CF2:Beng+Deva+Gran+Knda+Nand+Orya+Telu+Tirh 1CF3:Deva+Gran
+1CF4:Deva+Gran+Knda 1CF5:Beng+Deva 1CF7:Beng 1CF8:Deva+Gran 1CFA:Nand 1CFB:-
+1DC0:Grek 1DC2:- 1DF8:Cyrl+Syrc 1DF9:- 1DFA:Syrc 1DFB:- 202F:Latn+Mong
+2030:- 20F0:Deva+Gran+Latn 20F1:- 2E43:Cyrl+Glag 2E44:-
+3001:Bopo+Hang+Hani+Hira+Kana+Yiii 3003:Bopo+Hang+Hani+Hira+Kana 3004:-
+3006:Hani 3007:- 3008:Bopo+Hang+Hani+Hira+Kana+Yiii 3012:-
+3013:Bopo+Hang+Hani+Hira+Kana 3014:Bopo+Hang+Hani+Hira+Kana+Yiii
+301C:Bopo+Hang+Hani+Hira+Kana 3020:- 302A:Bopo+Hani 302E:-
+3030:Bopo+Hang+Hani+Hira+Kana 3031:Hira+Kana 3036:-
+3037:Bopo+Hang+Hani+Hira+Kana 3038:- 303C:Hani+Hira+Kana 303E:Hani 3040:-
+3099:Hira+Kana 309D:- 30A0:Hira+Kana 30A1:-
+30FB:Bopo+Hang+Hani+Hira+Kana+Yiii 30FC:Hira+Kana 30FD:- 3190:Hani 31A0:-
+31C0:Hani 31E4:- 3220:Hani 3248:- 3280:Hani 32B1:- 32C0:Hani 32CC:-
+32FF:Hani 3300:- 3358:Hani 3371:- 337B:Hani 3380:- 33E0:Hani 33FF:-
+A66F:Cyrl+Glag A670:- A700:Hani+Latn A708:-
+A830:Deva+Dogr+Gujr+Guru+Khoj+Knda+Kthi+Mahj+Mlym+Modi+Nand+Sind+Takr+Tirh
+A833:Deva+Dogr+Gujr+Guru+Khoj+Knda+Kthi+Mahj+Modi+Nand+Sind+Takr+Tirh
+A836:Deva+Dogr+Gujr+Guru+Khoj+Kthi+Mahj+Modi+Sind+Takr+Tirh A83A:-
+A8F1:Beng+Deva A8F2:- A8F3:Deva+Taml A8F4:- A92E:Kali+Latn+Mymr A92F:-
+A9CF:Bugi+Java A9D0:- FD3E:Arab+Nkoo FD40:- FDF2:Arab+Thaa FDF3:-
+FDFD:Arab+Thaa FDFE:- FE45:Bopo+Hang+Hani+Hira+Kana FE47:-
+FF61:Bopo+Hang+Hani+Hira+Kana+Yiii FF66:- FF70:Hira+Kana FF71:-
+FF9E:Hira+Kana FFA0:- 10100:Cpmn+Cprt+Linb 10102:Cprt+Linb 10103:-
+10107:Cprt+Lina+Linb 10134:- 10137:Cprt+Linb 10140:- 102E0:Arab+Copt 102FC:-
+10AF2:Mani+Ougr 10AF3:- 11301:Gran+Taml 11302:- 11303:Gran+Taml 11304:-
+1133B:Gran+Taml 1133D:- 11FD0:Gran+Taml 11FD2:- 11FD3:Gran+Taml 11FD4:-
+1BCA0:Dupl 1BCA4:- 1D360:Hani 1D372:- 1F250:Hani 1F252:-
+'''
+# Scripts which do not tell anything about the writing system of a text
+SCRIPTS_WITHOUT_WRITING_SYSTEM = frozenset(('Zyyy', 'Zinh', 'Zzzz'))
+
+class ScriptTable(NamedTuple):
+    '''Decoded SCRIPT_RANGES_DATA and SCRIPT_EXTENSIONS_DATA'''
+    starts: array.array
+    scripts: List[str]
+    extension_starts: array.array
+    extensions: List[Optional[frozenset]]
+
+SCRIPT_TABLE: Optional[ScriptTable] = None
+
+def get_script_table() -> ScriptTable:
+    '''
+    Decode the script range tables the first time they are needed
+    '''
+    global SCRIPT_TABLE
+    if SCRIPT_TABLE is None:
+        starts = array.array('I')
+        scripts: List[str] = []
+        for item in SCRIPT_RANGES_DATA.split():
+            (start, script) = item.split(':')
+            starts.append(int(start, 16))
+            scripts.append(sys.intern(script))
+        extension_starts = array.array('I')
+        extensions: List[Optional[frozenset]] = []
+        for item in SCRIPT_EXTENSIONS_DATA.split():
+            (start, value) = item.split(':')
+            extension_starts.append(int(start, 16))
+            extensions.append(
+                None if value == '-' else frozenset(value.split('+')))
+        SCRIPT_TABLE = ScriptTable(
+            starts, scripts, extension_starts, extensions)
+    return SCRIPT_TABLE
+
+def char_script(char: str) -> str:
+    '''
+    Return the ISO 15924 code of the Script property of a character
+    '''
+    table = get_script_table()
+    return table.scripts[bisect.bisect_right(table.starts, ord(char)) - 1]
+
+def char_script_extensions(char: str) -> frozenset:
+    '''
+    Return the Script_Extensions property of a character, i.e. the
+    scripts the character is used with
+    '''
+    table = get_script_table()
+    extensions = table.extensions[
+        bisect.bisect_right(table.extension_starts, ord(char)) - 1]
+    if extensions is None:
+        return frozenset((char_script(char),))
+    return extensions
+
+def script_runs(text: str) -> List[Tuple[str, int, int]]:
+    '''
+    Split a text into runs of the same script.
+
+    Common and Inherited characters (spaces, digits, punctuation,
+    combining marks, …) belong to the run they are in, also when
+    their Script_Extensions do not contain the script of that run
+    (e.g. a danda after Latin text): the extensions of a danda are
+    Bengali, Devanagari and ten more scripts, so they cannot tell
+    which script a new run would be in.  Characters at the start of
+    the text take the script of the first run, unless one of them is
+    used with one script only by its Script_Extensions (like the
+    medieval Latin letters U+0363 to U+036F), which then starts the
+    first run.
+
+    Code points come in ranges of the same script, so the range of
+    the previous character is tried before searching the table and
+    long texts are split in linear time.
+
+    :return: List of (script, start, end) tuples, the script is Zyyy
+             if the text has no characters of a real script
+    '''
+    table = get_script_table()
+    starts = table.starts
+    scripts = table.scripts
+    number_of_ranges = len(starts)
+    runs: List[Tuple[str, int, int]] = []
+    run_script = ''
+    run_start = 0
+    range_start = range_end = 0
+    script = 'Zzzz'
+    for (position, char) in enumerate(text):
+        code_point = ord(char)
+        if not range_start <= code_point < range_end:
+            index = bisect.bisect_right(starts, code_point) - 1
+            range_start = starts[index]
+            range_end = (starts[index + 1]
+                         if index + 1 < number_of_ranges else 0x110000)
+            script = scripts[index]
+        if script in SCRIPTS_WITHOUT_WRITING_SYSTEM:
+            if not run_script:
+                extensions = char_script_extensions(char)
+                if (len(extensions) == 1
+                        and not extensions <= SCRIPTS_WITHOUT_WRITING_SYSTEM):
+                    (run_script,) = extensions
+            continue
+        if not run_script:
+            run_script = script
+        elif script != run_script:
+            runs.append((run_script, run_start, position))
+            (run_script, run_start) = (script, position)
+    if text:
+        runs.append((run_script or 'Zyyy', run_start, len(text)))
+    return runs
+
+def detect_script(text: str) -> Set[str]:
+    '''
+    Detects all scripts used in the given text.
+
+    Returns ISO 15924 codes, Common and Inherited characters are not
+    counted as scripts of their own (see script_runs()).
+    '''
+    return {script for (script, _start, _end) in script_runs(text)
+            if script not in SCRIPTS_WITHOUT_WRITING_SYSTEM}
+
+def is_mixed_script(text: str) -> bool:
+    '''
+    Checks if the text contains multiple scripts.
+    '''
+    return len(detect_script(text)) > 1
+
+# Scripts used by only one language
+SCRIPT_LANGUAGES = {
+    'Armn': 'hy',
+    'Beng': 'bn',
+    'Geor': 'ka',
+    'Grek': 'el',
+    'Gujr': 'gu',
+    'Guru': 'pa',
+    'Hang': 'ko',
+    'Hebr': 'he',
+    'Hira': 'ja',
+    'Knda': 'kn',
+    'Kana': 'ja',
+    'Khmr': 'km',
+    'Laoo': 'lo',
+    'Mlym': 'ml',
+    'Mymr': 'my',
+    'Orya': 'or',
+    'Sinh': 'si',
+    'Taml': 'ta',
+    'Telu': 'te',
+    'Thai': 'th',
+    'Tibt': 'bo',
+}
+
+# The languages langdetect knows for scripts used by several languages
+SCRIPT_CANDIDATE_LANGUAGES = {
+    'Arab': {'ar', 'fa', 'ur'},
+    'Cyrl': {'bg', 'mk', 'ru', 'uk'},
+    'Deva': {'hi', 'mr', 'ne'},
+    'Hani': {'zh-cn', 'zh-tw', 'ja'},
+    'Latn': {'af', 'ca', 'cs', 'cy', 'da', 'de', 'en', 'es', 'et', 'fi',
+             'fr', 'hr', 'hu', 'id', 'it', 'lt', 'lv', 'nl', 'no', 'pl',
+             'pt', 'ro', 'sk', 'sl', 'so', 'sq', 'sv', 'sw', 'tl', 'tr',
+             'vi'},
+}
+
+def classify_text_by_script(text: str) -> Tuple[str, Set[str]]:
+    '''
+    Guess the language of a text from its scripts.
+
+    :return: (language, candidates).  The language is not empty if
+             the scripts are only used by one language.  Otherwise
+             candidates contains the langdetect languages which are
+             written in these scripts (empty if nothing is known).
+    '''
+    scripts = detect_script(text)
+    if scripts & {'Hira', 'Kana'} and scripts <= {'Hira', 'Kana', 'Hani', 'Latn'}:
+        return ('ja', set())
+    if 'Hang' in scripts and scripts <= {'Hang', 'Hani'}:
+        return ('ko', set())
+    if len(scripts) == 1:
+        script = next(iter(scripts))
+        if script == 'Beng' and ('\u09F0' in text or '\u09F1' in text):
+            # ৰ and ৱ are only used for Assamese
+            return ('as', set())
+        if script in SCRIPT_LANGUAGES:
+            return (SCRIPT_LANGUAGES[script], set())
+    candidates: Set[str] = set()
+    for script in scripts:
+        if script in SCRIPT_LANGUAGES:
+            candidates.add(SCRIPT_LANGUAGES[script])
+        candidates |= SCRIPT_CANDIDATE_LANGUAGES.get(script, set())
+    return ('', candidates)
+
+# How long the text in the edit dialog has to stay unchanged
+# before its language is detected
+LANGDETECT_DEBOUNCE_MS = 250
+# langdetect is not thread safe, so all detections run in one worker
+LANGDETECT_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix='langdetect')
+
+@functools.lru_cache(maxsize=256)
+def detect_language(text: str) -> str:
+    '''
+    detecting language by langdetect and
+    any langugage is not there in my dictionary then
+    it'll only return the 'en' by default
+
+    Results are memoized, so detecting the same text again is free
+    and returns the same language (langdetect is not deterministic
+    for short texts).
+    '''
+    text = text.strip()
+    LOGGER.info('Trying to detect language of: %s', text)
+    lang = 'en'
+    if text:
+        (lang, candidates) = classify_text_by_script(text)
+        if lang:
+            LOGGER.info('Language %s detected by script', lang)
+            return lang
+        try:
+            with trace_span('langdetect', 'langdetect', length=len(text)):
+                # Make langdetect give the same result for the same
+                # text every time
+                langdetect.DetectorFactory.seed = 0
+                probabilities = langdetect.detect_langs(text)
+            lang = probabilities[0].lang
+            for probability in probabilities:
+                if probability.lang in candidates:
+                    lang = probability.lang
+                    break
+        except langdetect.LangDetectException as error:
+            LOGGER.exception('Problem detecting language: %s: %s',
+                             error.__class__.__name__, error)
+            lang = 'en'
+    if '-' in lang:
+        (first, rest) = lang.split('-', maxsplit=1)
+        lang = first + '_' + rest.upper()
+    return lang
+
+FC_LIST_CATALOG_FORMAT = ('%{family}\t%{familylang}\t%{style}\t%{fontformat}'
+                          '\t%{lang}\t%{file}\t%{index}\n')
+CATALOG_CACHE_MAGIC = b'FCCATLG1'
+# magic, cache key, number of sections
+CATALOG_CACHE_HEADER = '=8s32sI'
+
+def uint32_array(values: Any) -> array.array:
+    '''
+    Copy a uint32 array, or a memoryview of a catalog loaded from the
+    cache, into an array which can be appended to
+    '''
+    result = array.array('I')
+    result.frombytes(memoryview(values).cast('B'))
+    return result
+
+class FontCatalog:
+    '''
+    In-memory index of the installed fonts built from a single
+    bulk fc-list dump.
+
+    Every font face is one record.  The records are stored column
+    wise in compact arrays which hold indexes into a table of
+    interned strings.  Lookup tables map languages, font formats,
+    families and styles to arrays of record numbers in the order
+    fontconfig listed the faces.
+
+    updated() returns a copy with the faces of some files replaced,
+    records of faces removed from the copy stay in the arrays and are
+    only skipped.
+    '''
+    def __init__(self) -> None:
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._family = array.array('I')
+        self._familylang = array.array('I')
+        self._style = array.array('I')
+        self._fontformat = array.array('I')
+        self._file = array.array('I')
+        self._face_index = array.array('I')
+        self._by_lang: Dict[str, array.array] = {}
+        self._by_fontformat: Dict[str, array.array] = {}
+        self._by_family: Dict[str, array.array] = {}
+        self._by_style: Dict[str, array.array] = {}
+        self._removed: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._family) - len(self._removed)
+
+    def _intern(self, value: str) -> int:
+        '''Return the index of value in the string table'''
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(sys.intern(value))
+            self._string_ids[value] = string_id
+        return string_id
+
+    @staticmethod
+    def _add_to_index(
+            index: Dict[str, array.array], key: str, record: int) -> None:
+        if key not in index:
+            index[key] = array.array('I')
+        index[key].append(record)
+
+    def add_face(self, family: str, familylang: str, style: str,
+                 fontformat: str, langs: List[str],
+                 file: str = '', face_index: int = 0) -> None:
+        '''Add one font face to the catalog'''
+        family = family.replace('\\-', '-').replace('\\', '').strip()
+        record = len(self._family)
+        self._family.append(self._intern(family))
+        self._familylang.append(self._intern(familylang))
+        self._style.append(self._intern(style))
+        self._fontformat.append(self._intern(fontformat))
+        self._file.append(self._intern(file))
+        self._face_index.append(face_index)
+        self._add_to_index(self._by_fontformat, fontformat, record)
+        self._add_to_index(self._by_style, style.split(',')[0], record)
+        for name in {x.strip() for x in family.split(',') if x.strip()}:
+            self._add_to_index(self._by_family, name.lower(), record)
+        for lang in dict.fromkeys(langs):
+            if lang:
+                self._add_to_index(self._by_lang, lang.lower(), record)
+
+    def add_fc_list_output(self, output: str) -> None:
+        '''Add the faces in the output of fc-list or fc-query with
+        FC_LIST_CATALOG_FORMAT'''
+        for line in output.split('\n'):
+            fields = line.split('\t')
+            if len(fields) != 7:
+                continue
+            (family, familylang, style, fontformat,
+             langs, file, face_index) = fields
+            if not family:
+                continue
+            self.add_face(family, familylang, style, fontformat,
+                          langs.split('|'), file,
+                          int(face_index) if face_index.isdigit() else 0)
+
+    @classmethod
+    def from_fc_list_output(cls, output: str) -> 'FontCatalog':
+        '''Build a catalog from the output of fc-list with
+        FC_LIST_CATALOG_FORMAT'''
+        catalog = cls()
+        catalog.add_fc_list_output(output)
+        return catalog
+
+    @classmethod
+    def from_fontconfig(cls) -> 'FontCatalog':
+        '''Build a catalog with one fc-list call'''
+        fc_list_binary = shutil.which('fc-list')
+        if not fc_list_binary:
+            return cls()
+        try:
+            result = run_subprocess(
+                    [fc_list_binary, '--format', FC_LIST_CATALOG_FORMAT],
+                    encoding='utf-8', check=True, capture_output=True)
+        except subprocess.CalledProcessError as error:
+            LOGGER.exception('Exception when calling %s: %s: %s stderr: %s',
+                             fc_list_binary,
+                             error.__class__.__name__, error, error.stderr)
+            return cls()
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Exception when calling %s: %s: %s',
+                             fc_list_binary, error.__class__.__name__, error)
+            return cls()
+        catalog = cls.from_fc_list_output(result.stdout)
+        LOGGER.info('font catalog: %d faces, %d languages',
+                    len(catalog), len(catalog._by_lang))
+        return catalog
+
+    def _records_for_language(self, lang: str) -> Set[int]:
+        '''
+        Records of faces supporting lang, matched like fontconfig
+        does when listing: the language has to be equal and the
+        territories have to be equal unless one of them has none.
+        '''
+        lang = lang.replace('_', '-').lower()
+        base, _sep, territory = lang.partition('-')
+        records: Set[int] = set()
+        for key, key_records in self._by_lang.items():
+            key_base, _sep, key_territory = key.partition('-')
+            if key_base != base:
+                continue
+            if territory and key_territory and territory != key_territory:
+                continue
+            records.update(key_records)
+        return records - self._removed
+
+    def faces(self, lang: str = '', fontformat: str = '',
+              family: str = '', style: str = '',
+              exclude: Tuple[str, ...] = ()) -> List[Tuple[str, str, str]]:
+        '''
+        Return the (family, familylang, style) triples of the faces
+        matching all the given criteria in fontconfig listing order,
+        without duplicates.  Faces whose family or style contains one
+        of the strings in exclude are skipped.
+        '''
+        candidates: Optional[Set[int]] = None
+        for index, key in ((self._by_fontformat, fontformat),
+                           (self._by_family, family.lower()),
+                           (self._by_style, style)):
+            if key:
+                records = set(index.get(key, ()))
+                candidates = (records if candidates is None
+                              else candidates & records)
+        if lang:
+            records = self._records_for_language(lang)
+            candidates = (records if candidates is None
+                          else candidates & records)
+        if candidates is None:
+            candidates = set(range(len(self._family)))
+        candidates -= self._removed
+        result: List[Tuple[str, str, str]] = []
+        seen: Set[Tuple[int, int, int]] = set()
+        for record in sorted(candidates):
+            key_ids = (self._family[record],
+                       self._familylang[record],
+                       self._style[record])
+            if key_ids in seen:
+                continue
+            seen.add(key_ids)
+            face = tuple(self._strings[x] for x in key_ids)
+            if any(word in face[0] or word in face[2] for word in exclude):
+                continue
+            result.append(face)
+        return result
+
+    def languages(self) -> List[str]:
+        '''Return the fontconfig languages which have at least one face'''
+        return list(self._by_lang)
+
+    def has_language(self, lang: str) -> bool:
+        '''Whether a fontconfig language has at least one face'''
+        return lang in self._by_lang
+
+    def languages_for_family(self, family: str) -> Set[str]:
+        '''Return the fontconfig languages supported by a family'''
+        records = set(self._by_family.get(family.strip().lower(), ())) - self._removed
+        return {lang for lang, lang_records in self._by_lang.items()
+                if records.intersection(lang_records)}
+
+    def file_for_face(self, family: str, style: str) -> Optional[Tuple[str, int]]:
+        '''Return the (file, face index) of a face, style as faces() returns it'''
+        for record in self._by_family.get(family.strip().lower(), ()):
+            if record in self._removed:
+                continue
+            if self._strings[self._style[record]].split(',')[0] == style:
+                return (self._strings[self._file[record]], self._face_index[record])
+        return None
+
+    def files_for_family(self, family: str) -> List[Tuple[str, int]]:
+        '''Return the (file, face index) pairs of a family'''
+        return [(self._strings[self._file[record]], self._face_index[record])
+                for record in self._by_family.get(family.strip().lower(), ())
+                if record not in self._removed]
+
+    def files(self) -> Set[str]:
+        '''Return the files of all faces'''
+        return {self._strings[file_id]
+                for record, file_id in enumerate(self._file)
+                if record not in self._removed}
+
+    def updated(self, files: Iterable[str], fc_query_output: str) -> 'FontCatalog':
+        '''
+        Return a copy of the catalog in which the faces of files are
+        replaced by the faces in the output of fc-query with
+        FC_LIST_CATALOG_FORMAT.  Files which have been removed are
+        passed without faces in the output.
+
+        The catalog itself is not changed, threads still using it are
+        not disturbed.
+        '''
+        catalog = type(self)()
+        catalog._strings = list(self._strings)
+        catalog._string_ids = {value: string_id
+                               for string_id, value in enumerate(self._strings)}
+        for column in self._COLUMNS:
+            setattr(catalog, column, uint32_array(getattr(self, column)))
+        for name in self._INDEXES:
+            setattr(catalog, name, {key: uint32_array(records)
+                                    for key, records in getattr(self, name).items()})
+        file_ids = {catalog._string_ids[file] for file in files
+                    if file in catalog._string_ids}
+        catalog._removed = self._removed | {
+            record for record, file_id in enumerate(catalog._file)
+            if file_id in file_ids}
+        catalog.add_fc_list_output(fc_query_output)
+        if len(catalog._removed) > len(self._removed):
+            # Languages, families, … of which no face is left
+            for name in self._INDEXES:
+                index = getattr(catalog, name)
+                for key in [key for key, records in index.items()
+                            if catalog._removed.issuperset(records)]:
+                    del index[key]
+        return catalog
+
+    def compacted(self) -> 'FontCatalog':
+        '''
+        Return a copy of the catalog without the records of the faces
+        updated() has removed, or the catalog itself if there are none
+        '''
+        if not self._removed:
+            return self
+        kept = [record for record in range(len(self._family))
+                if record not in self._removed]
+        new_records = {record: position for position, record in enumerate(kept)}
+        catalog = type(self)()
+        catalog._strings = list(self._strings)
+        catalog._string_ids = dict(self._string_ids)
+        for column in self._COLUMNS:
+            values = getattr(self, column)
+            setattr(catalog, column, array.array('I', [values[x] for x in kept]))
+        for name in self._INDEXES:
+            index = {}
+            for key, records in getattr(self, name).items():
+                records = [new_records[x] for x in records if x in new_records]
+                if records:
+                    index[key] = array.array('I', records)
+            setattr(catalog, name, index)
+        return catalog
+
+    _COLUMNS = ('_family', '_familylang', '_style',
+                '_fontformat', '_file', '_face_index')
+    _INDEXES = ('_by_lang', '_by_fontformat', '_by_family', '_by_style')
+
+    def save(self, path: str, key: bytes) -> None:
+        '''
+        Write the catalog to a binary cache file.
+
+        The file starts with CATALOG_CACHE_MAGIC, the cache key and
+        the offsets and lengths of all sections.  The sections are
+        the utf-8 string table followed by native uint32 arrays for
+        the columns and for the keys, offsets and record numbers of
+        the lookup tables, each aligned to 8 bytes so that they can
+        be used straight from a memory map.  The faces updated() has
+        removed are not written.
+        '''
+        catalog = self.compacted()
+        # The keys of the lookup tables are added to a copy of the
+        # string table, the catalog may be in use by other threads
+        strings = list(catalog._strings)
+        string_ids = dict(catalog._string_ids)
+        def string_id(value: str) -> int:
+            if value not in string_ids:
+                string_ids[value] = len(strings)
+                strings.append(value)
+            return string_ids[value]
+        sections: List[bytes] = []
+        for column in self._COLUMNS:
+            sections.append(getattr(catalog, column).tobytes())
+        for name in self._INDEXES:
+            index = getattr(catalog, name)
+            keys = array.array('I', [string_id(key) for key in index])
+            offsets = array.array('I', [0])
+            records = array.array('I')
+            for key_records in index.values():
+                records.extend(key_records)
+                offsets.append(len(records))
+            sections += [keys.tobytes(), offsets.tobytes(), records.tobytes()]
+        sections.insert(0, '\0'.join(strings).encode('utf-8'))
+        header_size = struct.calcsize(CATALOG_CACHE_HEADER) + 16 * len(sections)
+        offset = header_size
+        table: List[int] = []
+        for section in sections:
+            offset += -offset % 8
+            table += [offset, len(section)]
+            offset += len(section)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as cache_file:
+            cache_file.write(struct.pack(CATALOG_CACHE_HEADER,
+                                         CATALOG_CACHE_MAGIC, key, len(sections)))
+            cache_file.write(struct.pack(f'{len(table)}Q', *table))
+            for section_offset, section in zip(table[::2], sections):
+                cache_file.write(b'\0' * (section_offset - cache_file.tell()))
+                cache_file.write(section)
+        # Atomic, instances which have the old file mapped keep using it
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, key: bytes) -> Optional['FontCatalog']:
+        '''
+        Open a cache file written by save() with mmap.
+
+        Returns None if there is no cache file or if it was written
+        for a different key.  The columns and lookup tables of the
+        returned catalog are views into the shared memory map, only
+        the string table is decoded.
+        '''
+        try:
+            with open(path, 'rb') as cache_file:
+                mapped = mmap.mmap(cache_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        header_size = struct.calcsize(CATALOG_CACHE_HEADER)
+        expected_sections = 1 + len(cls._COLUMNS) + 3 * len(cls._INDEXES)
+        try:
+            magic, cache_key, number_of_sections = struct.unpack_from(
+                CATALOG_CACHE_HEADER, mapped)
+            if (magic != CATALOG_CACHE_MAGIC or cache_key != key
+                or number_of_sections != expected_sections):
+                return None
+            table = struct.unpack_from(f'{2 * number_of_sections}Q',
+                                       mapped, header_size)
+            view = memoryview(mapped)
+            sections = [view[offset:offset + length]
+                        for offset, length in zip(table[::2], table[1::2])]
+            catalog = cls()
+            catalog._strings = [
+                sys.intern(x)
+                for x in bytes(sections[0]).decode('utf-8').split('\0')]
+            catalog._string_ids = {value: string_id for string_id, value
+                                   in enumerate(catalog._strings)}
+            uint32_sections = [x.cast('I') for x in sections[1:]]
+            for column in cls._COLUMNS:
+                setattr(catalog, column, uint32_sections.pop(0))
+            for name in cls._INDEXES:
+                keys, offsets, records = uint32_sections[:3]
+                del uint32_sections[:3]
+                setattr(catalog, name, {
+                    catalog._strings[key_id]:
+                    records[offsets[position]:offsets[position + 1]]
+                    for position, key_id in enumerate(keys)})
+        except (struct.error, ValueError, IndexError, TypeError) as error:
+            LOGGER.info('Ignoring broken font catalog cache %s: %s', path, error)
+            return None
+        return catalog
+
+FONT_CATALOG: Optional[FontCatalog] = None
+# Held while the font catalog, the locale registry or the language
+# registry is built, the main thread and the workers ask for them at
+# the same time during startup and would build them twice
+LANGUAGE_DATA_LOCK = threading.RLock()
+
+def font_catalog_cache_path() -> str:
+    '''Return the path of the font catalog cache file'''
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'fonts-compare', 'font-catalog.bin')
+
+def fontconfig_cache_dirs() -> List[str]:
+    '''Return the directories where fontconfig usually keeps its caches'''
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return ['/var/cache/fontconfig',
+            '/usr/lib/fontconfig/cache',
+            os.path.join(cache_home, 'fontconfig'),
+            os.path.expanduser('~/.fontconfig')]
+
+def fontconfig_config_file() -> str:
+    '''Return the path of the fontconfig configuration file in use'''
+    config_file = os.environ.get('FONTCONFIG_FILE', '/etc/fonts/fonts.conf')
+    if not os.path.isabs(config_file):
+        config_file = os.path.join(
+            os.environ.get('FONTCONFIG_PATH', '/etc/fonts'), config_file)
+    return config_file
+
+def font_catalog_cache_key() -> bytes:
+    '''
+    Return a key which changes whenever the installed fonts may have
+    changed: it hashes the modification times of the fontconfig cache
+    directories (fc-cache rewrites files there when fonts are added or
+    removed) and the contents of the fontconfig configuration file.
+    '''
+    key = hashlib.sha256(CATALOG_CACHE_MAGIC)
+    key.update(FC_LIST_CATALOG_FORMAT.encode('utf-8'))
+    for name in ('FONTCONFIG_FILE', 'FONTCONFIG_PATH', 'FONTCONFIG_SYSROOT'):
+        key.update(f'{name}={os.environ.get(name, "")}\n'.encode('utf-8'))
+    for directory in fontconfig_cache_dirs():
+        try:
+            key.update(f'{directory}:{os.stat(directory).st_mtime_ns}\n'.encode('utf-8'))
+        except OSError:
+            key.update(f'{directory}:-\n'.encode('utf-8'))
+    config_file = fontconfig_config_file()
+    config_dir = os.path.join(os.path.dirname(config_file), 'conf.d')
+    try:
+        with open(config_file, 'rb') as config:
+            key.update(config.read())
+        key.update(f'{config_dir}:{os.stat(config_dir).st_mtime_ns}'.encode('utf-8'))
+    except OSError:
+        pass
+    return key.digest()
+
+def get_font_catalog() -> FontCatalog:
+    '''
+    Return the catalog of installed fonts.
+
+    On first use the catalog is mapped from the on-disk cache if that
+    is still valid, otherwise it is built from fontconfig and the
+    cache is rewritten.
+    '''
+    global FONT_CATALOG
+    if FONT_CATALOG is not None:
+        return FONT_CATALOG
+    with LANGUAGE_DATA_LOCK:
+        if FONT_CATALOG is None:
+            FONT_CATALOG = load_font_catalog()
+    return FONT_CATALOG
+
+def load_font_catalog() -> FontCatalog:
+    '''Map the font catalog from its cache or build it, see get_font_catalog()'''
+    cache_path = font_catalog_cache_path()
+    cache_key = font_catalog_cache_key()
+    catalog = FontCatalog.load(cache_path, cache_key)
+    if catalog is not None:
+        LOGGER.info('font catalog loaded from %s', cache_path)
+        return catalog
+    catalog = FontCatalog.from_fontconfig()
+    if len(catalog):
+        try:
+            catalog.save(cache_path, cache_key)
+        except OSError as error:
+            LOGGER.info('Could not write font catalog cache %s: %s',
+                        cache_path, error)
+    return catalog
+
+def fontconfig_font_dirs(config_file: str,
+                         seen: Optional[Set[str]] = None) -> List[str]:
+    '''
+    Return the font directories of the <dir> elements of a fontconfig
+    configuration file and of the files it includes, in order.
+
+    A directory which is included reads the files in it whose names
+    start with a digit and end in .conf, like fontconfig does.
+    '''
+    if seen is None:
+        seen = set()
+    if config_file in seen:
+        return []
+    seen.add(config_file)
+    if os.path.isdir(config_file):
+        return [directory
+                for name in sorted(os.listdir(config_file))
+                if name[:1].isdigit() and name.endswith('.conf')
+                for directory in fontconfig_font_dirs(
+                        os.path.join(config_file, name), seen)]
+    try:
+        root = xml.etree.ElementTree.parse(config_file).getroot()
+    except (OSError, xml.etree.ElementTree.ParseError) as error:
+        LOGGER.info('Cannot read fontconfig configuration %s: %s', config_file, error)
+        return []
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    directories: List[str] = []
+    for element in root:
+        if element.tag not in ('dir', 'include') or not (element.text or '').strip():
+            continue
+        path = os.path.expanduser(element.text.strip())
+        prefix = element.get('prefix', 'default')
+        if prefix == 'xdg':
+            path = os.path.join(data_home if element.tag == 'dir' else config_home, path)
+        elif prefix == 'relative' or element.tag == 'include':
+            path = os.path.join(os.path.dirname(config_file), path)
+        path = os.path.normpath(os.path.abspath(path))
+        if element.tag == 'dir':
+            directories.append(path)
+        elif os.path.exists(path):
+            directories += fontconfig_font_dirs(path, seen)
+    return directories
+
+def font_directory_roots() -> List[str]:
+    '''
+    Return the directories fontconfig reads fonts from: the <dir>
+    entries of its configuration, or the usual ones if the
+    configuration cannot be read.  They need not exist.
+    '''
+    roots = fontconfig_font_dirs(fontconfig_config_file())
+    if not roots:
+        data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+        roots = ['/usr/share/fonts', '/usr/local/share/fonts',
+                 os.path.join(data_home, 'fonts'), os.path.expanduser('~/.fonts')]
+    return list(dict.fromkeys(roots))
+
+def nearest_existing_directory(path: str) -> str:
+    '''Return path or the nearest of its parents which is a directory'''
+    while not os.path.isdir(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return path
+
+def font_directories(roots: Iterable[str]) -> List[str]:
+    '''
+    Return the directories to watch for font changes: the directories
+    containing the fonts of the catalog, the directories between them
+    and the font directory roots (where new subdirectories appear
+    when font packages are installed) and the roots which exist.
+    '''
+    roots = [root for root in roots if os.path.isdir(root)]
+    directories = set(roots)
+    for directory in {os.path.dirname(file) for file in get_font_catalog().files()}:
+        while directory not in directories:
+            directories.add(directory)
+            if not any(directory.startswith(root + os.sep) for root in roots):
+                break
+            directory = os.path.dirname(directory)
+    return sorted(x for x in directories if os.path.isdir(x))
+
+# Files per fc-query call, to stay below the command line length limit
+FC_QUERY_CHUNK_SIZE = 200
+
+def query_font_files(files: List[str]) -> str:
+    '''
+    Return the faces of font files as fc-query prints them with
+    FC_LIST_CATALOG_FORMAT.  Files which are no fonts are skipped.
+    '''
+    fc_query_binary = shutil.which('fc-query')
+    if not fc_query_binary:
+        return ''
+    output = ''
+    for start in range(0, len(files), FC_QUERY_CHUNK_SIZE):
+        try:
+            # Exits with an error if any of the files is no font,
+            # the faces of the others are printed nevertheless
+            result = run_subprocess(
+                    [fc_query_binary, '--format', FC_LIST_CATALOG_FORMAT, '--']
+                    + files[start:start + FC_QUERY_CHUNK_SIZE],
+                    encoding='utf-8', errors='replace', check=False,
+                    capture_output=True)
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Exception when calling %s: %s: %s',
+                             fc_query_binary, error.__class__.__name__, error)
+            continue
+        output += result.stdout
+    return output
+
+class FontCatalogUpdate(NamedTuple):
+    '''What update_font_catalog() changed'''
+    # Font files which have been added or changed
+    files: List[str]
+    # New directories to watch as well
+    directories: List[str]
+    # Whether the catalog has changed at all
+    changed: bool
+    # Families, in lower case, of which no face is left
+    removed_families: FrozenSet[str] = frozenset()
+
+def update_font_catalog(paths: Iterable[str]) -> FontCatalogUpdate:
+    '''
+    Update the font catalog for files and directories which have been
+    added, changed or removed, with fc-query for the files found
+    there now, instead of listing all fonts with fc-list again.
+
+    The updated catalog and language registry replace the global ones,
+    so this runs in FONTCONFIG_EXECUTOR like the lookups using them.
+    '''
+    global FONT_CATALOG, LANGUAGE_REGISTRY
+    catalog = get_font_catalog()
+    paths = set(paths)
+    files: Set[str] = set()
+    directories: List[str] = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.add(path)
+            continue
+        for (root, subdirectories, names) in os.walk(path):
+            directories.append(root)
+            subdirectories[:] = [x for x in subdirectories if not x.startswith('.')]
+            files.update(os.path.join(root, name)
+                         for name in names if not name.startswith('.'))
+    # The fonts in directories which have been removed
+    files.update(file for file in catalog.files()
+                 if any(file.startswith(path + os.sep) for path in paths))
+    existing_files = sorted(x for x in files if os.path.isfile(x))
+    with trace_span('update_font_catalog', 'fontconfig',
+                    files=len(files), existing=len(existing_files)):
+        updated = catalog.updated(files, query_font_files(existing_files))
+    # pylint: disable=protected-access
+    changed = (len(updated._family) != len(catalog._family)
+               or len(updated) != len(catalog))
+    LOGGER.info('font catalog updated for %d files: %d faces before, %d now',
+                len(files), len(catalog), len(updated))
+    if not changed:
+        return FontCatalogUpdate(existing_files, directories, False)
+    with LANGUAGE_DATA_LOCK:
+        FONT_CATALOG = updated
+        FONT_FILE_CACHE.clear()
+        label_font_family.cache_clear()
+        if LANGUAGE_REGISTRY is not None:
+            LANGUAGE_REGISTRY = LANGUAGE_REGISTRY.with_updated_fonts()
+    # Otherwise the next start would load the catalog before the update
+    # from the cache, fc-cache need not have run since
+    cache_path = font_catalog_cache_path()
+    try:
+        updated.save(cache_path, font_catalog_cache_key())
+    except OSError as error:
+        LOGGER.info('Could not write font catalog cache %s: %s', cache_path, error)
+    return FontCatalogUpdate(
+        existing_files, directories, True,
+        frozenset(catalog._by_family).difference(updated._by_family))
+
+def default_font_family_for_language(lang: str, current_lang: str) -> str:
+    '''
+    Return the default font family fontconfig chooses for a language
+    (by fc-match).
+
+    :param lang: The language to get the font for
+    :param current_lang: The language currently selected in the user
+                         interface, if it matches the LC_MESSAGES locale
+                         the family name localized for that locale is used
+    '''
+    lang = lang.replace('_','-')
+    LOGGER.info('language: %s',lang)
+    fc_match_binary = shutil.which('fc-match')
+    if not fc_match_binary:
+        return ''
+    try:
+        result = run_subprocess(
+                [fc_match_binary, f':lang={lang}', 'family', 'style', 'file', 'familylang'],
+                encoding='utf-8', check=True, capture_output=True,
+                env={'LC_ALL': lang.replace('-', '_')})
+        pattern = re.compile(r'^(?P<families>.*?(?=:familylang=|$))(?::familylang=(?P<familylang>.*?))?:style=.*$')
+        match = pattern.match(result.stdout.strip())
+        if not match:
+            LOGGER.error('Regexp did not match')
+            return ''
+        families = match.group('families').split(',')
+        families = [f.replace("\\-", "-").strip() for f in families]
+        familylang = match.group('familylang').split(',') if match.group('familylang') else []
+        LOGGER.info('default font families=%s', families)
+        LOGGER.info('default familylang=%s', familylang)
+        last_family = ''
+        if families:
+            if current_lang in str(locale.getlocale(locale.LC_MESSAGES)[0]):
+                count=0
+                for i in familylang:
+                    if str(i) in str(locale.getlocale(locale.LC_MESSAGES)[0]):
+                        last_family = families[count]
+                        LOGGER.info('locale lang = %s',locale.getlocale(locale.LC_MESSAGES)[0])
                         LOGGER.info('selected default font = %s',last_family)
-                        first_font_saved = last_family
-                        LOGGER.info('first button font = %s', first_font_saved)
                         return last_family
-                else:
+                if last_family == '':
                     last_family = families[-1:][0]
-                    first_font_saved = last_family
-                    LOGGER.info('first button font = %s', first_font_saved)
                     LOGGER.info('selected default font = %s',last_family)
                     return last_family
+            else:
+                last_family = families[-1:][0]
+                LOGGER.info('selected default font = %s',last_family)
+                return last_family
+        return ''
+    except FileNotFoundError as error:
+        LOGGER.exception('Exception when calling %s: %s: %s',
+                         fc_match_binary, error.__class__.__name__, error)
+        return ''
+    except subprocess.CalledProcessError as error:
+        LOGGER.exception('Exception when calling %s: %s: %s stderr: %s',
+                         fc_match_binary,
+                         error.__class__.__name__, error, error.stderr)
+        return ''
+    except Exception as error: # pylint: disable=broad-except
+        LOGGER.exception('Exception when calling %s: %s: %s',
+                         fc_match_binary, error.__class__.__name__, error)
+        return ''
+
+def other_font_family_for_language(
+        lang: str, first_font: str, current_lang: str) -> str:
+    '''
+    Return a second font family for a language from the font catalog
+    which differs from first_font, or '' if there are no fonts for
+    the language.
+
+    :param lang: The language to get the font for
+    :param first_font: The family already used for the first label
+    :param current_lang: The language currently selected in the user
+                         interface, see default_font_family_for_language()
+    '''
+    lang = lang.replace('_','-')
+    try:
+        catalog = get_font_catalog()
+        #TrueType fonts first, then CFF fonts, like fc-list listed them
+        faces = (catalog.faces(lang=lang, fontformat='TrueType',
+                               exclude=NOFONTS_EXCLUDE)
+                 + catalog.faces(lang=lang, fontformat='CFF',
+                                 exclude=NOFONTS_EXCLUDE))
+        #selecting second font from the catalog
+        #but the second font should not match the first font
+        first_font = first_font.replace("\\-", "-").replace("\\", "").strip().lower()
+        LOGGER.info('first button font = %s', first_font)
+        other_face: Optional[Tuple[str, str, str]] = None
+        if len(faces) == 1:
+            other_face = faces[0]
+        elif len(faces) > 1:
+            LOGGER.info("Number of fonts in catalog for %s: %d", lang, len(faces))
+            for face in faces:
+                #eg. Noto Sans Tamil,Noto Sans Tamil
+                font_temp = face[0].split(',')[0].strip().lower()
+                if first_font != font_temp:
+                    #sometimes fontconfig includes style in family name
+                    #eg. Noto Sans Tamil is same Noto Sans Tamil Condensed
+                    other_face = face
+                    LOGGER.info('resulted font without having multiple families: %s', font_temp)
+                    break
+            if not other_face:
+                other_face = faces[1]
+        LOGGER.info('selected other font from catalog = %s', other_face)
+        if not other_face:
             return ''
-        except FileNotFoundError as error:
-            LOGGER.exception('Exception when calling %s: %s: %s',
-                             fc_match_binary, error.__class__.__name__, error)
-            return ''
-        except subprocess.CalledProcessError as error:
-            LOGGER.exception('Exception when calling %s: %s: %s stderr: %s',
-                             fc_match_binary,
-                             error.__class__.__name__, error, error.stderr)
+        families = [f.strip() for f in other_face[0].split(',')]
+        familylang = other_face[1].split(',')
+        LOGGER.info('Random font families=%s', families)
+        LOGGER.info('Random font familylang=%s', familylang)
+        last_family = ''
+        if families:
+            if current_lang in str(locale.getlocale(locale.LC_MESSAGES)[0]):
+                count=0
+                for i in familylang:
+                    if str(i) in str(locale.getlocale(locale.LC_MESSAGES)[0]):
+                        last_family = families[count]
+                        LOGGER.info('locale lang = %s',locale.getlocale(locale.LC_MESSAGES)[0])
+                        LOGGER.info('selected default font = %s',last_family)
+                        return last_family
+                if last_family == '':
+                    last_family = families[-1:][0]
+                    LOGGER.info('selected default font = %s',last_family)
+                    return last_family
+            else:
+                last_family = families[0]
+                LOGGER.info('selected other font before confirm = %s',last_family)
+        if not last_family:
             return ''
+        LOGGER.info('selected other font confirm = %s',last_family)
+        return last_family
+    except Exception as error: # pylint: disable=broad-except
+        LOGGER.exception('Exception when selecting other font for %s: %s: %s',
+                         lang, error.__class__.__name__, error)
+        return ''
+
+class FontResolution(NamedTuple):
+    '''The font families resolved for a language by resolve_font_families()'''
+    lang: str
+    first_family: str
+    other_family: str
+    # Family for the error label if there is no other family
+    label_family: str
+
+def resolve_font_families(
+        lang: str, current_lang: str, with_other: bool = True) -> FontResolution:
+    '''
+    Resolve the font families to compare for a language.
+
+    Calls fontconfig, which can take seconds with a cold fontconfig
+    cache, so the user interface runs this in FONTCONFIG_EXECUTOR.
+
+    :param lang: The language to get the fonts for
+    :param current_lang: The language currently selected in the user
+                         interface, see default_font_family_for_language()
+    :param with_other: Whether a second family is needed as well
+    '''
+    first_family = default_font_family_for_language(lang, current_lang)
+    other_family = ''
+    label_family = ''
+    if with_other and shutil.which('fc-list'):
+        other_family = other_font_family_for_language(
+            lang, first_family, current_lang)
+        if not other_family:
+            label_family = label_font_family(current_lang)
+    return FontResolution(lang, first_family, other_family, label_family)
+
+@functools.lru_cache(maxsize=None)
+def label_font_family(current_lang: str) -> str:
+    '''
+    Return the family for the English messages of the labels, only
+    looked up with fc-match once per language selected in the user
+    interface.  The cache is cleared when fonts change, see
+    update_font_catalog().
+    '''
+    return default_font_family_for_language('en', current_lang)
+
+def resolve_font_metadata(
+        font_names: List[str],
+        current_lang: str) -> Tuple[str, List[Optional['FontMetadata']]]:
+    '''
+    Look up the metadata of fonts for the font version labels.
+
+    :return: (label family, metadata of each font)
+    '''
+    return (label_font_family(current_lang),
+            [get_font_metadata(font_name) for font_name in font_names])
+
+def font_version_text(metadata: Optional['FontMetadata']) -> str:
+    '''Return the version shown for a font'''
+    if not metadata:
+        return 'No fontversion found'
+    return metadata.version
+
+# fc-match and fc-list are run in this worker so the main loop
+# never waits for fontconfig
+FONTCONFIG_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix='fontconfig')
+
+def specimen_faces_for_language(lang: str) -> List[Tuple[str, str]]:
+    '''
+    Return the (family, style) pairs of all faces in the font catalog
+    for a language, sorted by family.  Families and styles are given
+    by their first name, which fontconfig lists in English.
+    '''
+    faces = get_font_catalog().faces(
+        lang=lang.replace('_', '-'), exclude=NOFONTS_EXCLUDE)
+    return sorted({(family.split(',')[0].replace('\\-', '-').strip(),
+                    style.split(',')[0].strip())
+                   for (family, _familylang, style) in faces},
+                  key=lambda face: (face[0].lower(), face[1]))
+
+# Width of the text in a cell of the specimen grid in pixels
+SPECIMEN_CELL_WIDTH = 360
+# Number of Pango layouts the specimen grid keeps, a few screens full
+SPECIMEN_LAYOUT_CACHE_SIZE = 256
+
+class LayoutCache:
+    '''Pango layouts by key, the least recently used are dropped first'''
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size
+        self._layouts: collections.OrderedDict = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._layouts)
+
+    def get(self, key: Any, create: Any) -> Pango.Layout:
+        '''Return the layout for key, calling create() if it is not cached'''
+        layout = self._layouts.get(key)
+        if layout is not None:
+            self._layouts.move_to_end(key)
+            return layout
+        layout = create()
+        self._layouts[key] = layout
+        if len(self._layouts) > self._max_size:
+            self._layouts.popitem(last=False)
+        return layout
+
+def pango_sample_string(lang: str) -> str:
+    '''Return the sample string Pango has for a language'''
+    return str(Pango.Language.get_sample_string(Pango.language_from_string(lang)))
+
+def sample_text_for_language(lang: str, pango_sample_text: bool = False) -> str:
+    '''
+    sample text will be selected by either Pango or Langtable
+    '''
+    if pango_sample_text:
+        #True - Pango sample text
+        sample_text = pango_sample_string(lang)
+        if lang != 'en' and sample_text == "The quick brown fox jumps over the lazy dog.":
+            sample_text = str(langtable.language_name(
+                languageId=lang, languageIdQuery=lang))
+        return sample_text
+    #False - Langtable sample text
+    sample_text = str(langtable.language_name(
+        languageId=lang, languageIdQuery=lang))
+    return sample_text
+
+def render_comparison_image(
+        path: Any, output_format: str, text: str,
+        families: List[str], font_size: int, fallback: bool = False) -> None:
+    '''
+    Render text once in every family into a PNG or SVG file with
+    PangoCairo, each sample below a caption with the family name.
+    Works without a display.
+
+    :param path: Name of the file or a binary file object to write to
+    :param fallback: Whether characters missing in a family are drawn
+                     in other fonts, like the Fallback checkbox does
+    '''
+    margin = 20
+    max_width = 1200
+    scratch_context = cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1))
+    fallback_attrs = Pango.AttrList.new()
+    fallback_attrs.insert(Pango.attr_fallback_new(fallback))
+    layouts: List[Any] = []
+    for family in families:
+        caption = PangoCairo.create_layout(scratch_context)
+        caption.set_font_description(
+            Pango.font_description_from_string('Sans 10'))
+        caption.set_text(family or 'NOTE : fonts are not installed', -1)
+        layouts.append(caption)
+        if not family:
+            continue
+        layout = PangoCairo.create_layout(scratch_context)
+        layout.set_font_description(
+            Pango.font_description_from_string(f'{family} {font_size}'))
+        layout.set_attributes(fallback_attrs)
+        layout.set_width(max_width * Pango.SCALE)
+        layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+        layout.set_text(text, -1)
+        layouts.append(layout)
+    sizes = [layout.get_pixel_size() for layout in layouts]
+    width = max(size[0] for size in sizes) + 2 * margin
+    height = sum(size[1] for size in sizes) + (len(layouts) + 1) * margin
+    if output_format == 'svg':
+        surface = cairo.SVGSurface(path, width, height)
+    else:
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    context = cairo.Context(surface)
+    context.set_source_rgb(1, 1, 1)
+    context.paint()
+    context.set_source_rgb(0, 0, 0)
+    y_position = margin
+    for layout, size in zip(layouts, sizes):
+        context.move_to(margin, y_position)
+        PangoCairo.update_layout(context, layout)
+        PangoCairo.show_layout(context, layout)
+        y_position += size[1] + margin
+    if output_format == 'svg':
+        surface.finish()
+    else:
+        surface.write_to_png(path)
+
+def render_comparison(job: Tuple[str, str, str, str, int]) -> Tuple[str, str, str, str]:
+    '''
+    Resolve the two fonts for a language like the comparison window
+    does and render the text in both of them.  Runs in a worker
+    process of render_comparisons().
+
+    :param job: (language, text, output directory, output format, font size),
+                if the text is empty the langtable sample text is used
+    :return: (language, first font, other font, path of the image)
+    '''
+    (lang, text, output_dir, output_format, font_size) = job
+    first_font = default_font_family_for_language(lang, lang)
+    other_font = other_font_family_for_language(lang, first_font, lang)
+    if not other_font:
+        first_font = ''
+    text = text or sample_text_for_language(lang)
+    path = os.path.join(output_dir, f'{lang}.{output_format}')
+    render_comparison_image(path, output_format, text,
+                            [first_font, other_font], font_size)
+    return (lang, first_font, other_font, path)
+
+def render_comparisons(languages: List[str], text: str, output_dir: str,
+                       output_format: str) -> None:
+    '''
+    Render comparison images for several languages on a process pool
+    and print where they have been written.
+    '''
+    os.makedirs(output_dir, exist_ok=True)
+    # Build the catalog (or its cache) once before forking the workers
+    get_font_catalog()
+    jobs = [(lang, text, output_dir, output_format, DEFAULT_FONT_SIZE)
+            for lang in languages]
+    with concurrent.futures.ProcessPoolExecutor(
+            mp_context=multiprocessing.get_context('fork')) as executor:
+        for (lang, first_font, other_font, path) in executor.map(
+                render_comparison, jobs):
+            print(f'{lang}: {first_font or "-"} | {other_font or "-"} -> {path}')
+
+SERVE_DEFAULT_ADDRESS = '127.0.0.1:8765'
+# A request is refused with 503 when this many requests per render
+# worker are rendering or waiting already
+SERVE_QUEUE_PER_WORKER = 4
+SERVE_MAX_BODY_SIZE = 1024 * 1024
+SERVE_MAX_FONT_SIZE = 500
+
+class RenderRequest(NamedTuple):
+    '''A comparison requested from the --serve service'''
+    lang: str
+    text: str
+    # Fonts to compare, '' to resolve them like the window does
+    font_a: str
+    font_b: str
+    size: int
+    fallback: bool
+    output_format: str
+
+def parse_render_request(fields: Dict[str, Any]) -> RenderRequest:
+    '''
+    Check the fields of a request to the --serve service.  Without a
+    language the language of the text is detected, without a text the
+    language name is rendered.
+
+    :raise ValueError: if a field is invalid
+    '''
+    text = str(fields.get('text') or '')
+    lang = str(fields.get('lang') or '').replace('-', '_')
+    if not lang:
+        lang = LANGDETECT_EXECUTOR.submit(detect_language, text).result() if text else 'en'
+    output_format = str(fields.get('format') or 'png')
+    if output_format not in ('png', 'svg'):
+        raise ValueError(f'format must be png or svg, not {output_format}')
+    size = fields.get('size')
+    try:
+        size = DEFAULT_FONT_SIZE if size in (None, '') else int(size)
+    except (TypeError, ValueError) as error:
+        raise ValueError(f'size must be a number: {error}') from error
+    if not 1 <= size <= SERVE_MAX_FONT_SIZE:
+        raise ValueError(f'size must be between 1 and {SERVE_MAX_FONT_SIZE}')
+    fallback = fields.get('fallback', False)
+    if isinstance(fallback, str):
+        fallback = fallback.lower() in ('1', 'true', 'yes', 'on')
+    return RenderRequest(lang, text,
+                         str(fields.get('font_a') or ''),
+                         str(fields.get('font_b') or ''),
+                         size, bool(fallback), output_format)
+
+def render_request(request: RenderRequest) -> Dict[str, Any]:
+    '''
+    Render a request of the --serve service.  Runs in a render worker
+    of serve_comparisons().
+
+    :return: The JSON response with the image, base64 encoded, and the
+             fonts it shows
+    '''
+    fonts = [request.font_a, request.font_b]
+    if not all(fonts):
+        resolution = resolve_font_families(request.lang, request.lang)
+        fonts = [request.font_a or resolution.first_family,
+                 request.font_b or resolution.other_family]
+    text = request.text or sample_text_for_language(request.lang)
+    image = io.BytesIO()
+    with trace_span('render_request', 'serve', lang=request.lang):
+        render_comparison_image(image, request.output_format, text, fonts,
+                                request.size, request.fallback)
+    font_list = []
+    for font_name in fonts:
+        metadata = None
+        if font_name:
+            # FreeType must not open faces in several threads at once,
+            # all faces are read in the fontconfig worker
+            metadata = FONTCONFIG_EXECUTOR.submit(
+                get_font_metadata, font_name).result()
+        font_list.append({
+            'name': font_name,
+            'file': metadata.path if metadata else None,
+            'face_index': metadata.face_index if metadata else None,
+            'version': metadata.version if metadata else None})
+    return {'lang': request.lang,
+            'text': text,
+            'size': request.size,
+            'fallback': request.fallback,
+            'fonts': font_list,
+            'format': request.output_format,
+            'image': base64.b64encode(image.getvalue()).decode('ascii')}
+
+class RenderRequestHandler(http.server.BaseHTTPRequestHandler):
+    '''
+    Handles GET /render?lang=...&text=... and POST /render with the
+    same fields as a JSON object, see parse_render_request()
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None: # pylint: disable=invalid-name
+        '''Render the request in the query string'''
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != '/render':
+            self.send_json(404, {'error': f'unknown path {url.path}'})
+            return
+        self.render(dict(urllib.parse.parse_qsl(url.query)))
+
+    def do_POST(self) -> None: # pylint: disable=invalid-name
+        '''Render the request in the JSON body'''
+        if urllib.parse.urlsplit(self.path).path != '/render':
+            self.send_json(404, {'error': f'unknown path {self.path}'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            length = -1
+        if length < 0 or length > SERVE_MAX_BODY_SIZE:
+            # The body is not read, the connection cannot be reused
+            self.close_connection = True
+            if length < 0:
+                self.send_json(400, {'error': 'invalid or missing Content-Length'})
+            else:
+                self.send_json(413, {'error': 'request too large'})
+            return
+        try:
+            fields = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as error:
+            self.send_json(400, {'error': f'invalid JSON: {error}'})
+            return
+        if not isinstance(fields, dict):
+            self.send_json(400, {'error': 'request must be a JSON object'})
+            return
+        self.render(fields)
+
+    def render(self, fields: Dict[str, Any]) -> None:
+        '''Queue the request on a render worker and send its result'''
+        server: Any = self.server
+        if not server.render_slots.acquire(blocking=False):
+            self.send_json(503, {'error': 'too many requests, try again later'})
+            return
+        try:
+            request = parse_render_request(fields)
+            response = server.render_executor.submit(render_request, request).result()
+        except ValueError as error:
+            self.send_json(400, {'error': str(error)})
+            return
         except Exception as error: # pylint: disable=broad-except
-            LOGGER.exception('Exception when calling %s: %s: %s',
-                             fc_match_binary, error.__class__.__name__, error)
-            return ''
+            LOGGER.exception('Exception when rendering %s: %s: %s',
+                             fields, error.__class__.__name__, error)
+            self.send_json(500, {'error': f'{error.__class__.__name__}: {error}'})
+            return
+        finally:
+            server.render_slots.release()
+        self.send_json(200, response)
+
+    def send_json(self, status: int, body: Dict[str, Any]) -> None:
+        '''Send a JSON response'''
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None: # pylint: disable=redefined-builtin
+        # The client address of a Unix socket is empty
+        LOGGER.info('%s', format % args)
+
+class UnixRenderServer(socketserver.ThreadingUnixStreamServer):
+    '''The --serve service on a Unix socket'''
+    daemon_threads = True
+
+def serve_comparisons(address: str, workers: int) -> None:
+    '''
+    Serve rendered comparisons over HTTP until interrupted.
+
+    The font catalog, fontconfig, the FreeType faces and langdetect
+    stay loaded between requests.  Requests render on a pool of
+    workers, and requests which do not fit into the queue are refused
+    instead of waiting.
+
+    :param address: “unix:PATH”, “HOST:PORT” or “PORT”
+    :param workers: Number of requests rendered at the same time
+    '''
+    server: Any
+    if address.startswith('unix:'):
+        socket_path = address[len('unix:'):]
+        # Remove the socket of an earlier run, but nothing else
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.unlink(socket_path)
+        server = UnixRenderServer(socket_path, RenderRequestHandler)
+    else:
+        (host, _sep, port) = address.rpartition(':')
+        server = http.server.ThreadingHTTPServer(
+            (host or '127.0.0.1', int(port)), RenderRequestHandler)
+        server.daemon_threads = True
+    server.render_executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix='render')
+    server.render_slots = threading.BoundedSemaphore(
+        workers * (1 + SERVE_QUEUE_PER_WORKER))
+    with trace_span('warm_up', 'serve'):
+        get_font_catalog()
+        server.render_executor.submit(
+            render_request, parse_render_request({'lang': 'en'})).result()
+        # Loads the langdetect profiles
+        LANGDETECT_EXECUTOR.submit(
+            detect_language, 'Ein kurzer Satz zum Aufwärmen').result()
+    print(f'fonts-compare serving on {address} with {workers} render workers')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.render_executor.shutdown(wait=False)
+        if address.startswith('unix:'):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(address[len('unix:'):])
+
+#clean non-printable letters from freetype returned string
+def clean_string(s: str) -> str:
+    return ''.join(filter(lambda x: x in string.printable, s)).strip()
+
+class FontMetadata(NamedTuple):
+    '''Metadata of one font face, mostly from its sfnt name table'''
+    path: str
+    face_index: int
+    version: str
+    vendor: str
+    license: str
+    designer: str
+    glyph_count: int
+
+# sfnt name ids of the FontMetadata fields
+SFNT_NAME_IDS = {5: 'version', 8: 'vendor', 9: 'designer', 13: 'license'}
+
+# Pango (OpenType) weights and the fontconfig weight names for them
+FC_WEIGHT_NAMES = ((100, 'thin'), (200, 'extralight'), (300, 'light'),
+                   (350, 'semilight'), (380, 'book'), (400, 'regular'),
+                   (500, 'medium'), (600, 'semibold'), (700, 'bold'),
+                   (800, 'extrabold'), (900, 'black'))
+
+# fontconfig pattern of a font name -> (file, face index) fontconfig
+# resolves it to.  Only installed families are cached, so the size is
+# bounded by the installed faces whatever names --serve clients send
+FONT_FILE_CACHE: Dict[str, Tuple[str, int]] = {}
+# (file, face index, mtime, size) -> metadata
+FONT_METADATA_CACHE: Dict[Tuple[str, int, int, int], FontMetadata] = {}
+
+def fontconfig_pattern_for_font_name(font_name: str) -> str:
+    '''
+    Convert a Pango font description string like “Noto Sans Bold
+    Italic” into a fontconfig pattern which selects the same face
+    Pango uses.
+    '''
+    font_description = Pango.font_description_from_string(font_name)
+    family = font_description.get_family() or ''
+    family = family.replace('\\', '\\\\').replace('-', '\\-').replace(':', '\\:')
+    weight = int(font_description.get_weight())
+    fc_weight = min(FC_WEIGHT_NAMES, key=lambda x: abs(x[0] - weight))[1]
+    slant = {Pango.Style.ITALIC: 'italic',
+             Pango.Style.OBLIQUE: 'oblique'}.get(
+                 font_description.get_style(), 'roman')
+    return f'{family}:weight={fc_weight}:slant={slant}'
+
+def resolve_font_file(font_name: str) -> Optional[Tuple[str, int]]:
+    '''
+    Return the file and the face index in that file (for font
+    collections) fontconfig chooses for a Pango font name, or None
+    if the family is not installed.  Results are cached.
+    '''
+    pattern = fontconfig_pattern_for_font_name(font_name)
+    if pattern in FONT_FILE_CACHE:
+        return FONT_FILE_CACHE[pattern]
+    fc_match_binary = shutil.which('fc-match')
+    if not fc_match_binary:
+        return None
+    family = (Pango.font_description_from_string(font_name).get_family() or '').lower()
+    resolved: Optional[Tuple[str, int]] = None
+    try:
+        result = run_subprocess(
+                [fc_match_binary, '--format', '%{family}\t%{file}\t%{index}',
+                 pattern],
+                encoding='utf-8', check=True, capture_output=True)
+        (families, path, face_index) = result.stdout.split('\t')
+        if family in [x.strip().lower() for x in families.split(',')]:
+            resolved = (path, int(face_index) if face_index.isdigit() else 0)
+    except subprocess.CalledProcessError as error:
+        LOGGER.exception('Exception when calling %s: %s: %s stderr: %s',
+                         fc_match_binary,
+                         error.__class__.__name__, error, error.stderr)
+        return None
+    except Exception as error: # pylint: disable=broad-except
+        LOGGER.exception('Exception when calling %s: %s: %s',
+                         fc_match_binary, error.__class__.__name__, error)
+        return None
+    LOGGER.info('font file for %s: %s', font_name, resolved)
+    if resolved:
+        FONT_FILE_CACHE[pattern] = resolved
+    return resolved
+
+def font_file_key(path: str, face_index: int) -> Tuple[str, int, int, int]:
+    '''
+    Return the key of the caches of data read from a face of a font
+    file, which changes when the file is modified
+    '''
+    stat = os.stat(path)
+    return (path, face_index, stat.st_mtime_ns, stat.st_size)
+
+def read_font_metadata(path: str, face_index: int = 0) -> FontMetadata:
+    '''
+    Read the metadata of one face of a font file with FreeType,
+    scanning the sfnt name table only once.  English Windows names
+    are preferred over other Unicode names and over Macintosh names.
+    '''
+    face = freetype.Face(path, face_index)
+    names: Dict[str, Tuple[int, str]] = {}
+    for index in range(face.sfnt_name_count):
+        name = face.get_sfnt_name(index)
+        field = SFNT_NAME_IDS.get(name.name_id)
+        if not field:
+            continue
+        if name.platform_id in (0, 3):
+            text = name.string.decode('utf-16-be', errors='replace')
+            priority = 0 if (name.platform_id, name.language_id) == (3, 0x409) else 1
+        elif name.platform_id == 1:
+            text = name.string.decode('mac_roman', errors='replace')
+            priority = 2
+        else:
+            continue
+        if field not in names or priority < names[field][0]:
+            names[field] = (priority, clean_string(text))
+    return FontMetadata(
+        path=path,
+        face_index=face_index,
+        version=names.get('version', (0, ''))[1],
+        vendor=names.get('vendor', (0, ''))[1],
+        license=names.get('license', (0, ''))[1],
+        designer=names.get('designer', (0, ''))[1],
+        glyph_count=face.num_glyphs)
+
+def get_font_metadata(font_name: str) -> Optional[FontMetadata]:
+    '''
+    Return the metadata of the face fontconfig uses for a Pango font
+    name.  The name table of a face is only read again when the file
+    has been modified.
+    '''
+    resolved = resolve_font_file(font_name)
+    if not resolved:
+        return None
+    (path, face_index) = resolved
+    try:
+        key = font_file_key(path, face_index)
+        if key not in FONT_METADATA_CACHE:
+            FONT_METADATA_CACHE[key] = read_font_metadata(path, face_index)
+        return FONT_METADATA_CACHE[key]
+    except Exception as error: # pylint: disable=broad-except
+        LOGGER.exception('Exception when reading %s: %s: %s',
+                         path, error.__class__.__name__, error)
+        return None
 
-    #----------selecting other font for label2
+class CodepointSet:
+    '''
+    Set of Unicode code points, stored as one 256 bit integer for
+    each block of 256 code points which has any code point in the set.
 
-    def get_other_font_family_for_language(self, lang: str) -> str:
-        '''
-        getting a other font using fc-list
-        '''
-        global first_font_saved
-        lang = lang.replace('_','-')
-        fc_list_binary = shutil.which('fc-list')
-        if not fc_list_binary:
-            return ''
-        try:
-            result1 = subprocess.run(
-                    [fc_list_binary, f':lang={lang}:fontformat=TrueType', 'family', 'style', 'familylang'],
-                    encoding='utf-8', check=True, capture_output=True)
-            fonts_listed1 = result1.stdout.strip().split('\n')
-            result2 = subprocess.run(
-                    [fc_list_binary, f':lang={lang}:fontformat=CFF', 'family', 'style', 'familylang'],
-                    encoding='utf-8', check=True, capture_output=True)
-            fonts_listed2 = result2.stdout.strip().split('\n')
-            fonts_listed = fonts_listed1 + fonts_listed2
-            list_unfilter_other_font = [x for x in fonts_listed
-                                        if x and not ('Droid' in x or 'STIX' in x)] #--if x and-- to exclude empty items 
-            families = [f.replace("\\-", "-").strip() for f in list_unfilter_other_font] #some fonts have //- or /-
-            #selecting second font from fc-list
-            #but the second font should not match the first font
-            first_font_saved = first_font_saved.replace("\\-", "-").replace("\\", "").strip().lower()
-            LOGGER.info('first button font = %s', first_font_saved)
-            other_font = ''
-            if len(list_unfilter_other_font) == 1:
-                other_font = list_unfilter_other_font[0]
-            elif len(list_unfilter_other_font) > 1:
-                LOGGER.info("Number of fonts in list_unfilter_other_font: %d", len(list_unfilter_other_font))
-                for font in list_unfilter_other_font:
-                    LOGGER.info('font which may have comma separated multiple fonts: %s', font)
-                    font_temp = font.split(':familylang')[0].replace("\\-", "-").replace("\\", "").strip().lower()
-                    if ',' in font_temp:
-                        #eg. Noto Sans Tamil,Noto Sans Tamil
-                        font_temp = font_temp.split(',')[0].strip()
-                    if first_font_saved.strip().lower() != font_temp:
-                        #sometimes fontconfig includes style in family name
-                        #eg. Noto Sans Tamil is same Noto Sans Tamil Condensed
-                        other_font = font
-                        LOGGER.info('resulted font without having multiple families - style included: %s', font)
-                        LOGGER.info('resulted font without having multiple families - style not included: %s', font_temp)
-                        break
-                if not other_font:
-                    if ',' in other_font:
-                        other_font = other_font.split(',')[0].strip()
-                    other_font = list_unfilter_other_font[1]
-            LOGGER.info('selected other list from fc-list = %s',other_font)
-            if other_font:
-                #diable error label when font available
-                if GTK_VERSION >= (4, 9, 3):
-                    self.label_error.set_property("visible", False)
-                else:
-                    self.label_error.hide()
-            else:
-                LOGGER.info('fonts are not installed for %s language',lang)
-                #error level show no font installed
-                label_error_text = "NOTE : fonts are not installed for " + lang + " language"
-                self.label_error.set_markup('<span foreground='+"'red'"+ 'font="'
-                                            +self.get_default_font_family_for_language('en')
-                                            +' '+'10'+'"' + FALLPARAM
-                                            + '<b>' + label_error_text + '</b>'
-                                            + '</span>')
-                self.label_error.set_visible(True)
-                # if no fonts are installed than first fontbutton should not select default noto sans - it should return none
-                if GTK_VERSION >= (4, 9, 3):
-                    self.font_dialog_button1.set_font_desc(Pango.font_description_from_string('' +' '+str(int(self._fontsize_adjustment.get_value()))))
-                else:
-                    self.button1.set_font('' +' '+str(int(self._fontsize_adjustment.get_value())))
-                return ''
-            #sometimes other_font doesnot contain any style then error arises
-            if other_font.find(":style") != -1:
-                pattern = re.compile(r'^(?P<families>.*?(?=:familylang=|$))(?::familylang=(?P<familylang>.*?))?:style=.*$')
-            else:
-                pattern = re.compile(r'^(?P<families>.*?(?=:familylang=|$))(?::familylang=(?P<familylang>.*?))')
-            match = pattern.match(other_font)
-            if not match:
-                LOGGER.error('Regexp did not match %s', result.stdout.strip())
-                return ''
-            families = match.group('families').split(',')
-            families = [f.replace("\\-", "-").strip() for f in families]
-            familylang = match.group('familylang').split(',')
-            LOGGER.info('Random font families=%s', families)
-            LOGGER.info('Random font familylang=%s', familylang)
-            last_family = ''
-            if families:
-                current_lang = self._language_menu_button.get_label()
-                if current_lang in str(locale.getlocale(locale.LC_MESSAGES)[0]):
-                    count=0
-                    for i in familylang:
-                        if str(i) in str(locale.getlocale(locale.LC_MESSAGES)[0]):
-                            last_family = families[count]
-                            LOGGER.info('locale lang = %s',locale.getlocale(locale.LC_MESSAGES)[0])
-                            LOGGER.info('selected default font = %s',last_family)
-                            return last_family
-                    if last_family == '':
-                        last_family = families[-1:][0]
-                        LOGGER.info('selected default font = %s',last_family)
-                        return last_family
-                else:
-                    last_family = families[0]
-                    LOGGER.info('selected other font before confirm = %s',last_family)
-            if not last_family:
-                return ''
-            LOGGER.info('selected other font confirm = %s',last_family)
-            return last_family
-        except FileNotFoundError as error:
-            LOGGER.exception('Exception when calling %s: %s: %s',
-                             fc_list_binary, error.__class__.__name__, error)
-            return ''
-        except subprocess.CalledProcessError as error:
-            LOGGER.exception('Exception when calling %s: %s: %s stderr: %s',
-                             fc_list_binary,
-                             error.__class__.__name__, error, error.stderr)
-            return ''
-        except Exception as error: # pylint: disable=broad-except
-            LOGGER.exception('Exception when calling %s: %s: %s',
-                             fc_list_binary, error.__class__.__name__, error)
-            return ''
+    A font covering all of Unicode needs less than 140 KB, a font for
+    one script only a few hundred bytes.
+    '''
+    __slots__ = ('_pages',)
 
-    def update_language_filter(self, detected_lang: str) -> None:
-        '''
-        Updates the language filter for font selection and menu based on detected language.
-        Note: For GTK >= 4.9.3, language filter is NOT set here.
-        The filter is set in set_font() when fonts are actually updated.
-        '''
-        LOGGER.info(f'Updating language filter for detected language: {detected_lang}')
-        if detected_lang in list_languages():
-            if GTK_VERSION >= (4, 9, 3):
-                LOGGER.info('Language filter will be set when fonts are updated')
-            else:
-                self.button1.set_filter_func(self.font_filter)
-                self.button2.set_filter_func(self.font_filter)
-            self._language_menu_button.set_tooltip_text(
-                langtable.language_name(languageId=detected_lang, languageIdQuery='en')
-            )
+    def __init__(self, code_points: Iterable[int] = ()) -> None:
+        pages: Dict[int, int] = {}
+        for code_point in code_points:
+            page = code_point >> 8
+            pages[page] = pages.get(page, 0) | 1 << (code_point & 0xFF)
+        self._pages = pages
 
-    def _on_key_press_global(self, controller, keyval, keycode, state):
-        ctrl = state & Gdk.ModifierType.CONTROL_MASK
-        key = Gdk.keyval_name(keyval)
-        if self._main_menu_popover.get_visible():
-            self._main_menu_popover.popdown()
-        if ctrl and key == "q":
-            self.close()
-            return True
-        elif ctrl and key == "e":
-            self._on_edit_label_button_clicked(None)
-            return True
+    def __contains__(self, code_point: object) -> bool:
+        if not isinstance(code_point, int):
+            return False
+        return bool(self._pages.get(code_point >> 8, 0) >> (code_point & 0xFF) & 1)
 
-        return False
+    def __len__(self) -> int:
+        return sum(bin(bits).count('1') for bits in self._pages.values())
 
-#def on_activate(application: Gtk.Application, language: str, text: str = "") -> None:
-def on_activate(application: Adw.Application, language: str, text: str = "", lang_explicitly_set: bool = False) -> None:
+# (file, face index, mtime, size) -> code points in the cmap of the face
+FONT_COVERAGE_CACHE: Dict[Tuple[str, int, int, int], CodepointSet] = {}
+# ((file, face index, mtime, size), language) -> code points of the
+# orthography of the language which the face does not cover
+FONT_EXEMPLAR_GAPS_CACHE: Dict[
+    Tuple[Tuple[str, int, int, int], str], FrozenSet[int]] = {}
+
+def read_font_coverage(path: str, face_index: int = 0) -> CodepointSet:
     '''
-    activating the application by adding the application into gtk window
+    Read the code points one face of a font file has glyphs for
+    from the Unicode cmap FreeType selects when opening the face
     '''
-    win = AppWindow(application, language, lang_explicitly_set)
-    if text:
-        detected_lang = win.detect_language(text)
-        win.set_font(detected_lang, text)
-        win._language_menu_button.set_label(detected_lang)
-        win._currently_selected_language = detected_lang
+    face = freetype.Face(path, face_index)
+    code_points = []
+    (code_point, glyph_index) = face.get_first_char()
+    while glyph_index:
+        code_points.append(code_point)
+        (code_point, glyph_index) = face.get_next_char(code_point, glyph_index)
+    return CodepointSet(code_points)
+
+def get_font_coverage(font_name: str) -> Optional[CodepointSet]:
+    '''
+    Return the code points covered by the face fontconfig uses for
+    a Pango font name.  The cmap of a face is only read again when
+    the file has been modified.
+    '''
+    resolved = resolve_font_file(font_name)
+    if not resolved:
+        return None
+    (path, face_index) = resolved
+    try:
+        key = font_file_key(path, face_index)
+        if key not in FONT_COVERAGE_CACHE:
+            with trace_span('read_font_coverage', 'freetype', path=path):
+                FONT_COVERAGE_CACHE[key] = read_font_coverage(path, face_index)
+        return FONT_COVERAGE_CACHE[key]
+    except Exception as error: # pylint: disable=broad-except
+        LOGGER.exception('Exception when reading %s: %s: %s',
+                         path, error.__class__.__name__, error)
+        return None
 
-    win.present()
+def get_font_exemplar_gaps(font_name: str, lang: str) -> Optional[FrozenSet[int]]:
+    '''
+    Return the code points of the orthography fontconfig has for a
+    language which the face fontconfig uses for a Pango font name
+    does not cover, or None if that is not known.
 
-def detect_script(text: str) -> Set[str]:
+    fc-validate prints them one per line as hexadecimal numbers.
     '''
-    Detects all scripts used in the given text.
+    resolved = resolve_font_file(font_name)
+    fc_validate_binary = shutil.which('fc-validate')
+    if not resolved or not fc_validate_binary or not lang:
+        return None
+    (path, face_index) = resolved
+    fc_lang = lang.replace('_', '-').lower()
+    try:
+        key = (font_file_key(path, face_index), fc_lang)
+        if key not in FONT_EXEMPLAR_GAPS_CACHE:
+            # fc-validate exits with status 1 if glyphs are missing
+            result = run_subprocess(
+                [fc_validate_binary, '--verbose', f'--index={face_index}',
+                 f'--lang={fc_lang}', path],
+                encoding='utf-8', check=False, capture_output=True)
+            if 'No such orthography' in result.stdout + result.stderr:
+                return None
+            FONT_EXEMPLAR_GAPS_CACHE[key] = frozenset(
+                int(match.group(1), 16) for match in re.finditer(
+                    r'^\s+(?:0x)?([0-9a-fA-F]+)\s*$', result.stdout, re.MULTILINE))
+        return FONT_EXEMPLAR_GAPS_CACHE[key]
+    except FileNotFoundError as error:
+        LOGGER.exception('Exception when calling %s: %s: %s',
+                         fc_validate_binary, error.__class__.__name__, error)
+        return None
+    except Exception as error: # pylint: disable=broad-except
+        LOGGER.exception('Exception when calling %s: %s: %s',
+                         fc_validate_binary, error.__class__.__name__, error)
+        return None
+
+class FontCoverage(NamedTuple):
+    '''What one face covers, see resolve_font_coverage()'''
+    code_points: Optional[CodepointSet]
+    # Code points of the orthography of the language the face lacks
+    exemplar_gaps: Optional[FrozenSet[int]]
+
+def resolve_font_coverage(font_names: List[str], lang: str) -> List[FontCoverage]:
     '''
-    scripts = set()
-    for char in text:
-        try:
-            script = unicodedata.name(char).split(' ')[0]
-            scripts.add(script)
-        except ValueError:
-            pass
-    return scripts
+    Look up the coverage of fonts for the glyph coverage label.
+    Reads font files and calls fontconfig, so the user interface
+    runs this in FONTCONFIG_EXECUTOR.
+    '''
+    return [FontCoverage(get_font_coverage(font_name),
+                         get_font_exemplar_gaps(font_name, lang))
+            for font_name in font_names]
+
+class CoverageDiff(NamedTuple):
+    '''The characters only one of two fonts covers, see coverage_diff()'''
+    text_only_first: str
+    text_only_second: str
+    exemplars_only_first: str
+    exemplars_only_second: str
+
+def coverage_diff(text: str, first: FontCoverage, second: FontCoverage) -> CoverageDiff:
+    '''
+    Compare which characters of a text and of the orthography of the
+    language two fonts cover.  Spaces and control characters are
+    ignored.  Cheap enough to run for every change of the text once
+    the coverage of the fonts is known.
+    '''
+    characters = sorted({char for char in text
+                         if char.isprintable() and not char.isspace()})
+    text_only = []
+    for (coverage, other) in ((first, second), (second, first)):
+        if coverage.code_points is None or other.code_points is None:
+            text_only.append('')
+            continue
+        text_only.append(''.join(
+            char for char in characters
+            if ord(char) in coverage.code_points
+            and ord(char) not in other.code_points))
+    exemplars_only = []
+    for (coverage, other) in ((first, second), (second, first)):
+        if coverage.exemplar_gaps is None or other.exemplar_gaps is None:
+            exemplars_only.append('')
+            continue
+        exemplars_only.append(''.join(
+            chr(code_point)
+            for code_point in sorted(other.exemplar_gaps - coverage.exemplar_gaps)))
+    return CoverageDiff(text_only[0], text_only[1],
+                        exemplars_only[0], exemplars_only[1])
+
+def coverage_diff_text(first_name: str, second_name: str,
+                       diff: CoverageDiff, max_chars: int = 40) -> str:
+    '''Return the lines of the glyph coverage label'''
+    def shorten(chars: str) -> str:
+        if len(chars) > max_chars:
+            return f'{chars[:max_chars]}… ({len(chars)})'
+        return chars
+    lines = []
+    for (name, other_name, text_only, exemplars_only) in (
+            (first_name, second_name, diff.text_only_first, diff.exemplars_only_first),
+            (second_name, first_name, diff.text_only_second, diff.exemplars_only_second)):
+        parts = []
+        if text_only:
+            parts.append(f'text: {shorten(text_only)}')
+        if exemplars_only:
+            parts.append(f'language: {shorten(exemplars_only)}')
+        if parts:
+            lines.append(f'Only {name}, not {other_name}: ' + '; '.join(parts))
+    if not lines:
+        return 'Both fonts cover the same characters'
+    return '\n'.join(lines)
+
+class FontTableMetrics(NamedTuple):
+    '''
+    Vertical and horizontal metrics of a face in font units, from its
+    “head”, “hhea” and “OS/2” tables.  x_height and cap_height are
+    None if the OS/2 table is older than version 2.
+    '''
+    units_per_em: int
+    ascender: int
+    descender: int
+    line_gap: int
+    x_height: Optional[int]
+    cap_height: Optional[int]
+    average_advance: int
+
+# (file, face index, mtime, size) -> metrics
+FONT_TABLE_METRICS_CACHE: Dict[Tuple[str, int, int, int], FontTableMetrics] = {}
+
+def read_sfnt_tables(path: str, face_index: int, tags: Tuple[str, ...]) -> Dict[str, bytes]:
+    '''
+    Read some tables of one face of an sfnt font file or collection,
+    without reading the rest of the file
+    '''
+    tables: Dict[str, bytes] = {}
+    with open(path, 'rb') as font_file:
+        offset = 0
+        if font_file.read(4) == b'ttcf':
+            # The upper 16 bits of the fontconfig index are the named
+            # instance of a variable font, not the face in the file
+            font_file.seek(12 + 4 * (face_index & 0xFFFF))
+            (offset,) = struct.unpack('>I', font_file.read(4))
+        font_file.seek(offset + 4)
+        (number_of_tables,) = struct.unpack('>H', font_file.read(2))
+        font_file.seek(offset + 12)
+        directory = font_file.read(16 * number_of_tables)
+        for position in range(0, len(directory), 16):
+            (tag, _checksum, table_offset, length) = struct.unpack_from(
+                '>4sIII', directory, position)
+            tag_text = tag.decode('latin-1')
+            if tag_text in tags:
+                font_file.seek(table_offset)
+                tables[tag_text] = font_file.read(length)
+    return tables
+
+def read_font_table_metrics(path: str, face_index: int = 0) -> FontTableMetrics:
+    '''
+    Read the metrics of one face of a font file.  Ascender, descender
+    and line gap are the typographic ones from the OS/2 table if the
+    face asks for them with USE_TYPO_METRICS, else the ones from the
+    hhea table, like FreeType and Pango do.
+    '''
+    tables = read_sfnt_tables(path, face_index, ('head', 'hhea', 'OS/2'))
+    (units_per_em,) = struct.unpack_from('>H', tables['head'], 18)
+    (ascender, descender, line_gap) = struct.unpack_from('>hhh', tables['hhea'], 4)
+    average_advance = 0
+    x_height: Optional[int] = None
+    cap_height: Optional[int] = None
+    os2 = tables.get('OS/2', b'')
+    if len(os2) >= 78:
+        (version, average_advance) = struct.unpack_from('>Hh', os2, 0)
+        (fs_selection,) = struct.unpack_from('>H', os2, 62)
+        if fs_selection & 0x80:
+            (ascender, descender, line_gap) = struct.unpack_from('>hhh', os2, 68)
+        if version >= 2 and len(os2) >= 90:
+            (x_height, cap_height) = struct.unpack_from('>hh', os2, 86)
+    return FontTableMetrics(units_per_em, ascender, descender, line_gap,
+                            x_height, cap_height, average_advance)
+
+def get_font_table_metrics(path: str, face_index: int = 0) -> Optional[FontTableMetrics]:
+    '''
+    Return the metrics of one face of a font file, the tables are
+    only read again when the file has been modified
+    '''
+    try:
+        key = font_file_key(path, face_index)
+        if key not in FONT_TABLE_METRICS_CACHE:
+            FONT_TABLE_METRICS_CACHE[key] = read_font_table_metrics(path, face_index)
+        return FONT_TABLE_METRICS_CACHE[key]
+    except Exception as error: # pylint: disable=broad-except
+        LOGGER.exception('Exception when reading %s: %s: %s',
+                         path, error.__class__.__name__, error)
+        return None
 
-def is_mixed_script(text: str) -> bool:
+def resolve_font_table_metrics(font_names: List[str]) -> List[Optional[FontTableMetrics]]:
     '''
-    Checks if the text contains multiple scripts.
+    Look up the metrics of the faces fontconfig uses for Pango font
+    names, for the metrics panel.  Runs in FONTCONFIG_EXECUTOR.
     '''
-    return len(detect_script(text)) > 1
+    metrics: List[Optional[FontTableMetrics]] = []
+    for font_name in font_names:
+        resolved = resolve_font_file(font_name)
+        metrics.append(get_font_table_metrics(*resolved) if resolved else None)
+    return metrics
+
+def text_pixel_sizes(font_descs: List[Pango.FontDescription], text: str,
+                     context: Pango.Context) -> List[Tuple[int, int]]:
+    '''
+    Return the width and height in pixels of text in each font,
+    without fallback to other fonts.  One layout is reused, so each
+    font costs a single layout pass.
+    '''
+    layout = Pango.Layout.new(context)
+    no_fallback = Pango.AttrList.new()
+    no_fallback.insert(Pango.attr_fallback_new(False))
+    layout.set_attributes(no_fallback)
+    layout.set_text(text, -1)
+    sizes: List[Tuple[int, int]] = []
+    for font_desc in font_descs:
+        layout.set_font_description(font_desc)
+        (width, height) = layout.get_pixel_size()
+        sizes.append((width, height))
+    return sizes
+
+# Columns of the metrics table, the font metrics are per 1000 units
+# of the em so fonts with different units per em can be compared
+FONT_METRICS_COLUMNS = ('ascender', 'descender', 'line gap', 'x-height',
+                        'cap height', 'avg advance', 'text width', 'text height')
+
+def font_metrics_values(
+        table_metrics: Optional[FontTableMetrics],
+        text_size: Tuple[int, int]) -> List[Optional[int]]:
+    '''Return the values of the FONT_METRICS_COLUMNS for a font'''
+    if not table_metrics:
+        return [None] * (len(FONT_METRICS_COLUMNS) - 2) + list(text_size)
+    def per_mille(value: Optional[int]) -> Optional[int]:
+        if value is None:
+            return None
+        return round(value * 1000 / table_metrics.units_per_em)
+    return [per_mille(table_metrics.ascender),
+            per_mille(table_metrics.descender),
+            per_mille(table_metrics.line_gap),
+            per_mille(table_metrics.x_height),
+            per_mille(table_metrics.cap_height),
+            per_mille(table_metrics.average_advance),
+            text_size[0], text_size[1]]
+
+def font_metrics_for_language(
+        lang: str, text: str,
+        font_size: int = DEFAULT_FONT_SIZE) -> Dict[str, List[Optional[int]]]:
+    '''
+    Return the FONT_METRICS_COLUMNS of every face fontconfig has for a
+    language, by font name.  The files come from the font catalog, so
+    no fontconfig command runs per face.
+    '''
+    catalog = get_font_catalog()
+    faces = specimen_faces_for_language(lang)
+    fonts = [FontSelection(family, style) for (family, style) in faces]
+    context = PangoCairo.create_context(
+        cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)))
+    text_sizes = text_pixel_sizes(
+        [font.font_description(font_size) for font in fonts], text, context)
+    result: Dict[str, List[Optional[int]]] = {}
+    for (family, style), font, text_size in zip(faces, fonts, text_sizes):
+        resolved = catalog.file_for_face(family, style)
+        result[font.name()] = font_metrics_values(
+            get_font_table_metrics(*resolved) if resolved else None, text_size)
+    return result
+
+def print_font_metrics(metrics: Dict[str, List[Optional[int]]], output_format: str) -> None:
+    '''Print the result of font_metrics_for_language()'''
+    if output_format == 'json':
+        print(json.dumps({font_name: dict(zip(FONT_METRICS_COLUMNS, values))
+                          for font_name, values in metrics.items()},
+                         ensure_ascii=False, indent=2))
+    elif output_format == 'csv':
+        writer = csv.writer(sys.stdout)
+        writer.writerow(('font',) + FONT_METRICS_COLUMNS)
+        for font_name, values in metrics.items():
+            writer.writerow([font_name] + ['' if x is None else x for x in values])
+    else:
+        width = max([len('font')] + [len(font_name) for font_name in metrics])
+        print(f'{"font":{width}}' + ''.join(f'{x:>12}' for x in FONT_METRICS_COLUMNS))
+        for font_name, values in metrics.items():
+            print(f'{font_name:{width}}'
+                  + ''.join(f'{"-" if x is None else x:>12}' for x in values))
 
 #langtable languages fro testing
 def list_languages_langtable() -> List[str]:
@@ -1677,7 +4764,7 @@ def list_languages_langtable() -> List[str]:
 
 def list_languages_python() -> List[str]:
     '''Return a list of languages known by Python'''
-    languages: List[str] = []
+    languages: Dict[str, None] = {}
     for _alias, value in locale.locale_alias.items():
         value = value.split('.')[0]
         value = value.split('@')[0]
@@ -1705,113 +4792,593 @@ def list_languages_python() -> List[str]:
                 )
         if value in exclude:
             continue
-        if value and value not in languages:
-            languages.append(value)
+        if value:
+            languages[value] = None
         if '_' in value:
             lang_only = value.split('_')[0]
-            if lang_only and lang_only not in languages:
-                languages.append(lang_only)
-    return languages
+            if lang_only:
+                languages[lang_only] = None
+    return list(languages)
 
 def list_languages_glibc() -> List[str]:
     '''
     Return a list of languages for the currently installed glibc locales
     '''
-    languages: List[str] = []
+    return get_locale_registry().languages()
+
+GLIBC_LOCALE_DIR = '/usr/lib/locale'
+GLIBC_LOCALE_ARCHIVE = os.path.join(GLIBC_LOCALE_DIR, 'locale-archive')
+# First field of struct locarhead in glibc’s locale/locarchive.h
+LOCALE_ARCHIVE_MAGIC = 0xde020109
+
+def read_locale_archive(path: str) -> List[str]:
+    '''
+    Return the names of the locales in a glibc locale archive.
+
+    The archive starts with struct locarhead: magic, serial number and
+    the offset, number of used entries and size of the name hash
+    table, 32 bit integers in the byte order of the machine.  Every
+    entry of the hash table is struct namehashent: hash value, offset
+    of the NUL terminated name and offset of the locale record, the
+    offsets are 0 in unused entries.
+
+    :raise OSError: if the archive cannot be read
+    :raise ValueError: if the file is not a locale archive
+    '''
+    names: List[str] = []
+    with open(path, 'rb') as archive_file:
+        with mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ) as archive:
+            (magic, _serial, namehash_offset, _namehash_used,
+             namehash_size) = struct.unpack_from('=5I', archive, 0)
+            if magic != LOCALE_ARCHIVE_MAGIC:
+                raise ValueError(f'{path} is not a glibc locale archive')
+            if namehash_offset + 12 * namehash_size > len(archive):
+                raise ValueError(f'{path} is truncated')
+            for (_hash, name_offset, locrec_offset) in struct.iter_unpack(
+                    '=3I', archive[namehash_offset:namehash_offset + 12 * namehash_size]):
+                if not name_offset or not locrec_offset:
+                    continue
+                end = archive.find(b'\0', name_offset)
+                if end > name_offset:
+                    names.append(archive[name_offset:end].decode('utf-8', 'replace'))
+    return names
+
+def list_locale_directory(path: str) -> List[str]:
+    '''
+    Return the names of the locales compiled into directories of
+    their own, like C.utf8
+
+    :raise OSError: if the directory cannot be read
+    '''
+    with os.scandir(path) as entries:
+        return [entry.name for entry in entries
+                if entry.is_dir()
+                and os.path.isfile(os.path.join(entry.path, 'LC_CTYPE'))]
+
+def list_locales_locale_binary() -> List[str]:
+    '''
+    Return the installed locales printed by “locale -a”, only used
+    when the locales cannot be read directly
+    '''
     locale_binary = shutil.which('locale')
     if not locale_binary:
-        return languages
-    result_lines: List[str] = []
+        return []
     try:
-        result = subprocess.run(
+        result = run_subprocess(
                 [locale_binary, '-a'],
                 encoding='utf-8', check=True, capture_output=True)
     except FileNotFoundError as error:
         LOGGER.exception('Exception when calling %s: %s: %s',
                          locale_binary, error.__class__.__name__, error)
-        return languages
+        return []
     except subprocess.CalledProcessError as error:
         LOGGER.exception('Exception when calling %s: %s: %s stderr: %s',
                          locale_binary,
                          error.__class__.__name__, error, error.stderr)
-        return languages
+        return []
     except Exception as error: # pylint: disable=broad-except
         LOGGER.exception('Exception when calling %s: %s: %s',
                          locale_binary, error.__class__.__name__, error)
-        return languages
-    if not result:
-        return languages
-    result_lines = result.stdout.strip().split('\n')
-    for line in result_lines:
-        locale_object = langtable.parse_locale(line)
-        lang = locale_object.language
-        if not lang:
-            continue
-        if lang not in languages:
-            languages.append(lang)
-        if locale_object.territory:
-            lang += '_' + locale_object.territory
-        if lang not in languages:
-            languages.append(lang)
-    languages = [x for x in languages
-                 if not '_' in x]
-    return languages
+        return []
+    return result.stdout.split()
+
+def read_installed_locales() -> List[str]:
+    '''
+    Return the names of the installed glibc locales, the same as
+    “locale -a” prints but without running it
+    '''
+    names = ['C', 'POSIX']
+    found = False
+    for (function, path) in ((read_locale_archive, GLIBC_LOCALE_ARCHIVE),
+                             (list_locale_directory, GLIBC_LOCALE_DIR)):
+        try:
+            names += function(path)
+            found = True
+        except FileNotFoundError:
+            pass
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Exception when reading %s: %s: %s',
+                             path, error.__class__.__name__, error)
+    if not found:
+        names += list_locales_locale_binary()
+    return sorted(set(names))
 
 def list_languages_fontconfig() -> List[str]:
     '''
     Return a list of languages for which fonts are currently
     installed according to fontconfig
     '''
-    languages: List[str] = []
+    languages: Dict[str, None] = {}
+    for lang in get_font_catalog().languages():
+        if '-' in lang:
+            (first, rest) = lang.split('-', maxsplit=1)
+            lang = first + '_' + rest.upper()
+        if lang:
+            languages[lang] = None
+    return list(languages)
+
+NOFONTS_EXCLUDE = ('Droid', 'STIX')
+
+def probe_font_count_for_language(lang: str) -> int:
+    '''
+    Count the TrueType and CFF fonts for one language with fc-list.
+
+    Only used when the bulk font catalog could not be built.
+    '''
     fc_list_binary = shutil.which('fc-list')
     if not fc_list_binary:
-        return languages
-    result_lines: List[str] = []
-    try:
-        result = subprocess.run(
-                [fc_list_binary, ':', 'lang'],
-                encoding='utf-8', check=True, capture_output=True)
-    except FileNotFoundError as error:
-        LOGGER.exception('Exception when calling %s: %s: %s',
-                         fc_list_binary, error.__class__.__name__, error)
-        return languages
-    except subprocess.CalledProcessError as error:
-        LOGGER.exception('Exception when calling %s: %s: %s stderr: %s',
-                         fc_list_binary,
-                         error.__class__.__name__, error, error.stderr)
-        return languages
-    except Exception as error: # pylint: disable=broad-except
-        LOGGER.exception('Exception when calling %s: %s: %s',
-                         fc_list_binary, error.__class__.__name__, error)
-        return languages
-    if not result:
-        return languages
-    result_lines = result.stdout.strip().split('\n')
-    for line in result_lines:
-        if not line.startswith(':lang='):
+        return 0
+    fonts_listed: List[str] = []
+    for fontformat in ('TrueType', 'CFF'):
+        try:
+            result = run_subprocess(
+                    [fc_list_binary, f':lang={lang}:fontformat={fontformat}',
+                     'family', 'style', 'familylang'],
+                    encoding='utf-8', check=True, capture_output=True)
+        except subprocess.CalledProcessError as error:
+            LOGGER.exception('Exception when calling %s: %s: %s stderr: %s',
+                             fc_list_binary,
+                             error.__class__.__name__, error, error.stderr)
             continue
-        for lang in line.replace(':lang=', '').split('|'):
-            if '-' in lang:
-                (first, rest) = lang.split('-', maxsplit=1)
-                lang = first + '_' + rest.upper()
-            if lang and lang not in languages:
-                languages.append(lang)
-    return languages
+        fonts_listed += result.stdout.strip().split('\n')
+    return len([x for x in fonts_listed
+                if x and not any(word in x for word in NOFONTS_EXCLUDE)])
+
+def count_fonts_for_languages(languages: List[str]) -> Dict[str, int]:
+    '''
+    Return a table mapping each language to the number of TrueType
+    and CFF fonts installed for it (without Droid and STIX fonts).
+
+    The table is filled from the font catalog.  If the catalog is
+    empty because the bulk fc-list dump failed, the languages are
+    probed one by one with fc-list on a pool of worker threads.
+    '''
+    catalog = get_font_catalog()
+    if len(catalog):
+        return {lang: len(catalog.faces(lang=lang, fontformat='TrueType',
+                                        exclude=NOFONTS_EXCLUDE))
+                      + len(catalog.faces(lang=lang, fontformat='CFF',
+                                          exclude=NOFONTS_EXCLUDE))
+                for lang in languages}
+    LOGGER.info('font catalog is empty, probing %d languages with fc-list',
+                len(languages))
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 4) as executor:
+        counts = executor.map(probe_font_count_for_language,
+                              [lang.replace('_', '-') for lang in languages])
+        return dict(zip(languages, counts))
+
+def print_font_counts(font_counts: Dict[str, int], output_format: str) -> None:
+    '''
+    Print the result of count_fonts_for_languages().
+
+    “text” prints the list of languages without fonts like older
+    versions did, “json” and “csv” print the number of fonts for
+    every language.
+    '''
+    missing = [lang.replace('_', '-')
+               for lang, count in font_counts.items() if not count]
+    if output_format == 'json':
+        print(json.dumps({'languages': font_counts, 'missing': missing},
+                         ensure_ascii=False, indent=2))
+    elif output_format == 'csv':
+        writer = csv.writer(sys.stdout)
+        writer.writerow(('language', 'fonts'))
+        for lang, count in font_counts.items():
+            writer.writerow((lang, count))
+    else:
+        print(missing)
+
+def optimal_string_alignment_distance(
+        first: str, second: str, maximum: int) -> int:
+    '''
+    Return the edit distance between two strings, counting
+    transpositions of adjacent characters as one edit.  Returns
+    maximum + 1 as soon as the distance is known to exceed maximum.
+    '''
+    if abs(len(first) - len(second)) > maximum:
+        return maximum + 1
+    previous_row: List[int] = []
+    row = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        before_previous_row, previous_row = previous_row, row
+        row = [i] + [0] * len(second)
+        for j, second_char in enumerate(second, 1):
+            cost = 0 if first_char == second_char else 1
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1,
+                         previous_row[j - 1] + cost)
+            if (i > 1 and j > 1 and first_char == second[j - 2]
+                    and first[i - 2] == second_char):
+                row[j] = min(row[j], before_previous_row[j - 2] + 1)
+        if min(row) > maximum:
+            return maximum + 1
+    return row[-1]
+
+class LanguageSearchIndex:
+    '''
+    Search index over the words of the language names and alternative
+    names of all languages.
+
+    The words are kept in a sorted list, so all words starting with a
+    typed prefix are found with a binary search.  A trigram index over
+    the beginnings of the words finds words which start with
+    something close to the typed text, to tolerate typos.
+    '''
+    # Scores of a match, lower is better
+    EXACT = 0
+    PREFIX = 1
+    FUZZY = 2
+
+    def __init__(self, language_ids: List[str], texts_to_match: List[str]) -> None:
+        '''
+        :param language_ids: The languages, in the order matches with
+                             equal score are returned
+        :param texts_to_match: For each language the normalized text
+                               returned by locale_text_to_match()
+        '''
+        self._language_ids = language_ids
+        word_languages: Dict[str, Set[int]] = {}
+        for position, text in enumerate(texts_to_match):
+            for word in self.split_words(text):
+                word_languages.setdefault(word, set()).add(position)
+        self._words: List[str] = sorted(word_languages)
+        self._word_languages: List[Tuple[int, ...]] = [
+            tuple(sorted(word_languages[word])) for word in self._words]
+        self._trigrams: Dict[str, List[int]] = {}
+        for word_index, word in enumerate(self._words):
+            for trigram in self.trigrams(word):
+                self._trigrams.setdefault(trigram, []).append(word_index)
+
+    @staticmethod
+    def split_words(text: str) -> List[str]:
+        '''Split a normalized text into words'''
+        return text.replace('(', ' ').replace(')', ' ').split()
+
+    @staticmethod
+    def trigrams(word: str) -> Set[str]:
+        '''Return the trigrams of a word, marking where it starts'''
+        word = '^' + word
+        return {word[i:i + 3] for i in range(len(word) - 2)}
+
+    def _match_word(self, query_word: str) -> Dict[int, int]:
+        '''Return the best score of each language matching one query word'''
+        scores: Dict[int, int] = {}
+        # Prefix matches
+        word_index = bisect.bisect_left(self._words, query_word)
+        while (word_index < len(self._words)
+               and self._words[word_index].startswith(query_word)):
+            score = (self.EXACT if self._words[word_index] == query_word
+                     else self.PREFIX)
+            for language in self._word_languages[word_index]:
+                if score < scores.get(language, self.FUZZY + 3):
+                    scores[language] = score
+            word_index += 1
+        if len(query_word) < 3:
+            return scores
+        # Words starting with something close to the query word
+        maximum_distance = 1 if len(query_word) <= 5 else 2
+        candidates: Set[int] = set()
+        for trigram in self.trigrams(query_word):
+            candidates.update(self._trigrams.get(trigram, ()))
+        for word_index in candidates:
+            word = self._words[word_index]
+            distance = min(
+                optimal_string_alignment_distance(
+                    query_word, word[:length], maximum_distance)
+                for length in range(max(1, len(query_word) - maximum_distance),
+                                    len(query_word) + maximum_distance + 1))
+            if distance > maximum_distance:
+                continue
+            score = self.FUZZY + distance
+            for language in self._word_languages[word_index]:
+                if score < scores.get(language, self.FUZZY + 3):
+                    scores[language] = score
+        return scores
+
+    def search(self, query: str) -> List[str]:
+        '''
+        Return the languages matching all words of the query, best
+        matches first.  A word matches exactly, as a prefix of a word
+        of the language names or, if it is at least three characters
+        long, with one or two typos.  An empty query returns all
+        languages.
+        '''
+        query_words = self.split_words(remove_accents(query.lower()))
+        if not query_words:
+            return list(self._language_ids)
+        total_scores: Optional[Dict[int, int]] = None
+        for query_word in query_words:
+            scores = self._match_word(query_word)
+            if total_scores is None:
+                total_scores = scores
+            else:
+                total_scores = {language: score + scores[language]
+                                for language, score in total_scores.items()
+                                if language in scores}
+            if not total_scores:
+                return []
+        assert total_scores is not None
+        return [self._language_ids[language]
+                for language in sorted(total_scores,
+                                       key=lambda x: (total_scores[x], x))] # type: ignore
+
+class LanguageRecord(NamedTuple):
+    '''What the user interface needs to know about one language'''
+    language_id: str
+    # Names of the language in the LC_MESSAGES language, in the
+    # language itself and in English, empty where langtable has none
+    names: Tuple[str, str, str]
+    alternative_names: Tuple[str, ...]
+    has_fonts: bool
+
+def locale_registry_key() -> Tuple[Tuple[str, int], ...]:
+    '''Return the modification times of the installed glibc locales'''
+    key: List[Tuple[str, int]] = []
+    for path in (GLIBC_LOCALE_DIR, GLIBC_LOCALE_ARCHIVE):
+        try:
+            key.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            key.append((path, 0))
+    return tuple(key)
+
+class LocaleRegistry:
+    '''
+    The installed glibc locales, read once per process from the
+    locale archive and directory instead of running “locale -a”.
+    '''
+    def __init__(self) -> None:
+        self._key = locale_registry_key()
+        with trace_span('read_installed_locales', 'startup'):
+            self._names = read_installed_locales()
+        # Without the codeset, like “en_US” for “en_US.utf8”
+        self._locales: Set[str] = {name.split('.')[0] for name in self._names}
+        # Like “sr” for “sr_RS@latin”, without langtable so it can be
+        # used at startup
+        self._language_set: Set[str] = {
+            name for name in (re.split(r'[_.@]', locale_name)[0]
+                              for locale_name in self._names)
+            if re.fullmatch(r'[a-z]{2,3}', name)}
+        self._languages: Optional[List[str]] = None
+        LOGGER.info('locale registry: %d locales', len(self._names))
+
+    def __contains__(self, locale_name: object) -> bool:
+        '''Whether a locale is installed, with or without codeset'''
+        return (isinstance(locale_name, str)
+                and locale_name.split('.')[0] in self._locales)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def names(self) -> List[str]:
+        '''Return the locale names sorted, like “locale -a” prints them'''
+        return self._names
+
+    def languages(self) -> List[str]:
+        '''Return the languages of the locales, without territories'''
+        if self._languages is None:
+            languages: Dict[str, None] = {}
+            for name in self._names:
+                lang = langtable.parse_locale(name).language
+                if lang:
+                    languages[lang] = None
+            self._languages = list(languages)
+        return self._languages
+
+    def has_language(self, lang: str) -> bool:
+        '''Whether a locale for the language is installed'''
+        return lang in self._language_set
+
+    def is_stale(self) -> bool:
+        '''Whether locales were installed or removed since the
+        registry was built'''
+        return locale_registry_key() != self._key
+
+LOCALE_REGISTRY: Optional[LocaleRegistry] = None
+
+def get_locale_registry() -> LocaleRegistry:
+    '''Return the locale registry, building it on first use'''
+    global LOCALE_REGISTRY
+    if LOCALE_REGISTRY is not None:
+        return LOCALE_REGISTRY
+    with LANGUAGE_DATA_LOCK:
+        if LOCALE_REGISTRY is None:
+            LOCALE_REGISTRY = LocaleRegistry()
+    return LOCALE_REGISTRY
+
+class LanguageRegistry:
+    '''
+    The languages known by fontconfig, glibc and langtable, computed
+    once per process.
+
+    The list of language ids is built when the registry is created,
+    the records with the names of a language are created on first use
+    and kept.
+    '''
+    def __init__(self) -> None:
+        self._font_key = font_catalog_cache_key()
+        self._locale_key = locale_registry_key()
+        self._effective_lc_messages = get_effective_lc_messages()
+        # Languages of the glibc locales and of langtable
+        self._other_ids = list(dict.fromkeys(
+            list_languages_glibc() + list_languages_langtable()))
+        self._records: Dict[str, LanguageRecord] = {}
+        self._set_fontconfig_languages(list_languages_fontconfig())
+        LOGGER.info('language registry: %d languages, %d with fonts',
+                    len(self._ids), len(self._with_fonts))
+
+    def _set_fontconfig_languages(self, fontconfig_languages: List[str]) -> None:
+        '''Set the languages which have fonts, fontconfig languages first'''
+        self._with_fonts: Set[str] = set(fontconfig_languages)
+        ids: Dict[str, None] = dict.fromkeys(fontconfig_languages)
+        ids.update(dict.fromkeys(self._other_ids))
+        self._ids: List[str] = list(ids)
+        self._id_set: Set[str] = set(ids)
+        self._sorted_ids: List[str] = sorted(ids)
+        self._search_index: Optional[LanguageSearchIndex] = None
+
+    def with_updated_fonts(self) -> 'LanguageRegistry':
+        '''
+        Return a copy of the registry for the languages of the current
+        font catalog.  The names of the languages are kept.
+        '''
+        registry = copy.copy(self)
+        registry._font_key = font_catalog_cache_key()
+        registry._set_fontconfig_languages(list_languages_fontconfig())
+        if registry._sorted_ids == self._sorted_ids:
+            registry._search_index = self._search_index
+        registry._records = {
+            language_id: record._replace(
+                has_fonts=language_id in registry._with_fonts)
+            for language_id, record in self._records.items()}
+        return registry
+
+    def __contains__(self, language_id: object) -> bool:
+        return language_id in self._id_set
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def language_ids(self) -> List[str]:
+        '''Return the language ids, fontconfig languages first'''
+        return self._ids
+
+    def sorted_language_ids(self) -> List[str]:
+        '''Return the language ids sorted'''
+        return self._sorted_ids
+
+    def has_fonts(self, language_id: str) -> bool:
+        '''Whether fontconfig has fonts for the language'''
+        return language_id in self._with_fonts
+
+    def record(self, language_id: str) -> LanguageRecord:
+        '''Return the record of a language, creating it on first use'''
+        record = self._records.get(language_id)
+        if record is None:
+            names = tuple(
+                str(langtable.language_name(
+                    languageId=language_id, languageIdQuery=query_language) or '')
+                if query_language else ''
+                for query_language in (self._effective_lc_messages,
+                                       language_id, 'en'))
+            record = LanguageRecord(
+                language_id=language_id,
+                names=names, # type: ignore
+                alternative_names=tuple(
+                    LANGUAGE_ALTERNATIVE_NAMES.get(language_id, ())),
+                has_fonts=language_id in self._with_fonts)
+            self._records[language_id] = record
+        return record
+
+    def text_to_match(self, language_id: str) -> str:
+        '''See locale_text_to_match()'''
+        record = self.record(language_id)
+        text_to_match = ' '.join(
+            (language_id.replace(' ', ''),) + record.names + record.alternative_names)
+        return remove_accents(text_to_match).lower()
+
+    def search(self, query: str) -> List[str]:
+        '''
+        Return the sorted languages matching a query typed into the
+        language menu, best matches first, see LanguageSearchIndex.
+        The search index is built on first use.
+        '''
+        if self._search_index is None:
+            self._search_index = LanguageSearchIndex(
+                self._sorted_ids,
+                [self.text_to_match(x) for x in self._sorted_ids])
+        return self._search_index.search(query)
+
+    def fonts_changed(self) -> bool:
+        '''
+        Whether the installed fonts changed since the registry was
+        built.  Always False while a FontDirectoryMonitor keeps the font
+        catalog and the registry up to date.
+        '''
+        if FONT_DIRECTORY_MONITOR is not None:
+            return False
+        return font_catalog_cache_key() != self._font_key
+
+    def is_stale(self) -> bool:
+        '''Whether the installed fonts or locales changed since the
+        registry was built'''
+        return (self.fonts_changed()
+                or locale_registry_key() != self._locale_key
+                or get_effective_lc_messages() != self._effective_lc_messages)
+
+LANGUAGE_REGISTRY: Optional[LanguageRegistry] = None
+
+def get_language_registry(check_stale: bool = False) -> LanguageRegistry:
+    '''
+    Return the language registry, building it on first use.
+
+    :param check_stale: Rebuild the registry (and the font catalog)
+                        if fonts or locales have changed since it was
+                        built.  This stats a few files, so it is only
+                        done at points like opening the language menu.
+    '''
+    global LANGUAGE_REGISTRY, LOCALE_REGISTRY, FONT_CATALOG
+    registry = LANGUAGE_REGISTRY
+    if registry is not None and not (check_stale and registry.is_stale()):
+        return registry
+    with LANGUAGE_DATA_LOCK:
+        if (LANGUAGE_REGISTRY is not None and check_stale
+                and LANGUAGE_REGISTRY.is_stale()):
+            LOGGER.info('fonts or locales changed, rebuilding language registry')
+            if LANGUAGE_REGISTRY.fonts_changed():
+                FONT_CATALOG = None
+            if LOCALE_REGISTRY is not None and LOCALE_REGISTRY.is_stale():
+                LOCALE_REGISTRY = None
+            LANGUAGE_REGISTRY = None
+        if LANGUAGE_REGISTRY is None:
+            LANGUAGE_REGISTRY = LanguageRegistry()
+        return LANGUAGE_REGISTRY
+
+class KnownLanguages:
+    '''
+    Membership test for the language list which does not build the
+    language registry if the font catalog or the installed locales
+    already have the language, so startup does not wait for the
+    languages of langtable.  An installed locale like “en_US” counts
+    as a language, like the territory variants langtable knows.
+    '''
+    def __contains__(self, language_id: object) -> bool:
+        if not isinstance(language_id, str) or not language_id:
+            return False
+        if LANGUAGE_REGISTRY is None:
+            locale_registry = get_locale_registry()
+            if (get_font_catalog().has_language(
+                    language_id.replace('_', '-').lower())
+                    or ('_' in language_id and language_id in locale_registry)
+                    or locale_registry.has_language(language_id)):
+                return True
+        return language_id in get_language_registry()
 
 def list_languages() -> List[str]:
     '''
     Return a list of languages combining the languages known by
     langtable, fontconfig, and glibc.
     '''
-    languages: List[str] = []
-    languages = list_languages_fontconfig()
-    for lang in list_languages_glibc():
-        if lang not in languages:
-            languages.append(lang)
-    for lang in list_languages_langtable():#jft
-        if lang not in languages:
-            languages.append(lang)
-    return languages
+    return list(get_language_registry().language_ids())
 
 def get_effective_lc_messages() -> str:
     '''Returns the effective value of LC_MESSAGES'''
@@ -1925,6 +5492,33 @@ def remove_accents(text: str, keep: str = '') -> str:
             if unicodedata.category(x) != 'Mn']).translate(TRANS_TABLE)
     return unicodedata.normalize('NFC', result)
 
+# Other names users may search for a language with
+LANGUAGE_ALTERNATIVE_NAMES = {
+        'bn':['Bengali', 'bn_IN', 'bn_BD','indic','india'],
+        'bn_IN':['Bengali', 'bn_IN', 'bn_BD','indic','india'],
+        'bn_BD':['Bengali', 'bn_IN', 'bn_BD','indic','india'],
+        'gu':['Gujarati','Gujerati','Gujrati','indic','india'],
+        'ja':['japanese','jp','cjk'], 'ko':['korean','ko','cjk'],
+        'hi':['Devanagari','hindi','hindu','Hindoostani', 'Hindostani','indic','india'],
+        'ml':['malayalam','meera','indic','india'],
+        'mr':['marathi','maratha','shivaji','ganesh','indic','india'],
+        'or':['oriya','odia','indic','india'],
+        'pa':['panjabi','punjabi','gurmukhi','indic','india'],
+        'ks':['Kashmiri','Kashmir','indic','india'],
+        'brx':['BODO','india','indic'],
+        'doi':['Dogri','india','indic'],
+        'kn':['Kannada','india','indic'],
+        'kok':['Konkani','india','indic'],
+        'mai':['Maithili','india','indic'],
+        'mni':['Manipuri','india','indic'],
+        'ne':['Nepali','india','indic'],
+        'ta':['Tamil','india','indic'],
+        'te':['Telugu','india','indic'],
+        'sat':['Santali','india','indic'],
+        'sd':['Sindhi','india','indic'],
+        'ur':['Urdu','india','indic'],
+        'as':['Assamese','Assam','india','indic']}
+
 def locale_text_to_match(locale_id: str) -> str:
     '''
     Returns a text which can be matched against typed user input
@@ -1946,42 +5540,7 @@ def locale_text_to_match(locale_id: str) -> str:
         ...     # unneeded return value assigned to variable
     ...     _ = os.environ.pop('LC_ALL', None)
     '''
-    dic_language_alternative_names = {
-            'bn':['Bengali', 'bn_IN', 'bn_BD','indic','india'],
-            'bn_IN':['Bengali', 'bn_IN', 'bn_BD','indic','india'],
-            'bn_BD':['Bengali', 'bn_IN', 'bn_BD','indic','india'],
-            'gu':['Gujarati','Gujerati','Gujrati','indic','india'],
-            'ja':['japanese','jp','cjk'], 'ko':['korean','ko','cjk'],
-            'hi':['Devanagari','hindi','hindu','Hindoostani', 'Hindostani','indic','india'],
-            'ml':['malayalam','meera','indic','india'],
-            'mr':['marathi','maratha','shivaji','ganesh','indic','india'],
-            'or':['oriya','odia','indic','india'],
-            'pa':['panjabi','punjabi','gurmukhi','indic','india'],
-            'ks':['Kashmiri','Kashmir','indic','india'],
-            'brx':['BODO','india','indic'],
-            'doi':['Dogri','india','indic'],
-            'kn':['Kannada','india','indic'],
-            'kok':['Konkani','india','indic'],
-            'mai':['Maithili','india','indic'],
-            'mni':['Manipuri','india','indic'],
-            'ne':['Nepali','india','indic'],
-            'ta':['Tamil','india','indic'],
-            'te':['Telugu','india','indic'],
-            'sat':['Santali','india','indic'],
-            'sd':['Sindhi','india','indic'],
-            'ur':['Urdu','india','indic'],
-            'as':['Assamese','Assam','india','indic']}
-    effective_lc_messages = get_effective_lc_messages()
-    text_to_match = locale_id.replace(' ', '')
-    query_languages = [effective_lc_messages, locale_id, 'en']
-    for query_language in query_languages:
-        if query_language:
-            text_to_match += ' ' + langtable.language_name(
-                    languageId=locale_id,
-                    languageIdQuery=query_language)
-    if locale_id in dic_language_alternative_names.keys():
-        text_to_match += ' ' + ' '.join([str(ele) for ele in dic_language_alternative_names[locale_id] if ele])
-    return remove_accents(text_to_match).lower()
+    return get_language_registry().text_to_match(locale_id)
 
 def locale_language_description(locale_id: str) -> str:
     '''
@@ -2003,20 +5562,16 @@ def locale_language_description(locale_id: str) -> str:
         ...     # unneeded return value assigned to variable
     ...     _ = os.environ.pop('LC_ALL', None)
     '''
-    language_description = ''
-    effective_lc_messages = get_effective_lc_messages()
-    language_description = langtable.language_name(
-            languageId=locale_id,
-            languageIdQuery=effective_lc_messages)
+    (language_description, _native_name, english_name) = (
+        get_language_registry().record(locale_id).names)
     if not language_description:
-        language_description = langtable.language_name(
-                languageId=locale_id, languageIdQuery='en')
+        language_description = english_name
     if language_description:
         language_description = (
                 language_description[0].upper() + language_description[1:])
     return language_description
 
-def parse_locale(locale_received, list_dropdown, locales) -> str:
+def parse_locale(locale_received, list_dropdown, locales) -> Optional[str]:
     lang_locale = locale_received.split('.')[0]
     if lang_locale in list_dropdown:
         return lang_locale
@@ -2025,8 +5580,9 @@ def parse_locale(locale_received, list_dropdown, locales) -> str:
         if lang_code in list_dropdown:
             return lang_code
         else:
-            print("Input language should be supported by fontconfig")
-            sys.exit()
+            # Not printed here, this runs in the first instance for
+            # the invocations it gets forwarded, see on_command_line()
+            return None
     elif lang_locale in locales:
         #use locales list, if lang_locale in locales
         #then lang_locale set to en
@@ -2038,12 +5594,20 @@ def parse_locale(locale_received, list_dropdown, locales) -> str:
         lang_locale = 'en'
         return lang_locale
 
-def parse_lc_all_lang(list_dropdown) -> str:
-    '''Parse the LC_ALL environment variable for language'''
-    lc_all = os.environ.get('LC_ALL', '')
-    lang_var = os.environ.get('LANG', '')
-    output = subprocess.check_output(['locale', '-a']).decode('utf-8').splitlines()
-    locales = [locale.split('.')[0] for locale in output]
+def parse_lc_all_lang(list_dropdown, environ: Optional[Dict[str, str]] = None) -> Optional[str]:
+    '''
+    Parse the LC_ALL environment variable for language
+
+    :param environ: The environment of the fonts-compare invocation,
+                    os.environ if None
+    :return: The language, None if the language of the locale is not
+             supported
+    '''
+    if environ is None:
+        environ = dict(os.environ)
+    lc_all = environ.get('LC_ALL', '')
+    lang_var = environ.get('LANG', '')
+    locales = get_locale_registry()
     if lc_all:
         return parse_locale(lc_all, list_dropdown, locales)
     elif lang_var:
@@ -2066,8 +5630,418 @@ def parse_lc_all_lang(list_dropdown) -> str:
             return 'en'#worst case
     return 'en' #default to 'en' if nothing matches
 
+# Code point ranges of the fonts generated by --font-corpus for each
+# script.  Whole blocks, so fontconfig finds the orthographies of the
+# languages written in the script complete.
+FONT_CORPUS_COVERAGE = {
+    'Latn': ((0x0020, 0x007E), (0x00A0, 0x024F), (0x0300, 0x036F),
+             (0x1E00, 0x1EFF)),
+    'Cyrl': ((0x0020, 0x007E), (0x0400, 0x052F)),
+    'Grek': ((0x0020, 0x007E), (0x0370, 0x03FF), (0x1F00, 0x1FFF)),
+    'Arab': ((0x0020, 0x007E), (0x0600, 0x06FF), (0x0750, 0x077F),
+             (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)),
+    'Hebr': ((0x0020, 0x007E), (0x0590, 0x05FF), (0xFB1D, 0xFB4F)),
+    'Deva': ((0x0020, 0x007E), (0x0900, 0x097F), (0xA8E0, 0xA8FF)),
+    'Beng': ((0x0020, 0x007E), (0x0980, 0x09FF)),
+    'Taml': ((0x0020, 0x007E), (0x0B80, 0x0BFF)),
+    'Thai': ((0x0020, 0x007E), (0x0E00, 0x0E7F)),
+}
+# (style, weight class, italic) of the faces of each generated family
+FONT_CORPUS_STYLES = (('Regular', 400, False), ('Bold', 700, False),
+                      ('Italic', 400, True), ('Bold Italic', 700, True))
+
+def sfnt_checksum(data: bytes) -> int:
+    '''Return the checksum of an sfnt table'''
+    data += b'\0' * (-len(data) % 4)
+    return sum(struct.unpack(f'>{len(data) // 4}I', data)) & 0xFFFFFFFF
+
+def sfnt_font(sfnt_version: int, tables: Dict[str, bytes]) -> bytes:
+    '''
+    Assemble an sfnt font file from its tables and set the checksum
+    adjustment in the “head” table
+    '''
+    tags = sorted(tables)
+    entry_selector = len(tags).bit_length() - 1
+    search_range = 16 << entry_selector
+    header = struct.pack('>IHHHH', sfnt_version, len(tags), search_range,
+                         entry_selector, 16 * len(tags) - search_range)
+    offset = len(header) + 16 * len(tags)
+    directory = b''
+    data = b''
+    head_offset = 0
+    for tag in tags:
+        table = tables[tag]
+        if tag == 'head':
+            head_offset = offset
+        directory += struct.pack('>4sIII', tag.encode('ascii'),
+                                 sfnt_checksum(table), offset, len(table))
+        table += b'\0' * (-len(table) % 4)
+        data += table
+        offset += len(table)
+    font = bytearray(header + directory + data)
+    struct.pack_into('>I', font, head_offset + 8,
+                     (0xB1B0AFBA - sfnt_checksum(bytes(font))) & 0xFFFFFFFF)
+    return bytes(font)
+
+def sfnt_cmap_table(ranges: Tuple[Tuple[int, int], ...]) -> bytes:
+    '''
+    Return a “cmap” table with a format 4 subtable mapping all code
+    points in the (first, last) ranges to glyph 1
+    '''
+    segments = list(ranges) + [(0xFFFF, 0xFFFF)]
+    seg_count = len(segments)
+    entry_selector = seg_count.bit_length() - 1
+    search_range = 2 << entry_selector
+    glyph_ids: List[int] = []
+    range_offsets: List[int] = []
+    deltas: List[int] = []
+    for index, (first, last) in enumerate(segments[:-1]):
+        # Relative to the position of this idRangeOffset
+        range_offsets.append(2 * (seg_count - index) + 2 * len(glyph_ids))
+        deltas.append(0)
+        glyph_ids += [1] * (last - first + 1)
+    # The final segment maps 0xFFFF to glyph 0
+    range_offsets.append(0)
+    deltas.append(1)
+    subtable = struct.pack(
+        f'>{seg_count}HH{seg_count}H{seg_count}h{seg_count}H{len(glyph_ids)}H',
+        *[last for (_first, last) in segments], 0,
+        *[first for (first, _last) in segments],
+        *deltas, *range_offsets, *glyph_ids)
+    subtable = struct.pack('>HHHHHHH', 4, 14 + len(subtable), 0, 2 * seg_count,
+                           search_range, entry_selector,
+                           2 * seg_count - search_range) + subtable
+    # Unicode BMP and Windows Unicode BMP share the subtable
+    return struct.pack('>HHHHIHHI', 0, 2, 0, 3, 20, 3, 1, 20) + subtable
+
+def sfnt_name_table(names: Dict[int, str]) -> bytes:
+    '''Return a “name” table with English Windows names'''
+    records = b''
+    strings = b''
+    for name_id in sorted(names):
+        string = names[name_id].encode('utf-16-be')
+        records += struct.pack('>HHHHHH', 3, 1, 0x409, name_id,
+                               len(string), len(strings))
+        strings += string
+    return struct.pack('>HHH', 0, len(names), 6 + len(records)) + records + strings
+
+def cff_index(items: List[bytes]) -> bytes:
+    '''Return a CFF INDEX of items, with 4 byte offsets'''
+    if not items:
+        return struct.pack('>H', 0)
+    offsets = [1]
+    for item in items:
+        offsets.append(offsets[-1] + len(item))
+    return (struct.pack(f'>HB{len(offsets)}I', len(items), 4, *offsets)
+            + b''.join(items))
+
+def cff_table(postscript_name: str, box: Tuple[int, int, int, int]) -> bytes:
+    '''
+    Return a “CFF ” table with an empty .notdef glyph and a rectangle
+    named “box” as glyph 1
+    '''
+    def number(value: int) -> bytes:
+        if -107 <= value <= 107:
+            return bytes((value + 139,))
+        if 108 <= value <= 1131:
+            return bytes(((value - 108) // 256 + 247, (value - 108) % 256))
+        return bytes(((-value - 108) // 256 + 251, (-value - 108) % 256))
+    (x_min, y_min, x_max, y_max) = box
+    # rmoveto, rlineto for three sides, endchar
+    rectangle = (number(x_min) + number(y_min) + b'\x15'
+                 + number(x_max - x_min) + number(0)
+                 + number(0) + number(y_max - y_min)
+                 + number(x_min - x_max) + number(0) + b'\x05\x0e')
+    char_strings = cff_index([b'\x0e', rectangle])
+    private = number(0) + b'\x14'
+    def offset(value: int) -> bytes:
+        return b'\x1d' + struct.pack('>i', value)
+    header = struct.pack('>BBBB', 1, 0, 4, 4)
+    name_index = cff_index([postscript_name.encode('ascii')])
+    string_index = cff_index([b'box'])
+    # Format 0, “box” is the first string after the 391 standard strings
+    charset = struct.pack('>BH', 0, 391)
+    def top_dict(charset_offset: int, char_strings_offset: int,
+                 private_offset: int) -> bytes:
+        return (offset(charset_offset) + b'\x0f'
+                + offset(char_strings_offset) + b'\x11'
+                + offset(len(private)) + offset(private_offset) + b'\x12')
+    # The Top DICT has the same length whatever the offsets are
+    charset_offset = (len(header) + len(name_index)
+                      + len(cff_index([top_dict(0, 0, 0)]))
+                      + len(string_index) + len(cff_index([])))
+    char_strings_offset = charset_offset + len(charset)
+    private_offset = char_strings_offset + len(char_strings)
+    # The Global Subr INDEX is empty
+    return (header + name_index
+            + cff_index([top_dict(charset_offset, char_strings_offset, private_offset)])
+            + string_index + cff_index([]) + charset + char_strings + private)
+
+def make_corpus_font(family: str, style: str, weight: int, italic: bool,
+                     version: str, ranges: Tuple[Tuple[int, int], ...],
+                     cff: bool) -> bytes:
+    '''
+    Return a minimal but valid font with two glyphs, .notdef and a
+    rectangle which all code points in ranges are mapped to.  The
+    outlines are TrueType or, if cff is true, CFF.
+    '''
+    box = (50, 0, 550, 500)
+    postscript_name = f'{family}-{style}'.replace(' ', '')
+    names = {1: family, 2: style, 3: f'{postscript_name};{version}',
+             4: f'{family} {style}', 5: f'Version {version}', 6: postscript_name}
+    mac_style = (1 if weight >= 700 else 0) | (2 if italic else 0)
+    fs_selection = ((0x20 if weight >= 700 else 0) | (0x01 if italic else 0)) or 0x40
+    revision = round(float(version) * 65536)
+    code_points = [cp for (first, last) in ranges for cp in (first, last)]
+    tables = {
+        'head': struct.pack('>IIIIHHqqhhhhHHhhh', 0x00010000, revision, 0,
+                            0x5F0F3CF5, 3, 1000, 0, 0, *box, mac_style, 8, 2,
+                            0, 0),
+        'hhea': struct.pack('>IhhhHhhhhhhhhhhhH', 0x00010000, 800, -200, 0,
+                            600, 0, 50, box[2], 1, 0, 0, 0, 0, 0, 0, 0, 2),
+        'hmtx': struct.pack('>HhHh', 600, 0, 600, box[0]),
+        'OS/2': struct.pack('>HhHHHhhhhhhhhhhh10sIIII4sHHHhhhHHIIhhHHH',
+                            4, 600, weight, 5, 0,
+                            650, 600, 0, 75, 650, 600, 0, 350, 50, 250, 0,
+                            b'\0' * 10, 0, 0, 0, 0, b'NONE', fs_selection,
+                            min(code_points), min(max(code_points), 0xFFFF),
+                            800, -200, 0, 800, 200, 1, 0, 500, 500, 0, 32, 0),
+        'cmap': sfnt_cmap_table(ranges),
+        'name': sfnt_name_table(names),
+        'post': struct.pack('>IihhIIIII', 0x00030000,
+                            -12 * 65536 if italic else 0, -100, 50, 0, 0, 0, 0, 0),
+    }
+    if cff:
+        tables['CFF '] = cff_table(postscript_name, box)
+        tables['maxp'] = struct.pack('>IH', 0x00005000, 2)
+        return sfnt_font(0x4F54544F, tables)
+    # A closed rectangle of four on-curve points with int16 deltas
+    rectangle = struct.pack('>hhhhhHH4B4h4h', 1, *box, 3, 0, 1, 1, 1, 1,
+                            box[0], box[2] - box[0], 0, box[0] - box[2],
+                            box[1], 0, box[3] - box[1], 0)
+    tables['glyf'] = rectangle
+    tables['loca'] = struct.pack('>HHH', 0, 0, len(rectangle) // 2)
+    tables['maxp'] = struct.pack('>IHHHHHHHHHHHHHH', 0x00010000, 2, 4, 1,
+                                 0, 0, 2, 0, 0, 0, 0, 0, 0, 0, 0)
+    return sfnt_font(0x00010000, tables)
+
+def make_font_corpus(directory: str, size: int) -> str:
+    '''
+    Generate size synthetic fonts below directory and a fontconfig
+    configuration which contains only these fonts, with its own cache.
+
+    The fonts are families of FONT_CORPUS_STYLES, named like “Corpus
+    Deva 00012”, for the scripts in FONT_CORPUS_COVERAGE in turn.
+    Families alternate between TrueType and CFF outlines and have
+    versions 1.000 to 3.999.
+
+    :return: The path of the configuration to use as FONTCONFIG_FILE
+    '''
+    directory = os.path.abspath(directory)
+    font_dir = os.path.join(directory, 'fonts')
+    scripts = list(FONT_CORPUS_COVERAGE)
+    for index in range(size):
+        family_number = index // len(FONT_CORPUS_STYLES)
+        script = scripts[family_number % len(scripts)]
+        (style, weight, italic) = FONT_CORPUS_STYLES[index % len(FONT_CORPUS_STYLES)]
+        family = f'Corpus {script} {family_number:05d}'
+        cff = family_number % 2 == 1
+        version = f'{1 + family_number % 3}.{family_number % 1000:03d}'
+        script_dir = os.path.join(font_dir, script)
+        os.makedirs(script_dir, exist_ok=True)
+        file_name = family.replace(' ', '') + '-' + style.replace(' ', '')
+        with open(os.path.join(script_dir, file_name + ('.otf' if cff else '.ttf')),
+                  'wb') as font_file:
+            font_file.write(make_corpus_font(
+                family, style, weight, italic, version,
+                FONT_CORPUS_COVERAGE[script], cff))
+    config_path = os.path.join(directory, 'fonts.conf')
+    with open(config_path, 'w', encoding='utf-8') as config_file:
+        # The size and time make the configuration differ for every
+        # corpus, which invalidates the font catalog cache
+        config_file.write(
+            '<?xml version="1.0"?>\n'
+            '<!DOCTYPE fontconfig SYSTEM "urn:fontconfig:fonts.dtd">\n'
+            f'<!-- fonts-compare font corpus: {size} fonts, {time.time()} -->\n'
+            '<fontconfig>\n'
+            f'  <dir>{GLib.markup_escape_text(font_dir)}</dir>\n'
+            f'  <cachedir>{GLib.markup_escape_text(os.path.join(directory, "cache", "fontconfig"))}</cachedir>\n'
+            '</fontconfig>\n')
+    fc_cache_binary = shutil.which('fc-cache')
+    if fc_cache_binary:
+        try:
+            run_subprocess([fc_cache_binary, '--force'],
+                           encoding='utf-8', check=True, capture_output=True,
+                           env=dict(os.environ, FONTCONFIG_FILE=config_path))
+        except subprocess.CalledProcessError as error:
+            LOGGER.exception('Exception when calling %s: %s: %s stderr: %s',
+                             fc_cache_binary,
+                             error.__class__.__name__, error, error.stderr)
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Exception when calling %s: %s: %s',
+                             fc_cache_binary, error.__class__.__name__, error)
+    return config_path
+
+# Text for the language and script detection benchmarks
+BENCHMARK_TEXT = 'The quick brown fox জাতীয় স্মৃতিসৌধ हिन्दी भाषा 日本語のテキスト'
+# Queries typed into the language menu for the search benchmark:
+# codes, English and native names, several words and typos
+BENCHMARK_SEARCH_QUERIES = ('de', 'deu', 'german', 'deutsch', 'hindi',
+                            'हिन्दी', 'bengali india', 'portugese',
+                            'chinese taiwan', 'x')
+BENCHMARK_PERCENTILES = (50, 90, 99)
+# A benchmark whose median is this many times slower than in the
+# baseline is reported as a regression
+BENCHMARK_REGRESSION_FACTOR = 1.5
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    '''
+    Return a percentile of sorted values, interpolating linearly
+    between the closest ranks
+    '''
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return (sorted_values[lower]
+            + (sorted_values[upper] - sorted_values[lower]) * (position - lower))
+
+def benchmark_cases(lang: str) -> Dict[str, Any]:
+    '''
+    Return the benchmarks by name.  Each is a function which prepares
+    everything which is not measured and returns the function to time.
+
+    :param lang: The language to resolve fonts for
+    '''
+    def default_font() -> Any:
+        return lambda: default_font_family_for_language(lang, lang)
+    def other_font() -> Any:
+        first_font = default_font_family_for_language(lang, lang)
+        return lambda: other_font_family_for_language(lang, first_font, lang)
+    def text_to_match() -> Any:
+        language_ids = get_language_registry().sorted_language_ids()
+        return lambda: [locale_text_to_match(x) for x in language_ids]
+    def accents() -> Any:
+        registry = get_language_registry()
+        texts = [' '.join(registry.record(x).names)
+                 for x in registry.sorted_language_ids()]
+        return lambda: [remove_accents(text) for text in texts]
+    def search() -> Any:
+        registry = get_language_registry()
+        return lambda: [registry.search(query) for query in BENCHMARK_SEARCH_QUERIES]
+    return {
+        'default_font_family_for_language': default_font,
+        'other_font_family_for_language': other_font,
+        # A new registry each time, get_language_registry() would cache it
+        'list_languages': lambda: lambda: LanguageRegistry().language_ids(),
+        'list_languages_langtable': lambda: list_languages_langtable,
+        'list_languages_python': lambda: list_languages_python,
+        'list_languages_glibc': lambda: lambda: LocaleRegistry().languages(),
+        'list_languages_fontconfig': lambda: list_languages_fontconfig,
+        'locale_text_to_match': text_to_match,
+        'remove_accents': accents,
+        # Bypass the memoization of detect_language()
+        'detect_language': lambda: lambda: detect_language.__wrapped__(BENCHMARK_TEXT),
+        'detect_script': lambda: lambda: detect_script(BENCHMARK_TEXT),
+        'language_search': search,
+    }
+
+def run_benchmarks(
+        names: List[str], lang: str, repeat: int) -> Dict[str, Dict[str, Any]]:
+    '''
+    Run benchmarks and return their timings in milliseconds.
+
+    The first run of each benchmark is reported separately as
+    “first_ms”, as it fills caches, the percentiles are of the
+    following runs.  A benchmark which fails reports “error”.
+    '''
+    cases = benchmark_cases(lang)
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in names:
+        try:
+            function = cases[name]()
+            start = time.perf_counter()
+            function()
+            first = (time.perf_counter() - start) * 1000
+            times: List[float] = []
+            for _run in range(repeat):
+                start = time.perf_counter()
+                function()
+                times.append((time.perf_counter() - start) * 1000)
+        except Exception as error: # pylint: disable=broad-except
+            LOGGER.exception('Exception in benchmark %s: %s: %s',
+                             name, error.__class__.__name__, error)
+            results[name] = {'error': f'{error.__class__.__name__}: {error}'}
+            continue
+        times.sort()
+        result = {'first_ms': first, 'runs': repeat,
+                  'min_ms': times[0] if times else first,
+                  'mean_ms': sum(times) / len(times) if times else first}
+        for percent in BENCHMARK_PERCENTILES:
+            result[f'p{percent}_ms'] = percentile(times, percent) if times else first
+        result['max_ms'] = times[-1] if times else first
+        results[name] = result
+    return results
+
+def print_benchmarks(
+        results: Dict[str, Dict[str, Any]], lang: str, output_format: str) -> None:
+    '''Print the result of run_benchmarks()'''
+    columns = (['first_ms', 'min_ms', 'mean_ms']
+               + [f'p{percent}_ms' for percent in BENCHMARK_PERCENTILES]
+               + ['max_ms'])
+    if output_format == 'json':
+        print(json.dumps({'lang': lang,
+                          'python': sys.version.split()[0],
+                          'benchmarks': results},
+                         ensure_ascii=False, indent=2))
+    elif output_format == 'csv':
+        writer = csv.writer(sys.stdout)
+        writer.writerow(['benchmark', 'runs'] + columns + ['error'])
+        for name, result in results.items():
+            writer.writerow([name, result.get('runs', 0)]
+                            + [f'{result[x]:.3f}' if x in result else ''
+                               for x in columns]
+                            + [result.get('error', '')])
+    else:
+        width = max([len('benchmark')] + [len(name) for name in results])
+        print(f'{"benchmark":{width}}' + ''.join(f'{x:>11}' for x in columns))
+        for name, result in results.items():
+            if 'error' in result:
+                print(f'{name:{width}}  {result["error"]}')
+                continue
+            print(f'{name:{width}}' + ''.join(f'{result[x]:11.3f}' for x in columns))
+
+def compare_benchmarks(
+        results: Dict[str, Dict[str, Any]],
+        baseline: Dict[str, Dict[str, Any]]) -> List[str]:
+    '''
+    Return a message for every benchmark whose median is more than
+    BENCHMARK_REGRESSION_FACTOR times the median in the baseline
+    '''
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name, {})
+        if 'p50_ms' not in result or not old.get('p50_ms'):
+            continue
+        if result['p50_ms'] > BENCHMARK_REGRESSION_FACTOR * old['p50_ms']:
+            regressions.append(
+                f'{name}: median {result["p50_ms"]:.3f} ms, '
+                f'baseline {old["p50_ms"]:.3f} ms')
+    return regressions
+
 if __name__ == '__main__':
-    list_dropdown = sorted(list_languages())
+    PARSE_ARGS_START_TIME = time.perf_counter()
+    _ARGS = parse_args()
+    if _ARGS.trace:
+        trace_enable(_ARGS.trace)
+        trace_event('import', 'startup', IMPORT_START_TIME, PARSE_ARGS_START_TIME)
+        trace_event('parse_args', 'startup',
+                    PARSE_ARGS_START_TIME, time.perf_counter())
+    if _ARGS.text:
+        _ARGS.text = ' '.join(_ARGS.text)
+    # The language list itself is only built when needed
+    list_dropdown = KnownLanguages()
     os.environ['LC_CTYPE'] = 'C.UTF-8'
     os.environ['LC_MESSAGES'] = 'C.UTF-8'
     os.environ['LC_COLLATE'] = 'C.UTF-8'
@@ -2076,9 +6050,6 @@ if __name__ == '__main__':
     except locale.Error:
         print("Unsupported locale setting. Falling back to C locale")
         locale.setlocale(locale.LC_ALL, 'C.UTF-8')
-    cli_language = parse_lc_all_lang(list_dropdown)
-    cli_text = _ARGS.text if _ARGS.text else ""
-    lang_explicitly_set = False  # Track if language was explicitly set via -l flag
     if _ARGS.debug:
         LOG_HANDLER = logging.StreamHandler(stream=sys.stderr)
         LOG_FORMATTER = logging.Formatter(
@@ -2090,78 +6061,106 @@ if __name__ == '__main__':
         LOGGER.addHandler(LOG_HANDLER)
     elif _ARGS.nofonts:
         #call nofonts function
-        print('Fonts of these languages are not installed in your system')
-        print('checking...please wait...')
-        #list_dropdown = sorted(list_languages())
-        lang_with_nofonts_installed = []
-        for i in list_dropdown:
-            lang = i.replace('_','-')
-            fc_list_binary = shutil.which('fc-list')
-            if not fc_list_binary:
-                sys.exit()
-            try:
-                result1 = subprocess.run(
-                        [fc_list_binary, f':lang={lang}:fontformat=TrueType', 'family', 'style', 'familylang'],
-                        encoding='utf-8', check=True, capture_output=True)
-                fonts_listed1 = result1.stdout.strip().split('\n')
-                result2 = subprocess.run(
-                        [fc_list_binary, f':lang={lang}:fontformat=CFF', 'family', 'style', 'familylang'],
-                        encoding='utf-8', check=True, capture_output=True)
-                fonts_listed2 = result2.stdout.strip().split('\n')
-                fonts_listed = fonts_listed1 + fonts_listed2
-                list_unfilter_other_font = [x for x in fonts_listed
-                                            if x and not ('Droid' in x or 'STIX' in x)]
-                if not list_unfilter_other_font:
-                    lang_with_nofonts_installed.append(lang)
-            except FileNotFoundError as error:
-                LOGGER.exception('Exception when calling %s: %s: %s',
-                                 fc_list_binary, error.__class__.__name__, error)
-                sys.exit()
-            except subprocess.CalledProcessError as error:
-                LOGGER.exception('Exception when calling %s: %s: %s stderr: %s',
-                                 fc_list_binary,
-                                 error.__class__.__name__, error, error.stderr)
-                sys.exit()
-            except Exception as error: # pylint: disable=broad-except
-                LOGGER.exception('Exception when calling %s: %s: %s',
-                                 fc_list_binary, error.__class__.__name__, error)
-                sys.exit()
-        print(lang_with_nofonts_installed)
-        sys.exit()
-    elif _ARGS.lang:
-        lang_explicitly_set = True  # User explicitly set language via -l flag
-        cli_language = _ARGS.lang
-        if '-' in cli_language or '_' in cli_language:
-            if '-' in cli_language:
-                (f,r) = cli_language.split('-', maxsplit=1)
-            else:
-                (f,r) = cli_language.split('_', maxsplit=1)
-            cli_language = f + '_' + r.upper()
-            if cli_language not in list_dropdown:
-                cli_language = cli_language.split('_')[0]
-        if cli_language in list_dropdown:
-            print("initialize fonts-compare with ",cli_language)
-        else:
-            print('unsupported language is entered')
-            print('printing list of languages supported by fontconfig')
-            print(list_dropdown)
+        if _ARGS.format == 'text':
+            print('Fonts of these languages are not installed in your system')
+            print('checking...please wait...')
+        if not shutil.which('fc-list'):
             sys.exit()
+        with trace_span('list_languages', 'startup'):
+            languages = get_language_registry().sorted_language_ids()
+        font_counts = count_fonts_for_languages(languages)
+        print_font_counts(font_counts, _ARGS.format)
+        sys.exit()
     elif _ARGS.help:
         print('Usage: fonts-compare [OPTIONS]')
         print('[Options]:')
         print(' -d          --debug         debug fonts-compare with logs')
         print(' -nf         --nofonts       display those languages whose fonts are not installed in your system')
+        print(' -f          --format        output format of --nofonts: text, json or csv')
+        print(' -r          --render        render comparison images for languages without a window')
+        print(' -o          --output-dir    directory for the images of --render')
+        print('             --render-format image format of --render: png or svg')
         print(' -l          --lang          initialize fonts-compare with specific language')
         print(' -t          --text          open fonts-compare with text pre-filled')
+        print(' -w          --new-window    open a new window in a running fonts-compare')
+        print('             --metrics       print the metrics of all fonts of a language')
+        print('             --benchmark     time the slow paths without a window and print percentiles')
+        print('             --repeat        number of timed runs of each benchmark')
+        print('             --benchmark-baseline  fail if a benchmark got slower than in an earlier JSON output')
+        print('             --font-corpus   generate synthetic fonts and a fontconfig configuration in a directory')
+        print('             --corpus-size   number of fonts --font-corpus generates')
+        print('             --serve         render comparisons for HTTP requests on a port or Unix socket')
+        print('             --workers       number of comparisons --serve renders at the same time')
+        print('             --trace         write a timeline of startup and interaction to a file')
         print(' -h          --help          display this help and exit')
         print('Learn more about fonts-compare:https://github.com/sudipshil9862/fonts-compare/blob/main/README.md')
         sys.exit()
     else:
         LOG_HANDLER_NULL = logging.NullHandler()
+    if _ARGS.metrics:
+        metrics_lang = _ARGS.metrics.replace('-', '_')
+        print_font_metrics(
+            font_metrics_for_language(
+                metrics_lang,
+                _ARGS.text if _ARGS.text else sample_text_for_language(metrics_lang)),
+            _ARGS.format)
+        sys.exit()
+    if _ARGS.font_corpus:
+        corpus_config = make_font_corpus(_ARGS.font_corpus, max(_ARGS.corpus_size, 0))
+        print(f'{_ARGS.corpus_size} fonts generated, use them with:')
+        print(f'FONTCONFIG_FILE={corpus_config} '
+              f'XDG_CACHE_HOME={os.path.join(os.path.dirname(corpus_config), "cache")} '
+              './fonts_compare.py')
+        sys.exit()
+    if _ARGS.benchmark is not None:
+        cli_language = command_line_language(_ARGS, dict(os.environ))
+        if cli_language is None:
+            print('unsupported language is entered')
+            sys.exit(1)
+        benchmark_names = _ARGS.benchmark or list(benchmark_cases(cli_language))
+        unknown_names = [x for x in benchmark_names
+                         if x not in benchmark_cases(cli_language)]
+        if unknown_names:
+            print('unknown benchmarks:', ' '.join(unknown_names))
+            print('available benchmarks:', ' '.join(benchmark_cases(cli_language)))
+            sys.exit(1)
+        benchmark_results = run_benchmarks(
+            benchmark_names, cli_language, max(_ARGS.repeat, 0))
+        print_benchmarks(benchmark_results, cli_language, _ARGS.format)
+        if _ARGS.benchmark_baseline:
+            with open(_ARGS.benchmark_baseline, encoding='utf-8') as baseline_file:
+                benchmark_baseline = json.load(baseline_file).get('benchmarks', {})
+            benchmark_regressions = compare_benchmarks(
+                benchmark_results, benchmark_baseline)
+            for regression in benchmark_regressions:
+                print('slower than baseline:', regression, file=sys.stderr)
+            if benchmark_regressions:
+                sys.exit(1)
+        sys.exit()
+    if _ARGS.render:
+        render_languages = _ARGS.render
+        if 'all' in render_languages:
+            render_languages = [lang for lang, count
+                                in count_fonts_for_languages(list_languages()).items()
+                                if count]
+        render_comparisons(
+            [lang.replace('-', '_') for lang in render_languages],
+            _ARGS.text if _ARGS.text else '',
+            _ARGS.output_dir, _ARGS.render_format)
+        sys.exit()
+    if _ARGS.serve:
+        serve_comparisons(_ARGS.serve, max(_ARGS.workers, 1))
+        sys.exit()
+    Adw.init()
     GTK_VERSION =   (Gtk.get_major_version(),
                     Gtk.get_minor_version(),
                     Gtk.get_micro_version())
     #app = Gtk.Application(application_id='org.github.sudipshil9862.fonts-compare')
-    app = Adw.Application(application_id='org.github.sudipshil9862.fonts-compare')
-    app.connect('activate', on_activate, cli_language, cli_text, lang_explicitly_set)
-    app.run(None)
+    # Later invocations forward their command line to the first one,
+    # see on_command_line()
+    app = Adw.Application(application_id='org.github.sudipshil9862.fonts-compare',
+                          flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
+    app.connect('command-line', on_command_line)
+    app.connect('activate', lambda application: on_activate(
+        application, command_line_language(_ARGS, dict(os.environ)) or 'en'))
+    sys.exit(app.run(sys.argv))